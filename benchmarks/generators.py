@@ -0,0 +1,100 @@
+"""
+Детерминированные генераторы сеток и изображений для замеров производительности.
+Все генераторы возвращают двумерный массив кодов uint8; одинаковые параметры - одинаковый результат
+"""
+import numpy as np
+from PIL import Image
+
+PALETTE = np.array([(255, 255, 255), (0, 0, 0), (255, 0, 0), (0, 160, 0), (0, 0, 255),
+                    (255, 255, 0), (255, 0, 255), (0, 255, 255), (128, 128, 128), (128, 0, 0),
+                    (0, 128, 0), (0, 0, 128), (128, 128, 0), (128, 0, 128), (0, 128, 128), (192, 192, 192)],
+                   dtype=np.uint8)
+
+
+def maze(height: int, width: int, seed: int = 0) -> np.ndarray:
+    """
+    Лабиринт алгоритмом "двоичного дерева": 1 - стена, 0 - проход.
+    Из каждой клетки (нечётные координаты) случайно прорубается проход на север или на восток,
+    поэтому лабиринт связный и строится векторно
+    """
+    rng = np.random.default_rng(seed)
+    grid = np.ones((height, width), dtype=np.uint8)
+    rows, cols = np.arange(1, height - 1, 2), np.arange(1, width - 1, 2)
+    if not len(rows) or not len(cols):
+        return grid
+    grid[np.ix_(rows, cols)] = 0
+    cell_r, cell_c = np.meshgrid(rows, cols, indexing='ij')
+    can_north = cell_r > 1
+    can_east = cell_c + 2 < width - 1
+    north = np.where(can_north & can_east, rng.random(cell_r.shape) < 0.5, can_north)
+    carve_north = north & can_north
+    carve_east = ~north & can_east
+    grid[cell_r[carve_north] - 1, cell_c[carve_north]] = 0
+    grid[cell_r[carve_east], cell_c[carve_east] + 1] = 0
+    return grid
+
+
+def noise(height: int, width: int, n_colors: int = 4, seed: int = 0) -> np.ndarray:
+    """ Случайный шум из n_colors цветов - худший случай для разметки: очень много мелких областей """
+    return np.random.default_rng(seed).integers(0, n_colors, size=(height, width), dtype=np.uint8)
+
+
+def stripes(height: int, width: int, period: int = 8, n_colors: int = 2) -> np.ndarray:
+    """ Диагональные полосы шириной period """
+    rows, cols = np.ogrid[:height, :width]
+    return (((rows + cols) // period) % n_colors).astype(np.uint8)
+
+
+def rings(height: int, width: int, ring_width: int = 5, n_colors: int = 2) -> np.ndarray:
+    """ Вложенные квадратные кольца - много вложенных областей с дырами """
+    rows, cols = np.ogrid[:height, :width]
+    depth = np.minimum(np.minimum(rows, height - 1 - rows), np.minimum(cols, width - 1 - cols))
+    return ((depth // ring_width) % n_colors).astype(np.uint8)
+
+
+def flat(height: int, width: int, blocks: int = 4, n_colors: int = 3) -> np.ndarray:
+    """ Несколько больших однотонных прямоугольников на фоне 0 """
+    if n_colors < 2:
+        raise ValueError(f"Нужно не меньше двух цветов (фон и прямоугольники), указано {n_colors}")
+    grid = np.zeros((height, width), dtype=np.uint8)
+    step_r, step_c = max(height // blocks, 1), max(width // blocks, 1)
+    for i in range(blocks):
+        for j in range(blocks):
+            if (i + j) % 2:
+                grid[i * step_r + step_r // 4:(i + 1) * step_r - step_r // 4,
+                     j * step_c + step_c // 4:(j + 1) * step_c - step_c // 4] = 1 + (i * blocks + j) % (n_colors - 1)
+    return grid
+
+
+GENERATORS = {
+    'maze': maze,
+    'noise': noise,
+    'stripes': stripes,
+    'rings': rings,
+    'flat': flat,
+}
+
+
+def to_image(codes: np.ndarray) -> Image.Image:
+    return Image.fromarray(PALETTE[codes % len(PALETTE)])
+
+
+def _symbols_table(codes: np.ndarray, separator: bytes) -> str:
+    """ Сетка построчно, код - шестнадцатеричная цифра, после каждой клетки separator или перевод строки """
+    symbols = np.frombuffer(b"0123456789abcdef", dtype=np.uint8)
+    step = 1 + len(separator)
+    width = codes.shape[1] * step
+    lines = np.full((codes.shape[0], width if separator else width + 1), ord(separator or b'\n'), dtype=np.uint8)
+    lines[:, :width:step] = symbols[codes % 16]
+    lines[:, -1] = ord('\n')
+    return lines.tobytes().decode()
+
+
+def to_text(codes: np.ndarray) -> str:
+    """ Сетка в формате txt для Walls """
+    return _symbols_table(codes, b'')
+
+
+def to_csv(codes: np.ndarray) -> str:
+    """ Сетка в формате csv для Walls """
+    return _symbols_table(codes, b',')
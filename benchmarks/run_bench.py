@@ -0,0 +1,149 @@
+"""
+Замеры производительности этапов обработки на синтетических сетках.
+Результаты сравниваются с сохранёнными в JSON базовыми значениями; при замедлении этапа больше порога
+скрипт завершается с кодом 1.
+
+    python -m benchmarks.run_bench                      # замер и сравнение с benchmarks/baseline.json
+    python -m benchmarks.run_bench --save               # замер и сохранение новых базовых значений
+    python -m benchmarks.run_bench --max-pixels 100000000 --stages label background
+"""
+import argparse
+import contextlib
+import io
+import json
+import sys
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from time import perf_counter
+from typing import Callable
+
+import numpy as np
+
+from benchmarks.generators import GENERATORS, PALETTE, to_image, to_text, to_csv
+from cellsdata import Walls
+from print_ascii import get_background_color, total_colors
+from regions import label
+
+BASELINE_FILE = Path(__file__).parent / "baseline.json"
+SIDES = (10, 100, 1_000, 10_000)    # 10^2 .. 10^8 пикселей
+DEFAULT_MAX_PIXELS = 1_000_000
+DEFAULT_THRESHOLD = 0.25    # допустимое замедление, доля от базового времени
+MIN_DELTA = 0.002           # замедления меньше этого (сек) считаются шумом
+
+
+@dataclass
+class Stage:
+    name: str
+    prepare: Callable[[np.ndarray, Path], object]   # подготовка входных данных, в замер не входит
+    run: Callable[[object], object]
+    max_pixels: int             # больше этого этап не запускается (ограничения формата или разумного времени)
+    max_shape: tuple[int, int] = None
+
+
+def _write(path: Path, text: str) -> Path:
+    path.write_text(text)
+    return path
+
+
+def _save_png(codes: np.ndarray, tmp: Path) -> Path:
+    to_image(codes).save(tmp / "grid.png")
+    return tmp / "grid.png"
+
+
+def _render(walls: Walls):
+    with contextlib.redirect_stdout(io.StringIO()):
+        walls.print_color()
+
+
+STAGES = {
+    'load_txt': Stage('load_txt', lambda codes, tmp: _write(tmp / "grid.txt", to_text(codes)),
+                      Walls, 1_000_000),
+    'load_csv': Stage('load_csv', lambda codes, tmp: _write(tmp / "grid.csv", to_csv(codes)),
+                      Walls, 1_000_000),
+    'load_png': Stage('load_png', _save_png, Walls, 10_000, max_shape=(27, 178)),
+    'background': Stage('background', lambda codes, tmp: to_image(codes), get_background_color, 100_000_000),
+    'colors': Stage('colors', lambda codes, tmp: to_image(codes), total_colors, 1_000_000),
+    'label': Stage('label', lambda codes, tmp: codes, lambda codes: label(codes, 4, background=0), 100_000_000),
+    'render': Stage('render', lambda codes, tmp: Walls.from_codes(codes, PALETTE), _render, 1_000_000),
+}
+
+
+def measure(function: Callable, argument, repeat: int) -> float:
+    """ Лучшее время из repeat запусков, сек """
+    best = float('inf')
+    for _ in range(repeat):
+        start = perf_counter()
+        function(argument)
+        best = min(best, perf_counter() - start)
+    return best
+
+
+def run(stages: list[str], generators: list[str], max_pixels: int, repeat: int, log=print) -> dict[str, float]:
+    """
+    :return: {"этап/генератор/сторона": время, сек}
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for side in SIDES:
+            if side * side > max_pixels:
+                break
+            for generator in generators:
+                codes = GENERATORS[generator](side, side)
+                for name in stages:
+                    stage = STAGES[name]
+                    if side * side > stage.max_pixels or stage.max_shape and (
+                            side > stage.max_shape[0] or side > stage.max_shape[1]):
+                        continue
+                    argument = stage.prepare(codes, Path(tmp))
+                    key = f"{name}/{generator}/{side}"
+                    results[key] = measure(stage.run, argument, repeat)
+                    log(f"{key:<32} {results[key] * 1000:10.2f} ms")
+    return results
+
+
+def compare(results: dict[str, float], baseline: dict[str, float],
+            threshold: float = DEFAULT_THRESHOLD) -> list[str]:
+    """
+    :return: описания этапов, замедлившихся больше чем на threshold от базового времени
+    """
+    regressions = []
+    for key, elapsed in results.items():
+        base = baseline.get(key)
+        if base is not None and elapsed > base * (1 + threshold) and elapsed - base > MIN_DELTA:
+            regressions.append(f"{key}: {base * 1000:.2f} ms -> {elapsed * 1000:.2f} ms "
+                               f"(+{(elapsed / base - 1) * 100:.0f}%)")
+    return regressions
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--stages', nargs='+', choices=list(STAGES), default=list(STAGES))
+    parser.add_argument('--generators', nargs='+', choices=list(GENERATORS), default=list(GENERATORS))
+    parser.add_argument('--max-pixels', type=int, default=DEFAULT_MAX_PIXELS)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument('--baseline', type=Path, default=BASELINE_FILE)
+    parser.add_argument('--save', action='store_true', help="сохранить результаты как базовые")
+    args = parser.parse_args(argv)
+
+    results = run(args.stages, args.generators, args.max_pixels, args.repeat)
+
+    if args.save:
+        baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+        baseline.update(results)
+        args.baseline.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+        print(f"Базовые значения сохранены в {args.baseline}")
+        return 0
+
+    if not args.baseline.exists():
+        print(f"Нет базовых значений {args.baseline}, сохраните их ключом --save")
+        return 0
+    regressions = compare(results, json.loads(args.baseline.read_text()), args.threshold)
+    for regression in regressions:
+        print(f"Замедление: {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
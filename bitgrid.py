@@ -0,0 +1,257 @@
+"""
+Двухцветная сетка, упакованная по 8 клеток в байт
+- строка сетки - ceil(w / 8) байт, клетка c - бит c % 8 байта c // 8 (младший бит первый), биты за шириной нули
+- сдвиги к соседям, подсчёт соседей, число единиц и сравнение сеток выполняются над байтами без распаковки
+- txt/csv из двух символов разбираются сразу в упакованный вид, файл читается через mmap полосами строк,
+  в памяти остаётся только упакованная сетка: 10^9 клеток - 125 МБ
+"""
+import mmap
+from pathlib import Path
+
+import numpy as np
+
+from neighbourhood import check_connectivity
+
+PACK_BLOCK_BYTES = 1 << 24      # сколько байт текста разбирается за раз
+POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)  # POPCOUNT[byte] - число единичных битов
+_NEWLINE, _RETURN, _QUOTE = ord('\n'), ord('\r'), ord('"')
+
+
+def pack_rows(board: np.ndarray, row_bytes: int = None) -> np.ndarray:
+    """
+    Булево поле (h, w) -> байты (h, row_bytes), клетка c - бит c % 8 байта c // 8
+    :param row_bytes: длина строки в байтах, не меньше ceil(w / 8); лишние байты нулевые
+    """
+    board = np.asarray(board, dtype=bool)
+    bits = np.packbits(board, axis=1, bitorder='little')
+    if row_bytes is None or row_bytes == bits.shape[1]:
+        return bits
+    padded = np.zeros((board.shape[0], row_bytes), dtype=np.uint8)
+    padded[:, :bits.shape[1]] = bits
+    return padded
+
+
+def unpack_rows(bits: np.ndarray, width: int) -> np.ndarray:
+    """ Байты строк (..., n) -> булевы клетки (..., width) """
+    return np.unpackbits(bits, axis=-1, count=width, bitorder='little').view(bool)
+
+
+def _byte_shift(bits: np.ndarray, offset: int) -> np.ndarray:
+    """ result[:, i] = bits[:, i + offset], за краем нули """
+    result = np.zeros_like(bits)
+    width = bits.shape[1]
+    if offset >= 0:
+        result[:, :max(width - offset, 0)] = bits[:, offset:]
+    else:
+        result[:, -offset:] = bits[:, :max(width + offset, 0)]
+    return result
+
+
+class BitGrid:
+    """
+    Булева сетка формы shape, упакованная в байты bits (h, ceil(w / 8)).
+    Биты за шириной сетки всегда нули, поэтому одинаковые сетки имеют одинаковые байты
+    """
+    __slots__ = ('shape', 'bits')
+
+    def __init__(self, shape: tuple[int, int], bits: np.ndarray):
+        self.shape = (int(shape[0]), int(shape[1]))
+        self.bits = np.asarray(bits, dtype=np.uint8)
+
+    @classmethod
+    def from_dense(cls, board: np.ndarray) -> 'BitGrid':
+        board = np.asarray(board, dtype=bool)
+        return cls(board.shape, pack_rows(board))
+
+    @classmethod
+    def zeros(cls, shape: tuple[int, int]) -> 'BitGrid':
+        return cls(shape, np.zeros((shape[0], -(-shape[1] // 8)), dtype=np.uint8))
+
+    def to_dense(self) -> np.ndarray:
+        return unpack_rows(self.bits, self.shape[1])
+
+    def row(self, index: int) -> np.ndarray:
+        return unpack_rows(self.bits[index], self.shape[1])
+
+    def __getitem__(self, cell: tuple[int, int]) -> bool:
+        row = range(self.shape[0])[cell[0]]
+        col = range(self.shape[1])[cell[1]]
+        return bool(self.bits[row, col >> 3] >> (col & 7) & 1)
+
+    @property
+    def _tail_mask(self) -> np.ndarray:
+        """ Маска значимых битов байтов строки """
+        return np.packbits(np.ones(self.shape[1], dtype=bool), bitorder='little')
+
+    @property
+    def nbytes(self) -> int:
+        return self.bits.nbytes
+
+    def count(self) -> int:
+        """ Число единичных клеток """
+        return int(POPCOUNT[self.bits].sum(dtype=np.int64))
+
+    def row_counts(self) -> np.ndarray:
+        return POPCOUNT[self.bits].sum(axis=1, dtype=np.int64)
+
+    def diff_count(self, other: 'BitGrid') -> int:
+        """ Число клеток, различающихся в двух сетках """
+        return (self ^ other).count()
+
+    def _check(self, other: 'BitGrid') -> None:
+        if self.shape != other.shape:
+            raise ValueError(f"Размеры сеток не совпадают: {self.shape} и {other.shape}")
+
+    def __and__(self, other: 'BitGrid') -> 'BitGrid':
+        self._check(other)
+        return BitGrid(self.shape, self.bits & other.bits)
+
+    def __or__(self, other: 'BitGrid') -> 'BitGrid':
+        self._check(other)
+        return BitGrid(self.shape, self.bits | other.bits)
+
+    def __xor__(self, other: 'BitGrid') -> 'BitGrid':
+        self._check(other)
+        return BitGrid(self.shape, self.bits ^ other.bits)
+
+    def __invert__(self) -> 'BitGrid':
+        return BitGrid(self.shape, ~self.bits & self._tail_mask)
+
+    def __eq__(self, other):
+        if not isinstance(other, BitGrid):
+            return NotImplemented
+        return self.shape == other.shape and np.array_equal(self.bits, other.bits)
+
+    def __repr__(self):
+        return f"BitGrid(shape={self.shape}, count={self.count()})"
+
+    def shift(self, drow: int, dcol: int) -> 'BitGrid':
+        """
+        Сетка соседей: в клетке (r, c) значение клетки (r + drow, c + dcol), за краем сетки нули
+        """
+        height = self.shape[0]
+        rows = np.zeros_like(self.bits)
+        if abs(drow) < height:
+            if drow >= 0:
+                rows[:height - drow] = self.bits[drow:]
+            else:
+                rows[-drow:] = self.bits[:height + drow]
+        if not dcol:
+            return BitGrid(self.shape, rows)
+
+        whole, bit = divmod(abs(dcol), 8)
+        if dcol > 0:    # строка - little-endian число, сосед справа - сдвиг вправо
+            result = _byte_shift(rows, whole) >> np.uint8(bit)
+            if bit:
+                result |= _byte_shift(rows, whole + 1) << np.uint8(8 - bit)
+        else:
+            result = _byte_shift(rows, -whole) << np.uint8(bit)
+            if bit:
+                result |= _byte_shift(rows, -whole - 1) >> np.uint8(8 - bit)
+        return BitGrid(self.shape, result & self._tail_mask)
+
+    def neighbour_count(self, connectivity: int = 8) -> np.ndarray:
+        """
+        Число соседей-единиц каждой клетки (h, w) uint8.
+        Соседи складываются побитовым счётчиком в четырёх упакованных плоскостях, распаковывается только результат
+        """
+        check_connectivity(connectivity)
+        offsets = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+        if connectivity == 8:
+            offsets += [(-1, -1), (-1, 1), (1, -1), (1, 1)]
+        planes = [np.zeros_like(self.bits) for _ in range(4)]
+        for drow, dcol in offsets:
+            carry = self.shift(drow, dcol).bits
+            for plane in planes:
+                plane ^= carry
+                carry = carry & ~plane     # перенос был, если после сложения бит стал нулём
+                if not carry.any():
+                    break
+        counts = np.zeros(self.shape, dtype=np.uint8)
+        for power, plane in enumerate(planes):
+            counts |= BitGrid(self.shape, plane).to_dense().view(np.uint8) << np.uint8(power)
+        return counts
+
+
+def pack_text(data: bytes | np.ndarray, separator: bytes = b'') -> tuple[BitGrid, list[str]] | None:
+    """
+    Разбор текстовой сетки из одного-двух ASCII символов сразу в упакованный вид
+    :param data: байты txt (строки одинаковой длины) или csv (separator=b',', клетки по одному символу)
+    :return: (сетка, отсортированные символы), единица - symbols[1]; None, если сетку упаковать нельзя
+             (больше двух символов, строки разной длины, не ASCII) - тогда нужен обычный разбор
+    """
+    data = np.frombuffer(data, dtype=np.uint8) if isinstance(data, bytes) else data
+    if not len(data):
+        return None
+    line_end, window = len(data), PACK_BLOCK_BYTES
+    while True:     # конец первой строки: окно поиска растёт, чтобы не сканировать весь файл
+        newlines = np.flatnonzero(data[:window] == _NEWLINE)
+        if len(newlines) or window >= len(data):
+            line_end = int(newlines[0]) if len(newlines) else line_end
+            break
+        window *= 2
+    crlf = bool(line_end > 0 and data[line_end - 1] == _RETURN)
+    line = line_end - crlf
+    stride = line_end + 1
+    if separator:
+        if line % 2 == 0 or _QUOTE in data[:line]:
+            return None
+        width = (line + 1) // 2
+    else:
+        width = line
+    if not width:
+        return None
+
+    full_rows = len(data) // stride
+    tail = data[full_rows * stride:]
+    if len(tail) not in (0, line):
+        return None
+    height = full_rows + bool(len(tail))
+    block = max(1, PACK_BLOCK_BYTES // stride)
+
+    def blocks():
+        for start in range(0, full_rows, block):
+            rows = data[start * stride:min(start + block, full_rows) * stride].reshape(-1, stride)
+            yield rows, rows[:, line:]
+        if len(tail):
+            yield tail.reshape(1, -1), None
+
+    # первый проход: проверка формата и гистограмма символов
+    terminator = np.frombuffer(b'\r\n' if crlf else b'\n', dtype=np.uint8)
+    histogram = np.zeros(256, dtype=np.int64)
+    for rows, ends in blocks():
+        if ends is not None and not (ends == terminator).all():
+            return None
+        if separator and not (rows[:, 1:line:2] == separator[0]).all():
+            return None
+        histogram += np.bincount(rows[:, :line:2 if separator else 1].ravel(), minlength=256)
+    present = np.flatnonzero(histogram)
+    if len(present) > 2 or present[-1] >= 128 or {_NEWLINE, _RETURN, _QUOTE} & set(present.tolist()):
+        return None
+    symbols = [chr(symbol) for symbol in present]
+    if len(present) == 1:
+        return BitGrid.zeros((height, width)), symbols
+
+    # второй проход: упаковка
+    bits = np.empty((height, -(-width // 8)), dtype=np.uint8)
+    row = 0
+    for rows, _ in blocks():
+        cells = rows[:, :line:2 if separator else 1] == present[1]
+        bits[row:row + len(rows)] = pack_rows(cells)
+        row += len(rows)
+    return BitGrid((height, width), bits), symbols
+
+
+def load_text(path: Path, separator: bytes = b'') -> tuple[BitGrid, list[str]] | None:
+    """
+    pack_text для файла: файл отображается в память и не читается целиком
+    """
+    with open(path, 'rb') as file:
+        if not Path(path).stat().st_size:
+            return None
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            view = np.frombuffer(mapped, dtype=np.uint8)
+            try:
+                return pack_text(view, separator)
+            finally:
+                del view
@@ -2,36 +2,161 @@
 Клеточная сетка типа лабиринта, поля игры "жизнь", судоку и пр. Реализация TUI.
 - Удобно читает сетку данных из файлов разных типов
 - вывод в терминале данных в терминале для визуального контроля
+- сетки из двух символов (лабиринты, поля "жизни") хранятся упакованными по 8 клеток в байт (bitgrid.BitGrid),
+  в списки строк распаковываются только при обращении к wall
 """
 import csv
+import sys
 from pathlib import Path
+from typing import Iterable, Iterator, TextIO
 
+import numpy as np
 from PIL import Image
 
+from bitgrid import BitGrid, load_text, pack_text
+from quantize import quantize
+from stats import NO_STATS, BYTES_WRITTEN
+
 type cell_type = list[list[str]]
 
+COLOR_TO_CHARS = "0123456789abcdef"     # символы, которыми кодируются цвета png
+PACKED_SEPARATORS = {'.txt': b'', '.csv': b','}     # форматы, которые читаются сразу в упакованный вид
+WRITE_BUFFER = 1 << 20  # вывод в терминал кусками примерно такого размера (символов), а не построчно
+
+
+def _write_lines(lines: Iterable[str], file: TextIO = None, stats=NO_STATS) -> None:
+    """ Вывод строк крупными кусками: один вызов write на WRITE_BUFFER символов вместо print на каждую строку """
+    file = file or sys.stdout
+
+    def write(chunk: list[str]) -> None:
+        text = '\n'.join(chunk) + '\n'
+        file.write(text)
+        if stats:
+            stats.count(BYTES_WRITTEN, len(text.encode()))
+
+    chunk, size = [], 0
+    for line in lines:
+        chunk.append(line)
+        size += len(line) + 1
+        if size >= WRITE_BUFFER:
+            write(chunk)
+            chunk, size = [], 0
+    if chunk:
+        write(chunk)
+    file.flush()
+
 
 class Walls:
-    def __init__(self, file_name: Path = None, txt: str = None):
+    _wall: cell_type | None = None
+    packed: BitGrid | None = None   # сетка из двух символов: бит 0 - symbols[0], бит 1 - symbols[1]
+    symbols: list[str] = []
 
-        self.wall: cell_type = []
+    def __init__(self, file_name: Path = None, txt: str = None, n_colors: int = None, stats=NO_STATS,
+                 pack: bool = True):
+
+        self.wall = []
         self.file_name = file_name
         self.palette = []
+        self.n_colors = n_colors    # до скольких цветов квантовать png; None - до len(COLOR_TO_CHARS)
+        self.stats = stats          # stats.Stats для замеров загрузки и вывода
+        self.pack = pack            # хранить сетки из двух символов упакованными
 
         if file_name and txt:
             raise ValueError("Должен быть указан только один параметр: file_name или txt")
 
         if file_name:
-            self.load()
+            with stats.stage("load"):
+                self.load()
         elif txt:
-            self.wall = self.load_from_str(txt)
+            with stats.stage("load"):
+                packed = pack_text(txt.encode()) if pack else None
+                if packed:
+                    self._set_packed(*packed)
+                else:
+                    self.wall = self.load_from_str(txt)
         else:
             raise ValueError("Один из параметров (file_name или txt) "
                              "должен быть указан")
 
+    @classmethod
+    def from_codes(cls, codes: np.ndarray, palette=None, symbols: list[str] = None) -> 'Walls':
+        """
+        Сетка из массива кодов (например, результата quantize.quantize)
+        :param codes: двумерный массив индексов, не больше len(COLOR_TO_CHARS) различных
+        :param palette: цвета для кодов, palette[code] -> (r, g, b)
+        :param symbols: символ каждого кода, например из get_codes; по умолчанию COLOR_TO_CHARS
+        """
+        codes = np.asarray(codes)
+        table = list(symbols) if symbols is not None else list(COLOR_TO_CHARS)
+        if codes.ndim != 2:
+            raise ValueError(f"Ожидается двумерный массив кодов, получено измерений: {codes.ndim}")
+        if codes.size and codes.max() >= len(table):
+            raise ValueError(f"Код {codes.max()} не помещается в {len(table)} символов")
+
+        walls = cls.__new__(cls)
+        walls.file_name = None
+        walls.n_colors = None
+        walls.stats = NO_STATS
+        walls.pack = True
+        walls.palette = [tuple(map(int, color)) for color in palette] if palette is not None else []
+        present = np.unique(codes)
+        if codes.size and len(present) <= 2:
+            board = codes == present[-1] if len(present) == 2 else np.zeros(codes.shape, dtype=bool)
+            walls._set_packed(BitGrid.from_dense(board), [table[code] for code in present])
+        else:
+            walls.wall = np.array(table)[codes].tolist()
+        return walls
+
+    @property
+    def wall(self) -> cell_type:
+        """
+        Сетка списком строк символов. Упакованная сетка распаковывается при первом обращении
+        и дальше хранится списками (их можно менять, например convert)
+        """
+        if self._wall is None and self.packed is not None:
+            self._wall = np.array(self.symbols)[self.packed.to_dense().view(np.uint8)].tolist()
+            self.packed = None
+        return self._wall
+
+    @wall.setter
+    def wall(self, cells: cell_type) -> None:
+        self._wall = cells
+        self.packed = None
+
+    def _set_packed(self, packed: BitGrid, symbols: list[str]) -> None:
+        self._wall = None
+        self.packed, self.symbols = packed, symbols
+
+    def _rows(self):
+        """ Строки сетки; упакованная сетка распаковывается по одной строке и остаётся упакованной """
+        if self.packed is None:
+            yield from self.wall
+            return
+        symbols = np.array(self.symbols)
+        for index in range(self.packed.shape[0]):
+            yield symbols[self.packed.row(index).view(np.uint8)].tolist()
+
     def get_cells(self) -> cell_type:
         return self.wall
 
+    def get_codes(self) -> tuple[np.ndarray, list[str]]:
+        """
+        Сетка в виде массива кодов для векторной обработки
+        :return: (коды (h, w) uint8/uint16, отсортированные символы); wall[r][c] == symbols[codes[r, c]]
+        """
+        if self.packed is not None:
+            return self.packed.to_dense().view(np.uint8), list(self.symbols)
+        if not self.wall:   # пустой файл
+            return np.zeros((0, 0), dtype=np.uint8), []
+        cells = np.array(self.wall, dtype=str)
+        if cells.dtype.itemsize == 4:   # клетки по одному символу: уникальные коды символов быстрее строк
+            symbols, codes = np.unique(cells.view(np.uint32), return_inverse=True)
+            symbols = symbols.view(cells.dtype)
+        else:
+            symbols, codes = np.unique(cells, return_inverse=True)
+        dtype = np.uint8 if len(symbols) <= 256 else np.uint16
+        return codes.reshape(len(self.wall), -1).astype(dtype), symbols.tolist()
+
     def load(self) -> None:
         load_method = {
             '.txt': self.load_from_txt,
@@ -42,12 +167,20 @@ class Walls:
         if ext not in load_method:
             raise ImportError(f"Неподдерживаемый формат файла: {ext}")
 
+        if self.pack and ext in PACKED_SEPARATORS:
+            packed = load_text(self.file_name, PACKED_SEPARATORS[ext])
+            if packed:
+                self._set_packed(*packed)
+                return
+
         self.wall = load_method[ext]()
         if not self.validate_cells():
             raise ImportError(f"Некорректные длины входных данных в файле "
                               f"{self.file_name}")
 
     def validate_cells(self):
+        if self.packed is not None:
+            return True     # упаковываются только прямоугольные сетки
         return all(len(self.wall[0]) == len(self.wall[i]) for i in range(1, len(self.wall)))
 
     def load_from_txt(self):
@@ -82,7 +215,11 @@ class Walls:
             return [list(row) for row in reader]
 
     def load_from_png(self):
-
+        """
+        Цвета кодируются символами COLOR_TO_CHARS в порядке первого появления, палитра - список цветов,
+        palette[i] - цвет символа COLOR_TO_CHARS[i].
+        Если цветов больше, чем символов (или больше n_colors), изображение квантуется
+        """
         max_png_width = 179
         max_png_height = 28
         img = Image.open(self.file_name)
@@ -91,40 +228,25 @@ class Walls:
         assert img.size[0] < max_png_width, f"Ширина {self.file_name} {img.width} > {max_png_width}"
         assert img.size[1] < max_png_height, f"Высота {self.file_name} {img.height} > {max_png_height}"
 
-        self.palette = {}
-        color_to_chars = "0123456789abcdef"
-        char_idx = 0
-        cells = [['0'] * img.width for _ in range(img.height)]
-        for row in range(img.height):
-            for col in range(img.width):
-                color = img.getpixel((col, row))
-                if color not in self.palette.values():
-                    assert char_idx < len(color_to_chars), f"Too many colors in {self.file_name}"
-                    # сохраним цвет в палитре
-                    self.palette[color_to_chars[char_idx]] = color
-                    char_idx += 1
+        n_colors = min(self.n_colors or len(COLOR_TO_CHARS), len(COLOR_TO_CHARS))
+        codes, palette = quantize(img, n_colors)
+        self.palette = [tuple(map(int, color)) for color in palette]
 
-                color_char = next(k for k, v in self.palette.items() if v == color)
-                cells[row][col] = color_char  # кодируем цвет одним из символов color_to_chars
+        return np.array(list(COLOR_TO_CHARS))[codes].tolist()
 
-        return cells
-
-    def convert(self, convert_table: dict = None):
+    def convert(self, convert_table: dict = None, default: str = None) -> 'WallsView':
         """
-        Можно разукрасить перед печатью, заменив символы на более наглядные
-        :param convert_table:
-        :return:
+        Можно разукрасить перед печатью, заменив символы на более наглядные.
+        Сама сетка не меняется: возвращается представление, которое подставляет символы при выводе
+        :param convert_table: символ -> символ для вывода
+        :param default: замена для символов, которых нет в таблице; None - оставить символ как есть
+        :return: WallsView
         """
-        convert_table = convert_table or {'0': "▮", '1': "▭"}
+        return WallsView(self, convert_table or {'0': "▮", '1': "▭"}, default)
 
-        for row in self.wall:
-            for i in range(len(row)):
-                row[i] = convert_table[row[i]]
-        return self
-
-    def print(self):
-        for row in self.wall:
-            print(' '.join(map(str, row)))
+    def print(self, file: TextIO = None):
+        with self.stats.stage("render"):
+            _write_lines((' '.join(map(str, row)) for row in self._rows()), file, self.stats)
 
     def print_color(self, palette: dict = None):
         """
@@ -139,18 +261,63 @@ class Walls:
         RESET = "\x1b[0m"
 
         palette = palette or self.palette
+        if isinstance(palette, list):   # палитра png: индекс цвета - позиция символа в COLOR_TO_CHARS
+            palette = dict(zip(COLOR_TO_CHARS, palette))
+
+        with self.stats.stage("render"):
+            for row in self._rows():
+                colored_string = ""
+                old_color = None
+                for i in range(len(row)):
+                    coded_color = row[i]
+                    color = palette[coded_color]
+                    r, g, b = color
+                    # немного избавимся от избыточности, esc-последовательности только для неповторяющихся цветов
+                    colored_string += (back_rgb(r, g, b) if color != old_color else "") + '  '
+                    old_color = color
+                print(colored_string + RESET)
+                if self.stats:
+                    self.stats.count(BYTES_WRITTEN, len((colored_string + RESET).encode()) + 1)
+
+
+class WallsView:
+    """
+    Сетка Walls, выводимая через таблицу замены символов.
+    Упакованная сетка заменяется массивом подстановок по кодам, сетка списками - словарём по каждой строке;
+    исходная сетка не копируется и не меняется, одну сетку можно выводить в разных стилях.
+    Источник строк определяется при каждом выводе: изменения сетки и её распаковка видны в представлении
+    """
+    def __init__(self, walls: Walls, convert_table: dict, default: str = None):
+        self.walls = walls
+        self.convert_table = convert_table
+        self.default = default
+
+    def _convert(self, symbol: str) -> str:
+        return self.convert_table.get(symbol, symbol if self.default is None else self.default)
+
+    def rows(self) -> Iterator[list[str]]:
+        packed = self.walls.packed
+        if packed is not None:
+            table = np.array([self._convert(symbol) for symbol in self.walls.symbols], dtype=object)
+            for index in range(packed.shape[0]):
+                yield table[packed.row(index).view(np.uint8)].tolist()
+        else:
+            for row in self.walls.wall:
+                yield [self._convert(symbol) for symbol in row]
+
+    @property
+    def wall(self) -> cell_type:
+        return list(self.rows())
+
+    def get_cells(self) -> cell_type:
+        return self.wall
+
+    def __str__(self):
+        return '\n'.join(' '.join(row) for row in self.rows())
 
-        for row in self.wall:
-            colored_string = ""
-            old_color = None
-            for i in range(len(row)):
-                coded_color = row[i]
-                color = palette[coded_color]
-                r, g, b = color
-                # немного избавимся от избыточности, esc-последовательности только для неповторяющихся цветов
-                colored_string += (back_rgb(r, g, b) if color != old_color else "") + '  '
-                old_color = color
-            print(colored_string + RESET)
+    def print(self, file: TextIO = None):
+        with self.walls.stats.stage("render"):
+            _write_lines((' '.join(row) for row in self.rows()), file, self.walls.stats)
 
 
 def main():
@@ -6,8 +6,14 @@ from pathlib import Path
 from time import sleep
 
 import colorama as co
+import numpy as np
 from PIL import Image
 
+from quantize import quantize_image
+from pyramid import estimate_image
+from regions import label_image
+from resultcache import ResultCache, NO_CACHE
+from stats import Stats, NO_STATS, PIXELS_VISITED, PIXELS_REVISITED, MAX_STACK_DEPTH, REGIONS_FOUND, BYTES_WRITTEN
 from print_ascii import make_ascii_picture, total_colors, get_background_color, get_color_from_pixel, \
     pack_rgb, back_rgb, fore_rgb
 
@@ -21,17 +27,33 @@ config.read(CONFIG_FILE)
 IMG_DIR = config["DEFAULT"]["img_dir"]
 IMG_DIR = IMG_DIR if Path(IMG_DIR).exists() and Path(IMG_DIR).is_dir() else Path(__file__).parent / IMG_DIR
 MIN_SAMPLE_SIZE = int(config["DEFAULT"].get("min_sample_size", "1000"))
+N_COLORS = int(config["DEFAULT"].get("n_colors", "0"))
+LABELING = config["DEFAULT"].get("labeling", "fill")
+CONNECTIVITY = int(config["DEFAULT"].get("connectivity", "4"))
+STATS = config["DEFAULT"].getboolean("stats", False)
+PROFILE = config["DEFAULT"].getboolean("profile", False)
+RESULT_CACHE_DIR = config["DEFAULT"].get("result_cache_dir", "")
+RESULT_CACHE_MB = int(config["DEFAULT"].get("result_cache_mb", "256"))
+DAEMON_SOCKET = config["DEFAULT"].get("daemon_socket", "")
+PYRAMID_TOLERANCE = float(config["DEFAULT"].get("pyramid_tolerance", "0.1"))
 img_name = config["DEFAULT"]["img_name"]
 assert (Path(IMG_DIR) / img_name).exists(), f"Файл {img_name} не найден"
 
+run_stats = Stats(profile=PROFILE, memory=PROFILE) if STATS or PROFILE else NO_STATS
+result_cache = ResultCache(RESULT_CACHE_DIR, RESULT_CACHE_MB * 1024 * 1024) if RESULT_CACHE_DIR else NO_CACHE
+
 co.just_fix_windows_console()
 print(co.ansi.clear_screen() + pos(1, 1))
 
-img = Image.open(Path(IMG_DIR) / img_name)
-print(make_ascii_picture(img))
-colors = total_colors(img)
+with run_stats.stage("load"):
+    img = Image.open(Path(IMG_DIR) / img_name)
+    img.load()
+    if N_COLORS:    # многоцветные изображения сводим к N_COLORS цветам, иначе каждый оттенок - своя область
+        img = quantize_image(img, N_COLORS, result_cache=result_cache)
+print(make_ascii_picture(img, stats=run_stats))
+colors = total_colors(img, stats=run_stats, result_cache=result_cache)
 print(f"Всего цветов : {len(colors)} " + ''.join([back_rgb(*bg) + "  " for bg in colors]) + co.Back.RESET)
-bg_color = get_background_color(img)
+bg_color = get_background_color(img, stats=run_stats, result_cache=result_cache)
 r, g, b = list(map(int, bg_color))
 print(f"Цвет фона    : {back_rgb(r, g, b)}  {co.Back.RESET} #{r:02x}{g:02x}{b:02x}")
 
@@ -40,7 +62,10 @@ def print_char_xy(x: int, y: int, char: str):
     b_c = get_color_from_pixel(img, (y-1, x-1))     # same background color
     f_c = tuple(255 - v for v in b_c)   # inverse colors
 
-    print(pos(x + 1, y * 2 - 1) + back_rgb(*b_c) + fore_rgb(*f_c) + char + "\x1b[0m" + pos(24, 1), end="", flush=True)
+    out = pos(x + 1, y * 2 - 1) + back_rgb(*b_c) + fore_rgb(*f_c) + char + "\x1b[0m" + pos(24, 1)
+    print(out, end="", flush=True)
+    if run_stats:
+        run_stats.count(BYTES_WRITTEN, len(out.encode()))
     if __debug__:
         sleep(0.01)
 
@@ -61,20 +86,70 @@ def check_around(x: int, y: int):
 
     if check(x, y):
         stack.append((x, y))
+        if run_stats:
+            run_stats.maximum(MAX_STACK_DEPTH, len(stack))
         checked_append((x, y))
 
 
 def checked_append(xy: tuple):
     if __debug__:
         sleep(0.1)
+    if run_stats:
+        run_stats.count(PIXELS_VISITED)
     if xy not in checked:
         checked.append(xy)
     else:
+        if run_stats:
+            run_stats.count(PIXELS_REVISITED)
         print_char_xy(xy[1] + 1, xy[0] + 1, "? ")
         if __debug__:
             sleep(1)
 
 
+def print_regions_by_color():
+    """ Разметка отдельно по цветам за один проход, без пошаговой анимации заливки """
+    labeling = None
+    if DAEMON_SOCKET:
+        from daemon import LabelClient     # Unix-сокеты есть не на всех системах
+        try:
+            with LabelClient(DAEMON_SOCKET) as client:
+                # неквантованное изображение сервис читает сам по пути и кэширует по времени изменения файла
+                labeling = client.label(img if N_COLORS else Path(IMG_DIR) / img_name, CONNECTIVITY, bg_color)
+        except OSError:     # сервис не запущен - размечаем сами
+            pass
+    if labeling is None:
+        labeling = label_image(img, CONNECTIVITY, bg_color, stats=run_stats, result_cache=result_cache)
+    for color, ids in labeling.by_color.items():
+        print(f"{back_rgb(*color)}  {co.Back.RESET} областей: {len(ids)}")
+    print(f"Всего областей: {labeling.count}")
+
+
+def print_region_estimate():
+    """ Приблизительный подсчёт областей по пирамиде изображения - для быстрой оценки больших изображений """
+    estimate = estimate_image(img, CONNECTIVITY, bg_color, tolerance=PYRAMID_TOLERANCE, stats=run_stats)
+    kind = "точно" if estimate.exact else f"оценка по уровню {estimate.level}"
+    print(f"Всего областей ({kind}): {estimate.count}")
+    for index in np.argsort(-estimate.areas, kind='stable')[:5].tolist():
+        x, y, width, height = estimate.boxes[index].tolist()
+        print(f"  область {index + 1}: ~{estimate.areas[index]} пикселей, x={x} y={y} {width}×{height}")
+
+
+def print_stats():
+    if run_stats:
+        print(run_stats.report())
+        if PROFILE:
+            print(run_stats.profile_report())
+
+
+if LABELING in ("per_color", "pyramid"):
+    if LABELING == "per_color":
+        print_regions_by_color()
+    else:
+        print_region_estimate()
+    print_stats()
+    print("Done.")
+    raise SystemExit
+
 pixels_count = img.width * img.height
 pixel_processed = 1
 regions = {}
@@ -84,34 +159,38 @@ checked = []
 correct_append = True
 x = y = 0
 stack = []
-while len(checked) < pixels_count:
-    if (x, y) not in checked:
-        cur_color = get_color_from_pixel(img, (x, y))  # ищем первую и следующую область
-        checked_append((x, y))
-        if cur_color != bg_color:
-            colors.append(cur_color)
-            region_index += 1     # start with 1?
-            regions[region_index] = []  # сюда мы будем сохранять координаты точек в каждой области
-            stack.append((x, y))
-        else:
-            print_char_xy(y + 1, x + 1, "· ")
-    while stack:    # Область найдена, заливаем пока не зальем полностью
-        c, r = stack.pop()
-        regions[region_index].append((c, r))
-        print_char_xy(r + 1, c + 1, "+ ")
-
-        check_around(c - 1, r)
-        check_around(c + 1, r)
-        check_around(c, r - 1)
-        check_around(c, r + 1)
-
-    x += 1
-    if x == img.width:
-        x = 0
-        y += 1
+with run_stats.stage("fill"):
+    while len(checked) < pixels_count:
+        if (x, y) not in checked:
+            cur_color = get_color_from_pixel(img, (x, y))  # ищем первую и следующую область
+            checked_append((x, y))
+            if cur_color != bg_color:
+                colors.append(cur_color)
+                region_index += 1     # start with 1?
+                if run_stats:
+                    run_stats.count(REGIONS_FOUND)
+                regions[region_index] = []  # сюда мы будем сохранять координаты точек в каждой области
+                stack.append((x, y))
+            else:
+                print_char_xy(y + 1, x + 1, "· ")
+        while stack:    # Область найдена, заливаем пока не зальем полностью
+            c, r = stack.pop()
+            regions[region_index].append((c, r))
+            print_char_xy(r + 1, c + 1, "+ ")
+
+            check_around(c - 1, r)
+            check_around(c + 1, r)
+            check_around(c, r - 1)
+            check_around(c, r + 1)
+
+        x += 1
+        if x == img.width:
+            x = 0
+            y += 1
 
 print(pos(24, 1))
 assert len(checked) == len(set(checked))
+print_stats()
 print("Done.")
 
 
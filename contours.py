@@ -0,0 +1,259 @@
+"""
+Контуры областей по карте номеров (regions.Labeling.labels) - полигоны с дырами вместо списка всех пикселей
+- границы строятся по трещинам между пикселями (crack following): каждая сторона пикселя на границе области
+  становится ребром, рёбра одной области сцепляются в кольца
+- сцепка и упорядочивание вершин векторные (numpy), вершины на прямых участках отбрасываются,
+  дополнительно контур можно упростить Дугласом-Пекером
+- полигоны потоково пишутся в SVG или GeoJSON
+
+Координаты вершин - углы пикселей (x = столбец, y = строка), ось y направлена вниз.
+Внешние кольца обходятся по часовой стрелке на экране (площадь по формуле шнурков положительна), дыры - против
+"""
+import json
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, TextIO
+
+import numpy as np
+
+from print_ascii import unpack_rgb
+from neighbourhood import check_connectivity
+from regions import union_roots
+
+# направления рёбер: вправо, вниз, влево, вверх (поворот направо на экране - следующее направление)
+STEPS = np.array([[1, 0], [0, 1], [-1, 0], [0, -1]])
+
+
+@dataclass
+class Polygon:
+    region: int                 # номер области в карте
+    color: int                  # код (цвет) области
+    exterior: np.ndarray        # внешнее кольцо (n, 2), x, y; последняя вершина не повторяет первую
+    holes: list[np.ndarray] = field(default_factory=list)
+
+    @property
+    def vertex_count(self) -> int:
+        return len(self.exterior) + sum(len(hole) for hole in self.holes)
+
+    @property
+    def area(self) -> float:
+        return ring_area(self.exterior) + sum(ring_area(hole) for hole in self.holes)
+
+
+def ring_area(ring: np.ndarray) -> float:
+    """
+    Площадь кольца со знаком (формула шнурков): внешнее кольцо > 0, дыра < 0
+    """
+    x, y = ring[:, 0].astype(np.float64), ring[:, 1].astype(np.float64)
+    return float((x * np.roll(y, -1) - np.roll(x, -1) * y).sum() / 2)
+
+
+def _crack_edges(labels: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Все рёбра границ областей (номер > 0), область справа по ходу обхода
+    :return: (область, начальная вершина x, y, направление) для каждого ребра
+    """
+    padded = np.pad(labels, 1)
+    inner = padded[1:-1, 1:-1]
+    neighbours = (padded[:-2, 1:-1], padded[1:-1, 2:], padded[2:, 1:-1], padded[1:-1, :-2])  # верх, право, низ, лево
+    # начало ребра относительно левого верхнего угла пикселя для каждой стороны
+    offsets = ((0, 0), (1, 0), (1, 1), (0, 1))
+
+    regions, xs, ys, directions = [], [], [], []
+    for direction, (neighbour, (dx, dy)) in enumerate(zip(neighbours, offsets)):
+        rows, cols = np.nonzero((inner > 0) & (inner != neighbour))
+        regions.append(inner[rows, cols])
+        xs.append(cols + dx)
+        ys.append(rows + dy)
+        directions.append(np.full(len(rows), direction, dtype=np.int8))
+    return np.concatenate(regions), np.concatenate(xs), np.concatenate(ys), np.concatenate(directions)
+
+
+def _next_edges(keys_start: np.ndarray, keys_end: np.ndarray, directions: np.ndarray, connectivity: int) -> np.ndarray:
+    """
+    Следующее ребро для каждого ребра. В вершине, где диагонально касаются два пикселя области, выходов два:
+    при 4-связности поворачиваем направо (пиксели не связаны, кольца разные), при 8-связности - налево
+    """
+    order = np.argsort(keys_start, kind='stable')
+    sorted_keys = keys_start[order]
+    first = np.searchsorted(sorted_keys, keys_end, side='left')
+    count = np.searchsorted(sorted_keys, keys_end, side='right') - first
+    following = order[first]
+    pinch = np.flatnonzero(count == 2)
+    if len(pinch):
+        turn = 1 if connectivity == 4 else 3
+        wanted = (directions[pinch] + turn) % 4
+        second = order[first[pinch] + 1]
+        following[pinch] = np.where(directions[second] == wanted, second, following[pinch])
+    return following
+
+
+def _ring_positions(following: np.ndarray, ring: np.ndarray) -> np.ndarray:
+    """
+    Позиция каждого ребра в своём кольце, считая от наименьшего ребра кольца (ранжирование списка удвоением)
+    """
+    n = len(following)
+    successor = np.where(following == ring, -1, following)     # разрываем кольцо перед его первым ребром
+    remaining = np.where(successor >= 0, 1, 0)                 # рёбер до конца разорванного списка
+    while True:
+        active = successor >= 0
+        if not active.any():
+            break
+        remaining[active] += remaining[successor[active]]
+        successor[active] = successor[successor[active]]
+    length = np.bincount(ring, minlength=n)
+    return length[ring] - 1 - remaining
+
+
+def simplify_ring(ring: np.ndarray, tolerance: float) -> np.ndarray:
+    """
+    Упрощение замкнутого кольца методом Дугласа-Пекера
+    :param tolerance: допустимое отклонение в пикселях
+    """
+    if tolerance <= 0 or len(ring) <= 4:
+        return ring
+    points = np.vstack([ring, ring[:1]]).astype(np.float64)
+    # кольцо делится на две ломаные по самой далёкой от первой вершины точке
+    far = int(np.argmax(((points - points[0]) ** 2).sum(axis=1)))
+    keep = np.zeros(len(points), dtype=bool)
+    keep[[0, far, len(points) - 1]] = True
+    stack = [(0, far), (far, len(points) - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        segment = points[end] - points[start]
+        offsets = points[start + 1:end] - points[start]
+        length = np.hypot(*segment)
+        if length:
+            distances = np.abs(segment[0] * offsets[:, 1] - segment[1] * offsets[:, 0]) / length
+        else:
+            distances = np.hypot(offsets[:, 0], offsets[:, 1])
+        worst = int(np.argmax(distances))
+        if distances[worst] > tolerance:
+            middle = start + 1 + worst
+            keep[middle] = True
+            stack += [(start, middle), (middle, end)]
+    simplified = points[:-1][keep[:-1]]
+    return simplified.astype(ring.dtype) if len(simplified) >= 3 else ring
+
+
+def _inner_point(ring: np.ndarray) -> np.ndarray:
+    """ Центр пикселя слева от первого ребра кольца, т.е. снаружи области (для дыры - внутри дыры) """
+    step = np.sign(ring[1] - ring[0])
+    return ring[0] + 0.5 * step + 0.5 * np.array([step[1], -step[0]])
+
+
+def _contains(ring: np.ndarray, point: np.ndarray) -> bool:
+    """ Точка внутри кольца (правило чёт-нечет) """
+    x, y = ring[:, 0].astype(np.float64), ring[:, 1].astype(np.float64)
+    x2, y2 = np.roll(x, -1), np.roll(y, -1)
+    crosses = (y > point[1]) != (y2 > point[1])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x_cross = x + (point[1] - y) * (x2 - x) / (y2 - y)
+    return bool(np.count_nonzero(crosses & (point[0] < x_cross)) % 2)
+
+
+def iter_polygons(labels: np.ndarray, colors: np.ndarray = None, connectivity: int = 4,
+                  tolerance: float = 0.0) -> Iterator[Polygon]:
+    """
+    Полигоны всех областей карты номеров. Область из нескольких частей (при 4-связности касающихся углами
+    пикселей) даёт несколько полигонов с одним номером
+    :param labels: карта номеров областей, 0 - фон
+    :param colors: коды областей по номерам (Labeling.colors); None - цвет равен номеру
+    :param connectivity: связность, с которой размечены области, 4 или 8
+    :param tolerance: допуск упрощения Дугласа-Пекера в пикселях; 0 - только удаление вершин на прямых
+    """
+    check_connectivity(connectivity)
+    labels = np.asarray(labels)
+    region, x, y, direction = _crack_edges(labels)
+    if not len(region):
+        return
+
+    vertices = (labels.shape[0] + 1) * (labels.shape[1] + 1)
+    start = region.astype(np.int64) * vertices + y.astype(np.int64) * (labels.shape[1] + 1) + x
+    end_xy = np.stack([x, y], axis=1) + STEPS[direction]
+    end = region.astype(np.int64) * vertices + end_xy[:, 1].astype(np.int64) * (labels.shape[1] + 1) + end_xy[:, 0]
+    following = _next_edges(start, end, direction, connectivity)
+
+    ring = union_roots(len(region), np.arange(len(region)), following)
+    position = _ring_positions(following, ring)
+
+    # вершины остаются только там, где меняется направление
+    previous = np.empty_like(following)
+    previous[following] = np.arange(len(following))
+    corner = direction != direction[previous]
+    order = np.lexsort((position, ring))
+    order = order[corner[order]]
+    ring_of_vertex = ring[order]
+    bounds = np.flatnonzero(np.diff(ring_of_vertex)) + 1
+    ring_starts = np.concatenate([[0], bounds])
+    xs, ys = x[order].astype(np.int64), y[order].astype(np.int64)
+
+    # площади всех колец сразу: следующая вершина - в том же кольце, после последней - первая
+    following_vertex = np.arange(1, len(order) + 1)
+    following_vertex[np.concatenate([bounds, [len(order)]]) - 1] = ring_starts
+    areas = np.add.reduceat(xs * ys[following_vertex] - xs[following_vertex] * ys, ring_starts)
+
+    rings = np.split(np.stack([xs, ys], axis=1), bounds)
+    ring_regions = region[order][ring_starts]
+    by_region = np.argsort(ring_regions, kind='stable')
+    region_bounds = np.flatnonzero(np.diff(ring_regions[by_region])) + 1
+
+    for ring_indexes in np.split(by_region, region_bounds):
+        region_id = int(ring_regions[ring_indexes[0]])
+        exteriors = [rings[index] for index in ring_indexes if areas[index] > 0]
+        holes = [rings[index] for index in ring_indexes if areas[index] < 0]
+        color = int(colors[region_id]) if colors is not None else region_id
+        polygons = [Polygon(region_id, color, exterior) for exterior in exteriors]
+        for hole in holes:
+            probe = _inner_point(hole)
+            owner = next((polygon for polygon in polygons if _contains(polygon.exterior, probe)), polygons[0])
+            owner.holes.append(simplify_ring(hole, tolerance))
+        for polygon in polygons:
+            polygon.exterior = simplify_ring(polygon.exterior, tolerance)
+        yield from polygons
+
+
+def _rgb(color: int, palette) -> tuple[int, int, int]:
+    if palette is None:
+        return unpack_rgb(color)
+    return tuple(palette[color])
+
+
+def write_svg(polygons: Iterable[Polygon], fp: TextIO, width: int, height: int, palette=None) -> int:
+    """
+    Потоковая запись полигонов в SVG, по одному элементу path на полигон, дыры - правилом evenodd
+    :param palette: код -> (r, g, b); None - коды считаются упакованными rgb (regions.label_image)
+    :return: количество записанных полигонов
+    """
+    fp.write(f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+             f'viewBox="0 0 {width} {height}">\n')
+    count = 0
+    for polygon in polygons:
+        path = ' '.join('M' + ' L'.join(f'{px} {py}' for px, py in ring.tolist()) + ' Z'
+                        for ring in [polygon.exterior, *polygon.holes])
+        r, g, b = _rgb(polygon.color, palette)
+        fp.write(f'<path d="{path}" fill="#{r:02x}{g:02x}{b:02x}" fill-rule="evenodd" '
+                 f'data-region="{polygon.region}"/>\n')
+        count += 1
+    fp.write('</svg>\n')
+    return count
+
+
+def write_geojson(polygons: Iterable[Polygon], fp: TextIO) -> int:
+    """
+    Потоковая запись полигонов в GeoJSON FeatureCollection, координаты в пикселях.
+    Кольца замыкаются повтором первой вершины
+    :return: количество записанных полигонов
+    """
+    fp.write('{"type": "FeatureCollection", "features": [\n')
+    count = 0
+    for polygon in polygons:
+        rings = [np.vstack([ring, ring[:1]]).tolist() for ring in [polygon.exterior, *polygon.holes]]
+        feature = {"type": "Feature",
+                   "properties": {"region": polygon.region, "color": polygon.color},
+                   "geometry": {"type": "Polygon", "coordinates": rings}}
+        fp.write((',\n' if count else '') + json.dumps(feature))
+        count += 1
+    fp.write('\n]}\n')
+    return count
@@ -0,0 +1,371 @@
+"""
+Долгоживущий локальный сервис разметки: запуск интерпретатора, импорт Pillow и NumPy и прогрев выполняются
+один раз, а не при каждом запуске color_ranges.py
+- клиенты подключаются через Unix-сокет и присылают запросы label, background, histogram для пути к файлу,
+  байтов файла изображения или готового RGB-массива; соединение можно использовать для многих запросов
+- маленькие изображения (до inline_pixels) обрабатываются прямо в потоке соединения, большие - в пуле
+  заранее запущенных и прогретых процессов
+- результаты хранятся в resultcache.MemoryCache; для путей ключ - путь, время изменения и размер файла,
+  поэтому повторный запрос к неизменившемуся файлу не читает его
+
+Сообщение в обе стороны - кадры с длиной (8 байт, big-endian): заголовок JSON, затем по кадру на каждый
+массив из списка заголовка "arrays" ([имя, dtype, форма]). В ответе заголовок {"ok": true, "cached": ...}
+или {"ok": false, "error": тип исключения, "message": текст}. Длина кадра проверяется до выделения памяти:
+кадр больше max_frame_bytes отклоняется ошибкой ValueError, и сервис закрывает соединение
+
+    python daemon.py                                    # сокет DEFAULT_SOCKET, процессов по числу ядер
+    python daemon.py --socket /tmp/labels.sock --workers 4 --cache-mb 512
+"""
+import argparse
+import builtins
+import contextlib
+import io
+import json
+import os
+import socket
+import socketserver
+import struct
+import tempfile
+import threading
+from collections.abc import Sequence
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from print_ascii import get_background_color, pack_rgb, unpack_rgb
+from quantize import to_rgb_array, pack_pixels, unpack_pixels
+from regions import Labeling, label, index_by_color
+from resultcache import MemoryCache, DEFAULT_MAX_BYTES, content_key
+from stats import NO_STATS
+
+# сокет по умолчанию - в папке пользователя с правами 0700: в общем tempdir чужой процесс мог бы занять путь
+DEFAULT_SOCKET = Path(os.environ.get("XDG_RUNTIME_DIR") or
+                      Path(tempfile.gettempdir()) / f"color_ranges-{os.getuid()}") / "color_ranges.sock"
+INLINE_PIXELS = 512 * 512   # изображения не больше этого обрабатываются без передачи в процесс пула
+MAX_FRAME_BYTES = 1 << 30   # наибольший принимаемый кадр (RGB 16384 × 16384 - 768 МБ)
+OPERATIONS = ("label", "background", "histogram")
+REQUESTS = "requests"
+CACHE_HITS = "cache_hits"
+
+_LENGTH = struct.Struct('!Q')
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytearray | None:
+    """ Ровно size байт; None - соединение закрыто до первого байта """
+    if not size:
+        return bytearray()
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        count = sock.recv_into(view[received:])
+        if not count:
+            if received:
+                raise ConnectionError(f"Соединение закрыто посреди кадра: получено {received} из {size} байт")
+            return None
+        received += count
+    return buffer
+
+
+def send_message(sock: socket.socket, header: dict, arrays: dict[str, np.ndarray] = None) -> None:
+    """
+    Отправка заголовка и массивов одним вызовом sendall
+    """
+    arrays = {name: np.ascontiguousarray(array) for name, array in (arrays or {}).items()}
+    header = dict(header, arrays=[[name, array.dtype.str, list(array.shape)] for name, array in arrays.items()])
+    data = json.dumps(header).encode()
+    parts = [_LENGTH.pack(len(data)), data]
+    for array in arrays.values():
+        parts += [_LENGTH.pack(array.nbytes), array.data.cast('B') if array.nbytes else b'']
+    sock.sendall(b''.join(parts))
+
+
+def _recv_frame(sock: socket.socket, max_bytes: int, first: bool = False) -> bytearray | None:
+    """
+    :param max_bytes: предел длины кадра - длине от собеседника не доверяем, пока не сравним с пределом
+    :param first: первый кадр сообщения - закрытие соединения перед ним не ошибка, возвращается None
+    """
+    length = _recv_exact(sock, _LENGTH.size)
+    if length is not None and (size := _LENGTH.unpack(length)[0]) > max_bytes:
+        raise ValueError(f"Кадр {size} байт больше предела {max_bytes} байт")
+    data = None if length is None else _recv_exact(sock, size)
+    if data is None and not (first and length is None):
+        raise ConnectionError("Соединение закрыто посреди сообщения")
+    return data
+
+
+def recv_message(sock: socket.socket,
+                 max_frame_bytes: int = MAX_FRAME_BYTES) -> tuple[dict, dict[str, np.ndarray]] | None:
+    """
+    :param max_frame_bytes: предел длины каждого кадра; длиннее - ValueError, остаток сообщения не читается
+    :return: (заголовок, массивы по именам) или None, если собеседник закрыл соединение
+    """
+    header = _recv_frame(sock, max_frame_bytes, first=True)
+    if header is None:
+        return None
+    header = json.loads(header)
+    arrays = {}
+    for name, dtype, shape in header.pop('arrays', []):
+        arrays[name] = np.frombuffer(_recv_frame(sock, max_frame_bytes), dtype=dtype).reshape(shape)
+    return header, arrays
+
+
+def _check_private(directory: Path) -> None:
+    """ Папка сокета по умолчанию должна принадлежать пользователю и быть закрыта для остальных """
+    info = directory.stat()
+    if info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise PermissionError(f"Папка сокета {directory} должна принадлежать пользователю и иметь права 0700")
+
+
+def _load(source: Path | bytes | np.ndarray) -> np.ndarray:
+    """ RGB-массив (h, w, 3) из пути, байтов файла изображения или массива """
+    if isinstance(source, np.ndarray):
+        return to_rgb_array(source)
+    with Image.open(io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else source) as image:
+        return to_rgb_array(image)
+
+
+def execute(operation: str, source: Path | bytes | np.ndarray, connectivity: int = 4,
+            background: list[int] | str | None = None) -> dict[str, np.ndarray]:
+    """
+    Выполнение запроса без кэша (в потоке соединения или в процессе пула)
+    :param background: для label - цвет фона [r, g, b], "auto" - самый частый цвет, None - без фона
+    :return: label - labels, colors (упакованные rgb, colors[0] - фон); background - color; histogram - colors, counts
+    """
+    rgb = _load(source)
+    if operation == "label":
+        if background == "auto":
+            background = get_background_color(rgb)
+        result = label(pack_pixels(rgb), connectivity, pack_rgb(background) if background is not None else None)
+        return {'labels': result.labels, 'colors': result.colors}
+    if operation == "background":
+        return {'color': np.array(get_background_color(rgb), dtype=np.uint8)}
+    if operation == "histogram":
+        # как print_ascii.color_histogram, но unique по упакованным кодам, а не по строкам (n, 3)
+        colors, counts = np.unique(pack_pixels(rgb), return_counts=True)
+        return {'colors': unpack_pixels(colors), 'counts': counts}
+    raise ValueError(f"Неизвестный запрос {operation!r}, ожидается один из {OPERATIONS}")
+
+
+def _warm_up() -> None:
+    """ Первый вызов в процессе пула: импорты уже выполнены, прогреваются пути кода разметки """
+    tiny = np.zeros((2, 2, 3), dtype=np.uint8)
+    for operation in OPERATIONS:
+        execute(operation, tiny, background="auto")
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        daemon = self.server.daemon
+        try:
+            while (message := recv_message(self.request, daemon.max_frame_bytes)) is not None:
+                send_message(self.request, *daemon.respond(*message))
+        except ValueError as error:     # кадр больше предела или испорченный заголовок: поток кадров не восстановить
+            with contextlib.suppress(OSError):
+                send_message(self.request, {'ok': False, 'error': 'ValueError', 'message': str(error)})
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class LabelDaemon:
+    def __init__(self, socket_path: Path = DEFAULT_SOCKET, workers: int = None,
+                 cache_bytes: int = DEFAULT_MAX_BYTES, inline_pixels: int = INLINE_PIXELS,
+                 max_frame_bytes: int = MAX_FRAME_BYTES, stats=NO_STATS):
+        """
+        :param socket_path: путь Unix-сокета; оставшийся от прежнего запуска файл сокета удаляется.
+                            Отсутствующая папка создаётся с правами 0700
+        :param workers: процессов пула, по умолчанию по числу ядер; 0 - всё в потоках соединений
+        :param cache_bytes: предел кэша результатов в памяти
+        :param inline_pixels: изображения не больше этого обрабатываются в потоке соединения
+        :param max_frame_bytes: предел кадра запроса; соединение с кадром длиннее закрывается
+        :param stats: stats.Stats для счётчиков запросов и попаданий в кэш
+        """
+        self.socket_path = Path(socket_path)
+        self.socket_path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        if self.socket_path == DEFAULT_SOCKET:
+            _check_private(self.socket_path.parent)
+        self.cache = MemoryCache(cache_bytes)
+        self.inline_pixels = inline_pixels
+        self.max_frame_bytes = max_frame_bytes
+        self.stats = stats
+        self._lock = threading.Lock()
+        self.executor = None
+        if workers is None:
+            workers = os.cpu_count() or 1
+        if workers:
+            # процессы запускаются и прогреваются сразу, пока в процессе нет других потоков
+            self.executor = ProcessPoolExecutor(workers, initializer=_warm_up)
+            for future in [self.executor.submit(int) for _ in range(workers)]:
+                future.result()
+        _warm_up()     # маленькие изображения обрабатываются в этом процессе
+        self.socket_path.unlink(missing_ok=True)
+        self.server = _Server(str(self.socket_path), _Handler)
+        self.server.daemon = self
+        self._thread = None
+
+    def _key(self, operation: str, source, params: tuple) -> str:
+        if isinstance(source, Path):
+            stat = source.stat()
+            source = np.frombuffer(f"{source.resolve()}|{stat.st_mtime_ns}|{stat.st_size}".encode(), dtype=np.uint8)
+        return content_key(operation, source, params)
+
+    def _pixels(self, source) -> int:
+        if isinstance(source, np.ndarray):
+            return source.size // 3
+        with Image.open(io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else source) as image:
+            return image.width * image.height     # только заголовок файла, без декодирования
+
+    def compute(self, operation: str, source, connectivity: int = 4, background=None) -> tuple[dict, bool]:
+        """
+        Результат запроса из кэша или вычисленный
+        :return: (массивы результата, взят ли из кэша)
+        """
+        if operation not in OPERATIONS:
+            raise ValueError(f"Неизвестный запрос {operation!r}, ожидается один из {OPERATIONS}")
+        params = (connectivity, background) if operation == "label" else ()
+        key = self._key(operation, source, params)
+        result = self.cache.get(key)
+        if result is not None:
+            return result, True
+        if self.executor is None or self._pixels(source) <= self.inline_pixels:
+            result = execute(operation, source, *params)
+        else:
+            result = self.executor.submit(execute, operation, source, *params).result()
+        return self.cache.put(key, result), False
+
+    def respond(self, header: dict, arrays: dict[str, np.ndarray]) -> tuple[dict, dict[str, np.ndarray]]:
+        """ Ответ на одно сообщение клиента; ошибки запроса возвращаются клиенту, а не обрывают соединение """
+        try:
+            if 'path' in header:
+                source = Path(header['path'])
+            elif 'pixels' in arrays:
+                source = arrays['pixels']
+            elif 'file' in arrays:
+                source = bytes(arrays['file'].data)
+            else:
+                raise ValueError("В запросе нет изображения: ожидается path, массив pixels или file")
+            background = header.get('background')
+            result, cached = self.compute(header.get('op'), source, int(header.get('connectivity', 4)),
+                                          background if background in (None, "auto") else list(background))
+        except Exception as error:
+            return {'ok': False, 'error': type(error).__name__, 'message': str(error)}, {}
+        if self.stats:
+            with self._lock:
+                self.stats.count(REQUESTS)
+                self.stats.count(CACHE_HITS, int(cached))
+        return {'ok': True, 'cached': cached}, result
+
+    def serve_forever(self) -> None:
+        self.server.serve_forever()
+
+    def start(self) -> "LabelDaemon":
+        """ Обслуживание в фоновом потоке """
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self) -> None:
+        if self._thread is not None:
+            self.server.shutdown()
+            self._thread.join()
+        self.server.server_close()
+        self.socket_path.unlink(missing_ok=True)
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class LabelClient:
+    def __init__(self, socket_path: Path = DEFAULT_SOCKET):
+        """ Одно соединение на все запросы клиента """
+        if Path(socket_path) == DEFAULT_SOCKET:
+            _check_private(DEFAULT_SOCKET.parent)
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(str(socket_path))
+
+    def request(self, operation: str, source: Path | str | bytes | np.ndarray | Image.Image,
+                **params) -> dict[str, np.ndarray]:
+        """
+        :param source: путь к файлу (читается сервисом), байты файла изображения, RGB-массив или изображение Pillow
+        :param params: connectivity, background для label
+        Ошибка запроса поднимается тем же встроенным исключением, что и в сервисе (иначе RuntimeError)
+        """
+        header = dict(params, op=operation)
+        arrays = {}
+        if isinstance(source, (str, Path)):
+            header['path'] = str(Path(source).resolve())
+        elif isinstance(source, (bytes, bytearray)):
+            arrays['file'] = np.frombuffer(source, dtype=np.uint8)
+        else:
+            arrays['pixels'] = to_rgb_array(source)
+        send_message(self.sock, header, arrays)
+        message = recv_message(self.sock)
+        if message is None:
+            raise ConnectionError("Сервис закрыл соединение")
+        header, arrays = message
+        if not header['ok']:
+            error = getattr(builtins, header['error'], None)
+            if not (isinstance(error, type) and issubclass(error, Exception)):
+                error = RuntimeError
+            raise error(header['message'])
+        return arrays
+
+    def label(self, source, connectivity: int = 4, background: Sequence[int] | str = None) -> Labeling:
+        """
+        Как regions.label_image; background="auto" - фон определяет сервис
+        :param background: цвет фона - любая последовательность (r, g, b), в т.ч. из numpy-чисел
+        """
+        if background is not None and not isinstance(background, str):
+            background = [int(component) for component in background]
+        result = self.request("label", source, connectivity=connectivity, background=background)
+        labeling = Labeling(result['labels'], result['colors'], index_by_color(result['colors']))
+        labeling.by_color = {unpack_rgb(code): ids for code, ids in labeling.by_color.items()}
+        return labeling
+
+    def background(self, source) -> tuple[int, int, int]:
+        return tuple(map(int, self.request("background", source)['color']))
+
+    def histogram(self, source) -> tuple[np.ndarray, np.ndarray]:
+        result = self.request("histogram", source)
+        return result['colors'], result['counts']
+
+    def close(self) -> None:
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сервис разметки на Unix-сокете")
+    parser.add_argument("--socket", type=Path, default=DEFAULT_SOCKET)
+    parser.add_argument("--workers", type=int, default=None, help="процессов пула, 0 - без пула")
+    parser.add_argument("--cache-mb", type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024))
+    parser.add_argument("--max-frame-mb", type=int, default=MAX_FRAME_BYTES // (1024 * 1024),
+                        help="наибольший кадр запроса")
+    args = parser.parse_args()
+    service = LabelDaemon(args.socket, args.workers, args.cache_mb * 1024 * 1024,
+                          max_frame_bytes=args.max_frame_mb * 1024 * 1024)
+    print(f"Сервис разметки слушает {service.socket_path}")
+    try:
+        service.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+
+
+if __name__ == '__main__':
+    main()
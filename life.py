@@ -0,0 +1,175 @@
+"""
+Игра "жизнь" на сетке Walls с двумя состояниями клеток
+- поле упаковано по 64 клетки в слово uint64 (клетка c строки - бит c % 64 слова c // 64)
+- соседи считаются сразу для целых строк: сдвиги слов с переносом битов между словами и побитовые
+  сумматоры - сумма девяти клеток окрестности хранится в четырёх битовых плоскостях
+- правила в нотации B/S ("B3/S23" - классика, "B36/S23" - HighLife и т.п.)
+- края поля замкнуты в тор или за краем всегда мёртвые клетки
+"""
+import re
+
+import numpy as np
+
+from bitgrid import pack_rows, unpack_rows
+from cellsdata import Walls
+
+WORD = 64
+BLOCK_WORDS = 16384   # слов в полосе строк, обрабатываемой за раз (~128 КБ на плоскость)
+CLASSIC = "B3/S23"
+
+
+def parse_rule(rule: str) -> tuple[frozenset[int], frozenset[int]]:
+    """
+    Правило "B3/S23" или "23/3" (S/B) -> (числа соседей для рождения, числа соседей для выживания)
+    """
+    text = rule.strip().upper()
+    match = re.fullmatch(r"B([0-8]*)/S([0-8]*)", text) or re.fullmatch(r"S([0-8]*)/B([0-8]*)", text)
+    if match and text.startswith("S"):
+        survive, born = match.groups()
+    elif match:
+        born, survive = match.groups()
+    elif (match := re.fullmatch(r"([0-8]*)/([0-8]*)", text)):
+        survive, born = match.groups()
+    else:
+        raise ValueError(f"Некорректное правило: {rule}. Ожидается вида B3/S23")
+    return frozenset(map(int, born)), frozenset(map(int, survive))
+
+
+def pack(board: np.ndarray) -> np.ndarray:
+    """
+    Булево поле (h, w) -> слова (h, ceil(w / 64)) uint64
+    """
+    board = np.asarray(board, dtype=bool)
+    words = -(-board.shape[1] // WORD)
+    return pack_rows(board, words * WORD // 8).view('<u8').astype(np.uint64, copy=False)
+
+
+def unpack(words: np.ndarray, width: int) -> np.ndarray:
+    """
+    Слова (h, n) uint64 -> булево поле (h, width)
+    """
+    as_bytes = np.ascontiguousarray(words).astype('<u8', copy=False).view(np.uint8)
+    return unpack_rows(as_bytes, width)
+
+
+class Life:
+    def __init__(self, board: np.ndarray, rule: str = CLASSIC, toroidal: bool = False):
+        """
+        :param board: булево поле (h, w), True - живая клетка
+        :param rule: правило в нотации B/S
+        :param toroidal: True - края замкнуты в тор, False - за краем мёртвые клетки
+        """
+        board = np.asarray(board, dtype=bool)
+        if board.ndim != 2:
+            raise ValueError(f"Ожидается двумерное поле, получено измерений: {board.ndim}")
+        self.height, self.width = board.shape
+        self.rule = rule
+        self.born, self.survive = parse_rule(rule)
+        self.toroidal = toroidal
+        self.generation = 0
+        self.words = pack(board)
+        # маска значимых битов последнего слова строки: биты за шириной поля всегда нули
+        self._row_mask = pack(np.ones((1, self.width), dtype=bool))[0]
+        self._last_bit = np.uint64((self.width - 1) % WORD)
+
+    @classmethod
+    def from_walls(cls, walls, alive: str = '1', rule: str = CLASSIC, toroidal: bool = False) -> 'Life':
+        codes, symbols = walls.get_codes()
+        board = codes == symbols.index(alive) if alive in symbols else np.zeros(codes.shape, dtype=bool)
+        return cls(board, rule, toroidal)
+
+    def _west(self, rows: np.ndarray) -> np.ndarray:
+        """ Плоскость, где в клетке c значение клетки c - 1 (сосед слева) """
+        shifted = rows << np.uint64(1)
+        shifted[:, 1:] |= rows[:, :-1] >> np.uint64(WORD - 1)
+        if self.toroidal:
+            shifted[:, 0] |= (rows[:, -1] >> self._last_bit) & np.uint64(1)
+        return shifted
+
+    def _east(self, rows: np.ndarray) -> np.ndarray:
+        """ Плоскость, где в клетке c значение клетки c + 1 (сосед справа) """
+        shifted = rows >> np.uint64(1)
+        shifted[:, :-1] |= rows[:, 1:] << np.uint64(WORD - 1)
+        if self.toroidal:
+            shifted[:, -1] |= (rows[:, 0] & np.uint64(1)) << self._last_bit
+        return shifted
+
+    def _with_halo(self, cells: np.ndarray) -> np.ndarray:
+        """ Поле с дополнительными строками сверху и снизу: соседние строки тора или мёртвые клетки """
+        halo = np.empty((cells.shape[0] + 2, cells.shape[1]), dtype=cells.dtype)
+        halo[1:-1] = cells
+        if self.toroidal:
+            halo[0], halo[-1] = cells[-1], cells[0]
+        else:
+            halo[0] = halo[-1] = 0
+        return halo
+
+    def _next(self, rows: np.ndarray) -> np.ndarray:
+        """
+        Следующее поколение для строк rows[1:-1] (первая и последняя строки - соседи).
+        Сначала для каждой строки считается сумма тройки клеток (левая, своя, правая) двумя битовыми
+        плоскостями, затем складываются тройки строк сверху, своей и снизу - получается сумма девяти клеток
+        0..9 в четырёх плоскостях, из которой правило применяется с учётом того, что в сумму входит сама клетка
+        """
+        west, east = self._west(rows), self._east(rows)
+        odd = west ^ east
+        sum0 = odd ^ rows                       # младший бит суммы тройки
+        sum1 = (west & east) | (odd & rows)     # старший бит суммы тройки
+
+        up0, up1, row0, row1, down0, down1 = sum0[:-2], sum1[:-2], sum0[1:-1], sum1[1:-1], sum0[2:], sum1[2:]
+        cells = rows[1:-1]
+
+        # сумма трёх двухбитных чисел: биты total0..total3
+        odd = up0 ^ down0
+        total0 = odd ^ row0
+        carry = (up0 & down0) | (odd & row0)
+        first, second = up1 ^ row1, down1 ^ carry
+        total1 = first ^ second
+        high_a, high_b, high_c = up1 & row1, down1 & carry, first & second
+        total2 = high_a ^ high_b ^ high_c
+        total3 = high_a & high_b
+        planes = (total0, total1, total2, total3)
+
+        def total_equal(count: int) -> np.ndarray:
+            result = None
+            for bit, plane in enumerate(planes):
+                term = plane if count >> bit & 1 else ~plane
+                result = term if result is None else result & term
+            return result
+
+        result = np.zeros_like(cells)
+        for count in self.born:
+            result |= total_equal(count) & ~cells
+        for count in self.survive:
+            result |= total_equal(count + 1) & cells
+        return result & self._row_mask
+
+    def step(self, generations: int = 1) -> 'Life':
+        """
+        Рассчитать generations поколений.
+        Поле обрабатывается полосами строк, помещающимися в кэш процессора
+        """
+        block = max(1, BLOCK_WORDS // self.words.shape[1])
+        cells = self.words
+        for _ in range(generations):
+            halo = self._with_halo(cells)
+            cells = np.empty_like(cells)
+            for start in range(0, self.height, block):
+                end = min(start + block, self.height)
+                cells[start:end] = self._next(halo[start:end + 2])
+        self.words = cells
+        self.generation += generations
+        return self
+
+    @property
+    def population(self) -> int:
+        return int(np.unpackbits(self.words.view(np.uint8)).sum())
+
+    def to_array(self) -> np.ndarray:
+        return unpack(self.words, self.width)
+
+    def to_walls(self) -> Walls:
+        """
+        Сетка Walls: '1' - живая клетка, '0' - мёртвая
+        """
+        return Walls.from_codes(self.to_array().view(np.uint8))
@@ -0,0 +1,77 @@
+"""
+Загрузка многих сеток Walls с упреждением
+- файлы читаются и декодируются (Pillow отпускает GIL) в ограниченном пуле потоков, пока вызывающий код
+  обрабатывает уже загруженные сетки
+- сетки выдаются строго в порядке путей
+- объём данных "в полёте" (загружаемых и загруженных, но ещё не выданных) ограничен оценкой памяти
+"""
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from PIL import Image
+
+from cellsdata import Walls
+from stats import NO_STATS
+
+SUFFIXES = ('.txt', '.csv', '.png')
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+TEXT_FACTOR = 1     # упакованная или списочная сетка не меньше файла: оценка - размер файла
+PNG_FACTOR = 8      # байт на пиксель png при декодировании и квантовании
+
+
+def estimate_bytes(path: Path) -> int:
+    """
+    Оценка памяти на загрузку файла: для png по размерам из заголовка (файл не декодируется), иначе по размеру файла
+    """
+    path = Path(path)
+    try:
+        if path.suffix.lower() == '.png':
+            with Image.open(path) as image:
+                return image.width * image.height * PNG_FACTOR
+        return path.stat().st_size * TEXT_FACTOR
+    except OSError:
+        return 0    # ошибку покажет сама загрузка
+
+
+def grid_files(folder: Path, pattern: str = '*') -> list[Path]:
+    """ Файлы сеток поддерживаемых форматов в папке, по имени """
+    return sorted(path for path in Path(folder).glob(pattern) if path.suffix.lower() in SUFFIXES)
+
+
+def iter_walls(paths: Iterable[Path], workers: int = None, max_bytes: int = DEFAULT_MAX_BYTES,
+               stats=NO_STATS, **walls_args) -> Iterator[Walls]:
+    """
+    Сетки Walls для путей paths в том же порядке; следующие файлы загружаются заранее в пуле потоков
+    :param workers: число потоков, по умолчанию min(8, число ядер)
+    :param max_bytes: предел оценки памяти загружаемых и ещё не выданных сеток; один файл загружается всегда,
+                      даже если он больше предела
+    :param stats: stats.Stats - этап "load_wait" показывает время ожидания загрузки
+    :param walls_args: параметры Walls (n_colors, pack)
+    Ошибка загрузки файла поднимается, когда очередь доходит до этого файла
+    """
+    pending = iter(paths)
+    in_flight = deque()     # (future, оценка памяти)
+    used = 0
+    with ThreadPoolExecutor(workers or min(8, os.cpu_count() or 1)) as executor:
+        try:
+            while True:
+                while not in_flight or used < max_bytes:
+                    path = next(pending, None)
+                    if path is None:
+                        break
+                    size = estimate_bytes(path)
+                    in_flight.append((executor.submit(Walls, Path(path), **walls_args), size))
+                    used += size
+                if not in_flight:
+                    return
+                future, size = in_flight.popleft()
+                with stats.stage("load_wait"):
+                    walls = future.result()
+                used -= size
+                yield walls
+        finally:
+            for future, _ in in_flight:
+                future.cancel()
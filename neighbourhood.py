@@ -0,0 +1,10 @@
+"""
+Связность соседей клеток сетки (4 - по сторонам, 8 - ещё и по диагоналям), общая для разметки, контуров,
+поиска путей и упакованных сеток; модуль ни от чего не зависит, его импортируют и низкоуровневые модули
+"""
+CONNECTIVITY = (4, 8)
+
+
+def check_connectivity(connectivity: int) -> None:
+    if connectivity not in CONNECTIVITY:
+        raise ValueError(f"Связность должна быть 4 или 8, указано {connectivity}")
@@ -0,0 +1,205 @@
+"""
+Поиск путей в лабиринтах на сетке Walls (например, data/labirint.csv)
+- карта расстояний поиском в ширину сразу от одного или многих источников: фронт хранится массивом
+  плоских индексов и расширяется векторно, один шаг numpy на одно кольцо фронта.
+  Ограничение: число шагов равно наибольшему расстоянию, а не числу клеток. Широкий фронт (открытые области,
+  лабиринты "двоичного дерева" - 2000×2000 за 0.3 с) обходится быстро, а длинный коридор стоит ~10 мкс
+  на клетку: змейка 2000×2000 с путём 2·10^6 шагов - около 20 с, лабиринт 10^4×10^4 с путями
+  в десятки миллионов шагов (DFS-лабиринт, змейка) за секунды не обходится
+- расстояния до ближайшего выхода (проходимой клетки на краю) для всех клеток за один проход
+- A* для одиночных запросов
+- путь возвращается массивом координат (k, 2): (строка, столбец)
+"""
+import heapq
+from typing import Iterable
+
+import numpy as np
+
+from neighbourhood import check_connectivity
+
+type cell = tuple[int, int]     # (строка, столбец)
+
+UNREACHABLE = -1
+
+
+def passable_cells(walls, passable: str = '0') -> np.ndarray:
+    """
+    Булева маска проходимых клеток сетки Walls
+    :param passable: символ прохода
+    """
+    codes, symbols = walls.get_codes()
+    if passable not in symbols:
+        return np.zeros(codes.shape, dtype=bool)
+    return codes == symbols.index(passable)
+
+
+def _offsets(width: int, connectivity: int) -> np.ndarray:
+    check_connectivity(connectivity)
+    offsets = [-width, width, -1, 1]
+    if connectivity == 8:
+        offsets += [-width - 1, -width + 1, width - 1, width + 1]
+    return np.array(offsets, dtype=np.int64)
+
+
+def _padded(passable: np.ndarray) -> np.ndarray:
+    """ Маска с рамкой непроходимых клеток: соседи по плоскому индексу не выходят за сетку """
+    padded = np.zeros((passable.shape[0] + 2, passable.shape[1] + 2), dtype=bool)
+    padded[1:-1, 1:-1] = passable
+    return padded
+
+
+def _to_padded_flat(cells: np.ndarray, shape: tuple[int, int]) -> np.ndarray:
+    """ Плоские индексы клеток (строка, столбец) в сетке с рамкой; клетка за пределами shape - ValueError """
+    cells = np.asarray(cells, dtype=np.int64).reshape(-1, 2)
+    outside = (cells < 0).any(axis=1) | (cells[:, 0] >= shape[0]) | (cells[:, 1] >= shape[1])
+    if outside.any():
+        raise ValueError(f"Клетка {tuple(cells[outside][0].tolist())} за пределами сетки {shape[0]}×{shape[1]}")
+    return (cells[:, 0] + 1) * (shape[1] + 2) + cells[:, 1] + 1
+
+
+def distance_map(passable: np.ndarray, sources: Iterable[cell] | np.ndarray, connectivity: int = 4,
+                 stop_at: cell = None) -> np.ndarray:
+    """
+    Расстояния (в шагах) от ближайшего источника до каждой клетки, поиск в ширину сразу от всех источников
+    :param passable: булева маска проходимых клеток (h, w)
+    :param sources: источники (строка, столбец); непроходимые источники игнорируются, за пределами сетки - ValueError
+    :param connectivity: 4 или 8
+    :param stop_at: остановиться, как только будет достигнута эта клетка
+    :return: массив int32 (h, w), UNREACHABLE для недостижимых клеток
+    Время пропорционально наибольшему расстоянию (см. ограничение в описании модуля)
+    """
+    passable = np.asarray(passable, dtype=bool)
+    height, width = passable.shape
+    unvisited = _padded(passable).ravel()
+    distances = np.full(unvisited.shape, UNREACHABLE, dtype=np.int32)
+    offsets = _offsets(width + 2, connectivity)
+    owner = np.empty(unvisited.shape, dtype=np.int64)   # для отбрасывания повторов без сортировки
+    target = _to_padded_flat(stop_at, passable.shape)[0] if stop_at is not None else -1
+
+    frontier = _to_padded_flat(np.asarray(list(sources)), passable.shape)
+    frontier = np.unique(frontier[unvisited[frontier]])
+    distances[frontier] = 0
+    unvisited[frontier] = False
+    step = 0
+    while len(frontier):
+        if target >= 0 and distances[target] != UNREACHABLE:
+            break
+        step += 1
+        candidates = (frontier[:, None] + offsets).ravel()
+        candidates = candidates[unvisited[candidates]]
+        owner[candidates] = np.arange(len(candidates))
+        frontier = candidates[owner[candidates] == np.arange(len(candidates))]
+        distances[frontier] = step
+        unvisited[frontier] = False
+    return distances.reshape(height + 2, width + 2)[1:-1, 1:-1]
+
+
+def exits(passable: np.ndarray) -> np.ndarray:
+    """
+    Выходы лабиринта - проходимые клетки на краю сетки
+    :return: массив (k, 2) координат (строка, столбец)
+    """
+    border = np.zeros(passable.shape, dtype=bool)
+    border[[0, -1], :] = True
+    border[:, [0, -1]] = True
+    return np.argwhere(border & passable)
+
+
+def exit_distances(passable: np.ndarray, connectivity: int = 4) -> np.ndarray:
+    """
+    Расстояние от каждой клетки до ближайшего выхода - один проход поиска в ширину от всех выходов сразу
+    """
+    return distance_map(passable, exits(passable), connectivity)
+
+
+def path_from_distances(distances: np.ndarray, goal: cell, connectivity: int = 4) -> np.ndarray | None:
+    """
+    Путь от ближайшего источника карты расстояний до goal: от goal шагаем к соседу с расстоянием на 1 меньше
+    :return: массив (k, 2) координат от источника до goal или None, если goal недостижима
+    """
+    height, width = distances.shape
+    padded = np.full((height + 2, width + 2), UNREACHABLE, dtype=np.int32)
+    padded[1:-1, 1:-1] = distances
+    flat = padded.ravel()
+    offsets = _offsets(width + 2, connectivity)
+    current = int(_to_padded_flat(goal, distances.shape)[0])
+    if flat[current] == UNREACHABLE:
+        return None
+
+    path = np.empty(flat[current] + 1, dtype=np.int64)
+    path[-1] = current
+    for step in range(flat[current] - 1, -1, -1):
+        neighbours = current + offsets
+        current = int(neighbours[np.argmax(flat[neighbours] == step)])
+        path[step] = current
+    return np.stack(np.divmod(path, width + 2), axis=1).astype(np.int32) - 1
+
+
+def bfs_path(passable: np.ndarray, start: cell, goal: cell, connectivity: int = 4) -> np.ndarray | None:
+    """
+    Кратчайший путь поиском в ширину с остановкой при достижении goal
+    """
+    distances = distance_map(passable, [start], connectivity, stop_at=goal)
+    return path_from_distances(distances, goal, connectivity)
+
+
+def astar_path(passable: np.ndarray, start: cell, goal: cell, connectivity: int = 4) -> np.ndarray | None:
+    """
+    Кратчайший путь A*: эвристика - манхэттенское расстояние (4-связность) или расстояние Чебышёва (8-связность)
+    :return: массив (k, 2) координат от start до goal или None
+    """
+    passable = np.asarray(passable, dtype=bool)
+    height, width = passable.shape
+    open_cells = _padded(passable).ravel()
+    offsets = _offsets(width + 2, connectivity).tolist()
+    start_flat, goal_flat = _to_padded_flat([start, goal], passable.shape).tolist()
+    if not open_cells[start_flat] or not open_cells[goal_flat]:
+        return None
+
+    goal_row, goal_col = divmod(goal_flat, width + 2)
+    chebyshev = connectivity == 8
+
+    def heuristic(index: int) -> int:
+        row, col = divmod(index, width + 2)
+        dr, dc = abs(row - goal_row), abs(col - goal_col)
+        return max(dr, dc) if chebyshev else dr + dc
+
+    cost = np.full(open_cells.shape, np.iinfo(np.int32).max, dtype=np.int32)
+    came_from = np.full(open_cells.shape, -1, dtype=np.int64)
+    cost[start_flat] = 0
+    queue = [(heuristic(start_flat), 0, start_flat)]
+    while queue:
+        _, current_cost, current = heapq.heappop(queue)
+        if current == goal_flat:
+            break
+        if current_cost > cost[current]:
+            continue
+        for offset in offsets:
+            neighbour = current + offset
+            if open_cells[neighbour] and current_cost + 1 < cost[neighbour]:
+                cost[neighbour] = current_cost + 1
+                came_from[neighbour] = current
+                heapq.heappush(queue, (current_cost + 1 + heuristic(neighbour), current_cost + 1, neighbour))
+    else:
+        return None
+
+    path = [goal_flat]
+    while path[-1] != start_flat:
+        path.append(int(came_from[path[-1]]))
+    path = np.array(path[::-1], dtype=np.int64)
+    return np.stack(np.divmod(path, width + 2), axis=1).astype(np.int32) - 1
+
+
+def solve(walls, start: cell = None, goal: cell = None, passable: str = '0',
+          connectivity: int = 4) -> np.ndarray | None:
+    """
+    Путь по лабиринту Walls. По умолчанию от первого выхода до последнего (в порядке обхода по строкам)
+    """
+    cells = passable_cells(walls, passable)
+    if start is None or goal is None:
+        gates = exits(cells)
+        if len(gates) < 2:
+            return None
+        start = tuple(gates[0]) if start is None else start
+        goal = tuple(gates[-1]) if goal is None else goal
+    return bfs_path(cells, start, goal, connectivity)
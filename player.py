@@ -218,9 +218,9 @@ if __name__ == "__main__":
         actions: list[CellXY] = []
         for r, row in enumerate(small.wall):
             for c, cell in enumerate(row):
-                actions.append(CellXY(XY(c, h-r), color=small.palette[cell]))
+                actions.append(CellXY(XY(c, h-r), color=small.palette[int(cell, 16)]))
 
-        actions.append(CellXY(XY(0, h), color=small.palette['0'], sleep=3.0))
+        actions.append(CellXY(XY(0, h), color=small.palette[0], sleep=3.0))
         player = PlayerA(w, h, sleep=0.07)
         player.run(actions)
 
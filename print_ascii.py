@@ -6,6 +6,9 @@ import colorama
 from PIL import Image
 import numpy as np
 
+from resultcache import NO_CACHE
+from stats import NO_STATS
+
 type rgb_color = tuple[int, int, int]
 
 fore_rgb = lambda red, green, blue: f"\x1b[38;2;{red};{green};{blue}m"
@@ -49,12 +52,23 @@ def pack_rgb(rgb:  tuple[int, int, int]) -> int:
     return rgb[0] << 16 | rgb[1] << 8 | rgb[2]
 
 
-def get_background_color(image: Image) -> tuple[int, int, int]:
+def get_background_color(image: Image, stats=NO_STATS, result_cache=NO_CACHE) -> tuple[int, int, int]:
     """
     Возвращает цвет фона изображения. Определяется как наиболее часто встречающийся
     :param image: изображение Pillow
+    :param stats: stats.Stats для замера этапа
+    :param result_cache: resultcache.ResultCache - для уже встречавшихся изображений цвет берётся из кэша
     :return: цвет фона изображения
     """
+    with stats.stage("background"):
+        if not result_cache:
+            return _get_background_color(image)
+        entry = result_cache.fetch("background", image, (),
+                                   lambda: {'color': np.array(_get_background_color(image), dtype=np.uint8)})
+        return tuple(map(int, entry['color']))
+
+
+def _get_background_color(image: Image) -> tuple[int, int, int]:
     rgb = np.array(image).astype(np.uint32).reshape((-1, 3))
     rgb = (rgb[:, 0] << 16 |
            rgb[:, 1] << 8 |
@@ -68,14 +82,34 @@ def get_background_color(image: Image) -> tuple[int, int, int]:
     return unpack_rgb(unique[counts.argmax()])
 
 
-def total_colors(img: Image) -> set[tuple[int, int, int]]:
+def color_histogram(img: Image, result_cache=NO_CACHE) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Гистограмма цветов изображения
+    :return: (цвета (n, каналы) или (n,) для одноканальных изображений, число пикселей каждого цвета)
+    """
+    def compute():
+        pixels = np.asarray(img)
+        pixels = pixels.reshape(-1, pixels.shape[2]) if pixels.ndim == 3 else pixels.ravel()
+        colors, counts = np.unique(pixels, axis=0, return_counts=True)
+        return {'colors': colors, 'counts': counts}
+
+    entry = result_cache.fetch("histogram", img, (), compute)
+    return entry['colors'], entry['counts']
+
+
+def total_colors(img: Image, stats=NO_STATS, result_cache=NO_CACHE) -> set[tuple[int, int, int]]:
     """
     Возвращает количество цветов в изображении
+    :param result_cache: resultcache.ResultCache - цвета берутся из кэшированной гистограммы
     """
     total_color = set()
-    for x in range(img.width):
-        for y in range(img.height):
-            total_color.add(img.getpixel((x, y)))
+    with stats.stage("colors"):
+        if result_cache:
+            colors, _ = color_histogram(img, result_cache)
+            return {tuple(map(int, color)) if colors.ndim == 2 else int(color) for color in colors}
+        for x in range(img.width):
+            for y in range(img.height):
+                total_color.add(img.getpixel((x, y)))
 
     return total_color
 
@@ -84,7 +118,7 @@ def get_color_from_pixel(img, pixel):
     return img.getpixel(pixel)
 
 
-def make_ascii_picture(img, multiplexer: int = None):
+def make_ascii_picture(img, multiplexer: int = None, stats=NO_STATS):
     multiplexer = multiplexer or 2
     assert isinstance(img, Image.Image)
     assert img.mode == 'RGB'
@@ -92,17 +126,18 @@ def make_ascii_picture(img, multiplexer: int = None):
     assert img.size[1] < 28
 
     result = ""
-    for row in range(img.height):
-        out_row = ""
-        old_color = None
-        for char in range(img.width):
-            color = get_color_from_pixel(img, (char, row))
-            if old_color != color:
-                out_row += back_rgb(*color)
-                old_color = color
-            out_row += " " * multiplexer
-        result += f"{out_row}{colorama.Style.RESET_ALL}\n"
-    result += RESET
+    with stats.stage("render"):
+        for row in range(img.height):
+            out_row = ""
+            old_color = None
+            for char in range(img.width):
+                color = get_color_from_pixel(img, (char, row))
+                if old_color != color:
+                    out_row += back_rgb(*color)
+                    old_color = color
+                out_row += " " * multiplexer
+            result += f"{out_row}{colorama.Style.RESET_ALL}\n"
+        result += RESET
     return result
 
 def gradient_color(from_color: rgb_color = None, to_color: rgb_color = None, fraction: float = 1.0) -> rgb_color:
@@ -129,19 +164,19 @@ def make_color_string(s: str, color: rgb_color) -> str:
 
 
 if __name__ == '__main__':
+    # изображение можно передать параметром, иначе берётся синтетическое из генераторов замеров
+    import sys
+    from benchmarks.generators import rings, to_image
 
     TEST_get_background_color = True
     TEST_make_ascii_picture = True
 
     if TEST_get_background_color:
-        IMAGE_FILE_NAME = r'd:\dev\data\get_background_color.png'
-        img = Image.open(IMAGE_FILE_NAME)
+        img = Image.open(sys.argv[1]) if len(sys.argv) > 1 else to_image(rings(2000, 2000))
         start = time()
         print(get_background_color(img))
         print(f"time: {time() - start:.2f}")
-        # (255, 255, 255)
 
     if TEST_make_ascii_picture:
-        IMAGE_FILE_NAME = r'D:\dev\python\ColorRanges\imgs\small_probe.png'
-        img = Image.open(IMAGE_FILE_NAME)
+        img = Image.open(sys.argv[1]) if len(sys.argv) > 1 else to_image(rings(20, 40, ring_width=3))
         print(make_ascii_picture(img))
@@ -0,0 +1,149 @@
+"""
+Пирамида изображения для быстрой приблизительной разметки (сортировка больших пачек изображений:
+сколько примерно областей, какого размера и где)
+- уровень l + 1 - мода каждого блока 2×2 уровня l (самый частый код блока, при равенстве - левый верхний);
+  строка и столбец нечётной стороны повторяются
+- ошибка уровня - сколько пикселей исходного изображения отнесено не к своему коду. Внутри однотонной
+  области блоки однородны, поэтому ошибка набирается только вдоль границ областей и у мелких деталей
+- пирамида строится от исходного изображения вверх, пока накопленная ошибка не больше допустимой доли
+  пикселей (tolerance) и не превышено число уровней (levels); размечается самый грубый из построенных уровней,
+  площади и габариты пересчитываются в пиксели исходного изображения
+- если уже первый уровень превышает допуск (шум, мелкая штриховка) или tolerance=0, размечается исходное
+  изображение: результат точный, как regions.label
+
+Стоимость приблизительной оценки - один проход моды по исходному изображению и разметка уровня в 4^level
+раз меньше; области меньше блока уровня могут пропасть, тонкие перемычки - разорваться или слиться
+"""
+from dataclasses import dataclass
+
+import numpy as np
+from PIL import Image
+
+from quantize import to_rgb_array, pack_pixels
+from print_ascii import pack_rgb
+from regions import Labeling, label
+from stats import NO_STATS
+
+DEFAULT_LEVELS = 3
+DEFAULT_TOLERANCE = 0.1     # доля пикселей исходного изображения, которые могут оказаться не в своей области
+MIN_SIDE = 4                # уровни с меньшей стороной не строятся
+
+
+@dataclass
+class Estimate:
+    level: int              # размеченный уровень пирамиды, 0 - исходное изображение
+    labeling: Labeling      # разметка уровня level
+    areas: np.ndarray       # (count,) площадь области i + 1 в пикселях исходного изображения (оценка)
+    boxes: np.ndarray       # (count, 4) габариты (x, y, ширина, высота) в координатах исходного изображения
+    error: int              # оценка сверху числа пикселей исходного изображения, отнесённых не к своему коду
+
+    @property
+    def count(self) -> int:
+        return self.labeling.count
+
+    @property
+    def exact(self) -> bool:
+        return self.level == 0
+
+
+def downsample_mode(codes: np.ndarray) -> tuple[np.ndarray, int]:
+    """
+    Следующий уровень пирамиды
+    :return: (мода каждого блока 2×2, число пикселей codes, не совпадающих с модой своего блока)
+    """
+    height, width = codes.shape
+    if height % 2 or width % 2:
+        codes = np.pad(codes, ((0, height % 2), (0, width % 2)), mode='edge')
+    a, b, c, d = codes[0::2, 0::2], codes[0::2, 1::2], codes[1::2, 0::2], codes[1::2, 1::2]
+    ab, ac, ad = a == b, a == c, a == d
+    bc, bd, cd = b == c, b == d, c == d
+    count_a = 1 + ab.view(np.uint8) + ac + ad
+    count_b = 1 + bc.view(np.uint8) + bd
+    count_c = 1 + cd.view(np.uint8)
+    mode = np.where(count_b > count_a, b, a)
+    best = np.maximum(count_a, count_b)
+    mode = np.where(count_c > best, c, mode)
+    best = np.maximum(best, count_c)
+    # у нечётного края считаются и добавленные копии пикселей - ошибка оценивается сверху
+    return mode, int((4 - best).sum(dtype=np.int64))
+
+
+def build_pyramid(codes: np.ndarray, levels: int = DEFAULT_LEVELS,
+                  max_error: int = None) -> tuple[list[np.ndarray], list[int]]:
+    """
+    Уровни пирамиды, пока сторона не меньше MIN_SIDE и накопленная ошибка не больше max_error
+    :return: (уровни, начиная с исходного; накопленная ошибка каждого уровня в пикселях исходного изображения)
+    """
+    codes = np.asarray(codes)
+    if codes.ndim != 2:
+        raise ValueError(f"Ожидается двумерный массив кодов, получено измерений: {codes.ndim}")
+    pyramid, errors = [codes], [0]
+    while len(pyramid) <= levels and min(pyramid[-1].shape) >= 2 * MIN_SIDE:
+        coarse, mismatched = downsample_mode(pyramid[-1])
+        error = errors[-1] + mismatched * 4 ** (len(pyramid) - 1)
+        if max_error is not None and error > max_error:
+            break
+        pyramid.append(coarse)
+        errors.append(error)
+    return pyramid, errors
+
+
+def _region_extents(labels: np.ndarray, count: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Площади и габариты областей по сериям номеров в строках, а не по каждому пикселю
+    :return: (площади (count,), габариты (count, 4): строка, столбец, строка за последней, столбец за последним)
+    """
+    width = labels.shape[1]
+    starts = np.ones(labels.shape, dtype=bool)
+    starts[:, 1:] = labels[:, 1:] != labels[:, :-1]
+    first = np.flatnonzero(starts)
+    after_last = np.append(first[1:], labels.size)   # каждая строка начинается новой серией
+    region = labels.ravel()[first]
+    keep = region > 0
+    first, after_last, region = first[keep], after_last[keep], region[keep] - 1
+    areas = np.bincount(region, weights=after_last - first, minlength=count).astype(np.int64)
+    row = first // width
+    extents = np.empty((count, 4), dtype=np.int64)
+    extents[:, :2] = np.iinfo(np.int64).max
+    extents[:, 2:] = -1
+    np.minimum.at(extents[:, 0], region, row)
+    np.minimum.at(extents[:, 1], region, first % width)
+    np.maximum.at(extents[:, 2], region, row + 1)
+    np.maximum.at(extents[:, 3], region, (after_last - 1) % width + 1)
+    return areas, extents
+
+
+def estimate_regions(codes: np.ndarray, connectivity: int = 4, background=None, levels: int = DEFAULT_LEVELS,
+                     tolerance: float = DEFAULT_TOLERANCE, stats=NO_STATS) -> Estimate:
+    """
+    Приблизительная разметка по самому грубому уровню пирамиды, укладывающемуся в допуск
+    :param connectivity: 4 или 8
+    :param background: код фона, фон областей не образует
+    :param levels: наибольший уровень пирамиды - ручка скорости: уровень l в 4^l раз меньше исходного
+    :param tolerance: допустимая доля пикселей не своего кода - ручка точности; 0 - точный результат
+    :param stats: stats.Stats для замера этапов
+    """
+    codes = np.asarray(codes)
+    with stats.stage("pyramid"):
+        pyramid, errors = build_pyramid(codes, levels if tolerance > 0 else 0, int(tolerance * codes.size))
+    level = len(pyramid) - 1
+    labeling = label(pyramid[level], connectivity, background, stats)
+    with stats.stage("extents"):
+        areas, extents = _region_extents(labeling.labels, labeling.count)
+        scale = 2 ** level
+        top, left = extents[:, 0] * scale, extents[:, 1] * scale
+        bottom = np.minimum(extents[:, 2] * scale, codes.shape[0])     # блоки у нечётного края выходят за изображение
+        right = np.minimum(extents[:, 3] * scale, codes.shape[1])
+        boxes = np.stack([left, top, right - left, bottom - top], axis=1)
+        areas = np.minimum(areas * scale * scale, boxes[:, 2] * boxes[:, 3])
+    return Estimate(level, labeling, areas, boxes, errors[level])
+
+
+def estimate_image(image: Image.Image | np.ndarray, connectivity: int = 4,
+                   background: tuple[int, int, int] = None, **kwargs) -> Estimate:
+    """
+    estimate_regions для RGB-изображения
+    :param background: цвет фона (r, g, b)
+    """
+    codes = pack_pixels(to_rgb_array(image))
+    return estimate_regions(codes, connectivity, pack_rgb(background) if background is not None else None, **kwargs)
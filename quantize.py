@@ -0,0 +1,249 @@
+"""
+Квантование цветов изображения - сокращение палитры до N цветов перед разметкой областей
+- палитра строится методом median cut или mini-batch k-means по случайной выборке пикселей
+- пиксели отображаются на ближайший цвет палитры векторно (numpy), результат - массив кодов
+- построенные палитры кэшируются и переиспользуются для похожих изображений
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from PIL import Image
+
+from resultcache import NO_CACHE
+
+DEFAULT_SAMPLE_SIZE = 20_000
+METHODS = ('median_cut', 'kmeans')
+
+
+def to_rgb_array(image: Image.Image | np.ndarray) -> np.ndarray:
+    """
+    Изображение Pillow или массив (h, w, 3) -> массив uint8 формы (h, w, 3)
+    """
+    if isinstance(image, Image.Image) and image.mode != 'RGB':
+        image = image.convert('RGB')
+    rgb = np.asarray(image)
+    if rgb.ndim != 3 or rgb.shape[2] != 3:
+        raise ValueError(f"Ожидается RGB-массив формы (h, w, 3), получено {rgb.shape}")
+    return rgb.astype(np.uint8, copy=False)
+
+
+def pack_pixels(rgb: np.ndarray) -> np.ndarray:
+    """
+    Упаковка пикселей (..., 3) в 24-битные целые, как pack_rgb из print_ascii, но для всего массива сразу
+    """
+    rgb = rgb.astype(np.uint32)
+    return rgb[..., 0] << 16 | rgb[..., 1] << 8 | rgb[..., 2]
+
+
+def unpack_pixels(packed: np.ndarray) -> np.ndarray:
+    packed = np.asarray(packed, dtype=np.uint32)
+    return np.stack([(packed >> 16) & 0xff, (packed >> 8) & 0xff, packed & 0xff], axis=-1).astype(np.uint8)
+
+
+def exact_palette(rgb: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Точная палитра без квантования
+    :param rgb: массив (h, w, 3)
+    :return: (коды (h, w), палитра (n, 3)); цвета в палитре в порядке первого появления в изображении
+    """
+    packed = pack_pixels(rgb).ravel()
+    unique, first, inverse = np.unique(packed, return_index=True, return_inverse=True)
+    order = np.argsort(first, kind='stable')    # порядок первого появления, как при попиксельном обходе
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    codes = rank[inverse].reshape(rgb.shape[:2])
+    return codes.astype(_code_dtype(len(unique))), unpack_pixels(unique[order])
+
+
+def sample_pixels(rgb: np.ndarray, size: int = DEFAULT_SAMPLE_SIZE, seed: int = 0) -> np.ndarray:
+    """
+    Случайная выборка пикселей (k, 3); если пикселей меньше size - возвращаются все
+    """
+    pixels = rgb.reshape(-1, 3)
+    if len(pixels) <= size:
+        return pixels
+    rng = np.random.default_rng(seed)
+    return pixels[rng.choice(len(pixels), size=size, replace=False)]
+
+
+def median_cut(pixels: np.ndarray, n_colors: int) -> np.ndarray:
+    """
+    Палитра методом median cut: ящик с наибольшим разбросом по одному из каналов делится по медиане,
+    пока ящиков не станет n_colors
+    :param pixels: выборка пикселей (k, 3)
+    :param n_colors: размер палитры
+    :return: палитра (m, 3) uint8, m <= n_colors
+    """
+    boxes = [pixels.astype(np.int32)]
+    while len(boxes) < n_colors:
+        spreads = [np.ptp(box, axis=0) if len(box) > 1 else np.zeros(3, dtype=np.int32) for box in boxes]
+        widest = int(np.argmax([spread.max() for spread in spreads]))
+        if spreads[widest].max() == 0:     # делить больше нечего - все ящики однотонные
+            break
+        box = boxes.pop(widest)
+        channel = int(np.argmax(spreads[widest]))
+        box = box[np.argsort(box[:, channel], kind='stable')]
+        half = len(box) // 2
+        boxes += [box[:half], box[half:]]
+    return np.array([np.rint(box.mean(axis=0)) for box in boxes], dtype=np.uint8)
+
+
+def kmeans(pixels: np.ndarray, n_colors: int, iterations: int = 30, batch_size: int = 2048,
+           seed: int = 0) -> np.ndarray:
+    """
+    Палитра методом mini-batch k-means. Начальные центры - median cut, затем центры сдвигаются
+    к средним случайных пакетов с убывающим шагом (1 / число учтённых точек)
+    :return: палитра (m, 3) uint8
+    """
+    centers = median_cut(pixels, n_colors).astype(np.float64)
+    counts = np.zeros(len(centers))
+    rng = np.random.default_rng(seed)
+    pixels = pixels.astype(np.float64)
+    for _ in range(iterations):
+        batch = pixels[rng.integers(0, len(pixels), size=min(batch_size, len(pixels)))]
+        nearest = _nearest(batch, centers)
+        batch_counts = np.bincount(nearest, minlength=len(centers))
+        sums = np.stack([np.bincount(nearest, weights=batch[:, ch], minlength=len(centers)) for ch in range(3)],
+                        axis=1)
+        hit = batch_counts > 0
+        counts[hit] += batch_counts[hit]
+        rate = batch_counts[hit] / counts[hit]
+        centers[hit] += (sums[hit] / batch_counts[hit, None] - centers[hit]) * rate[:, None]
+    return np.unique(np.rint(centers).clip(0, 255).astype(np.uint8), axis=0)
+
+
+def map_to_palette(rgb: np.ndarray, palette: np.ndarray) -> np.ndarray:
+    """
+    Каждый пиксель -> индекс ближайшего (евклидово расстояние в RGB) цвета палитры.
+    Расстояния считаются только для уникальных цветов изображения
+    :return: массив кодов (h, w)
+    """
+    unique, inverse = np.unique(pack_pixels(rgb).ravel(), return_inverse=True)
+    nearest = _nearest(unpack_pixels(unique), palette)
+    return nearest[inverse].reshape(rgb.shape[:2]).astype(_code_dtype(len(palette)))
+
+
+def _nearest(pixels: np.ndarray, palette: np.ndarray, chunk: int = 1 << 16) -> np.ndarray:
+    palette = palette.astype(np.float64)
+    result = np.empty(len(pixels), dtype=np.intp)
+    for start in range(0, len(pixels), chunk):
+        part = pixels[start:start + chunk].astype(np.float64)
+        distances = ((part[:, None, :] - palette[None, :, :]) ** 2).sum(axis=2)
+        result[start:start + chunk] = distances.argmin(axis=1)
+    return result
+
+
+def _code_dtype(n_colors: int) -> type:
+    return np.uint8 if n_colors <= 256 else np.uint16 if n_colors <= 65536 else np.uint32
+
+
+class PaletteCache:
+    """
+    Кэш палитр. Похожесть изображений определяется по грубой гистограмме цветов (bins^3 корзин):
+    если доля несовпадающих пикселей гистограмм не больше tolerance - палитра берётся из кэша.
+    Безопасен для нескольких потоков (loader.iter_walls загружает png в пуле потоков)
+    """
+    def __init__(self, max_entries: int = 32, tolerance: float = 0.05, bins: int = 8):
+        self.max_entries = max_entries
+        self.tolerance = tolerance
+        self.bins = bins
+        self._entries: OrderedDict[int, tuple[tuple, np.ndarray, np.ndarray]] = OrderedDict()
+        self._next_key = 0
+        self.hits = self.misses = 0
+        self._lock = threading.Lock()
+
+    def signature(self, pixels: np.ndarray) -> np.ndarray:
+        step = 256 // self.bins
+        binned = pixels.astype(np.int32) // step
+        index = (binned[:, 0] * self.bins + binned[:, 1]) * self.bins + binned[:, 2]
+        histogram = np.bincount(index, minlength=self.bins ** 3).astype(np.float64)
+        return histogram / max(len(pixels), 1)
+
+    def get(self, signature: np.ndarray, params: tuple) -> np.ndarray | None:
+        with self._lock:
+            for key, (entry_params, entry_signature, palette) in self._entries.items():
+                if entry_params == params and np.abs(entry_signature - signature).sum() / 2 <= self.tolerance:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return palette
+            self.misses += 1
+            return None
+
+    def put(self, signature: np.ndarray, params: tuple, palette: np.ndarray) -> None:
+        with self._lock:
+            self._entries[self._next_key] = (params, signature, palette)
+            self._next_key += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+palette_cache = PaletteCache()
+
+
+def quantize(image: Image.Image | np.ndarray,
+             n_colors: int = 16,
+             method: str = 'median_cut',
+             sample_size: int = DEFAULT_SAMPLE_SIZE,
+             cache: PaletteCache | None = palette_cache,
+             seed: int = 0,
+             result_cache=NO_CACHE) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Сокращение изображения до n_colors цветов.
+    Если цветов в изображении и так не больше n_colors - палитра точная (в порядке первого появления)
+    :param image: изображение Pillow или массив (h, w, 3)
+    :param n_colors: размер палитры
+    :param method: 'median_cut' или 'kmeans'
+    :param sample_size: размер выборки пикселей для построения палитры
+    :param cache: кэш палитр для похожих изображений; None - без кэша
+    :param seed: зерно генератора случайной выборки
+    :param result_cache: resultcache.ResultCache - коды и палитра уже встречавшихся изображений берутся с диска
+    :return: (коды (h, w), палитра (m, 3) uint8); codes[r, c] - индекс цвета в палитре
+    """
+    if method not in METHODS:
+        raise ValueError(f"Неизвестный метод квантования: {method}. Допустимы: {', '.join(METHODS)}")
+    if n_colors < 1:
+        raise ValueError(f"Размер палитры должен быть положительным: {n_colors}")
+
+    rgb = to_rgb_array(image)
+    if result_cache:
+        def compute():
+            codes, palette = _quantize(rgb, n_colors, method, sample_size, cache, seed)
+            return {'codes': codes, 'palette': palette}
+
+        entry = result_cache.fetch("quantize", rgb, (n_colors, method, sample_size, seed), compute)
+        return entry['codes'], entry['palette']
+    return _quantize(rgb, n_colors, method, sample_size, cache, seed)
+
+
+def _quantize(rgb: np.ndarray, n_colors: int, method: str, sample_size: int, cache: PaletteCache | None,
+              seed: int) -> tuple[np.ndarray, np.ndarray]:
+    codes, palette = exact_palette(rgb)
+    if len(palette) <= n_colors:
+        return codes, palette
+
+    pixels = sample_pixels(rgb, sample_size, seed)
+    params = (n_colors, method)
+    signature = cache.signature(pixels) if cache is not None else None
+    palette = cache.get(signature, params) if cache is not None else None
+    if palette is None:
+        palette = median_cut(pixels, n_colors) if method == 'median_cut' else kmeans(pixels, n_colors, seed=seed)
+        if cache is not None:
+            cache.put(signature, params, palette)
+    return map_to_palette(rgb, palette), palette
+
+
+def quantize_image(image: Image.Image, n_colors: int = 16, **kwargs) -> Image.Image:
+    """
+    Изображение, перекрашенное в цвета квантованной палитры
+    """
+    codes, palette = quantize(image, n_colors, **kwargs)
+    return Image.fromarray(palette[codes])
@@ -0,0 +1,275 @@
+"""
+Разметка связных областей отдельно по каждому цвету (коду) за один проход по изображению
+- строки разбиваются на серии (runs) одинаковых кодов
+- серии соседних строк одного кода склеиваются векторно, компоненты находятся объединением
+  с перевешиванием на меньший корень и сжатием путей
+- номера областей идут в порядке первого пикселя при построчном обходе, 0 - фон
+"""
+from dataclasses import dataclass, field
+
+import numpy as np
+from PIL import Image
+
+from neighbourhood import check_connectivity
+from quantize import to_rgb_array, pack_pixels
+from print_ascii import unpack_rgb, pack_rgb
+from resultcache import NO_CACHE
+from rle import RunMask
+from stats import NO_STATS, PIXELS_VISITED, REGIONS_FOUND
+
+
+@dataclass
+class Labeling:
+    labels: np.ndarray      # (h, w) номер области каждого пикселя, 0 - фон
+    colors: np.ndarray      # colors[i] - код (цвет) области i; colors[0] - код фона
+    by_color: dict = field(default_factory=dict)    # код (цвет) -> массив номеров областей этого цвета
+
+    @property
+    def count(self) -> int:
+        return len(self.colors) - 1
+
+
+def row_runs(codes: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Серии одинаковых кодов в строках
+    :return: (номер серии каждого пикселя (h, w), код каждой серии, маска начал серий (h, w))
+    """
+    starts = np.ones(codes.shape, dtype=bool)
+    starts[:, 1:] = codes[:, 1:] != codes[:, :-1]
+    dtype = np.int32 if codes.size < 2 ** 31 else np.int64
+    run_id = np.cumsum(starts.ravel(), dtype=dtype).reshape(codes.shape) - 1
+    return run_id, codes[starts], starts
+
+
+def _neighbour_slices(connectivity: int) -> list[tuple[tuple[slice, slice], tuple[slice, slice]]]:
+    """
+    Пары срезов (текущая строка, предыдущая строка) для соседей сверху и, при 8-связности, по диагоналям
+    """
+    check_connectivity(connectivity)
+    pairs = [(np.s_[1:, :], np.s_[:-1, :])]
+    if connectivity == 8:
+        pairs += [(np.s_[1:, 1:], np.s_[:-1, :-1]),
+                  (np.s_[1:, :-1], np.s_[:-1, 1:])]
+    return pairs
+
+
+def run_edges(codes: np.ndarray, run_id: np.ndarray, starts: np.ndarray,
+              connectivity: int, background=None) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Пары соприкасающихся серий одного кода из соседних строк.
+    Пара серий меняется только там, где в одной из строк начинается новая серия, - остальные дубли отброшены
+    """
+    left, right = [], []
+    for lower, upper in _neighbour_slices(connectivity):
+        touch = (codes[lower] == codes[upper]) & (starts[lower] | starts[upper])
+        if background is not None:
+            touch &= codes[lower] != background
+        left.append(run_id[lower][touch])
+        right.append(run_id[upper][touch])
+    return np.concatenate(left), np.concatenate(right)
+
+
+def union_roots(n: int, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    Объединение узлов 0..n-1 по рёбрам (a, b).
+    Корень подвешивается к меньшему корню, поэтому корень компоненты - её наименьший узел
+    :return: корень компоненты для каждого узла
+    """
+    parent = np.arange(n, dtype=a.dtype if len(a) else np.int64)
+    while len(a):
+        root_a, root_b = parent[a], parent[b]
+        differ = root_a != root_b
+        if not differ.any():
+            break
+        a, b = a[differ], b[differ]
+        root_a, root_b = root_a[differ], root_b[differ]
+        np.minimum.at(parent, np.maximum(root_a, root_b), np.minimum(root_a, root_b))
+        while True:     # сжатие путей
+            grand = parent[parent]
+            if np.array_equal(grand, parent):
+                break
+            parent = grand
+    return parent
+
+
+def index_by_color(colors: np.ndarray) -> dict:
+    """
+    Номера областей по цветам для Labeling.by_color
+    :param colors: код цвета каждой области, colors[0] - фон
+    :return: код цвета -> массив номеров областей этого цвета по возрастанию
+    """
+    region_colors = colors[1:]
+    order = np.argsort(region_colors, kind='stable')
+    unique, counts = np.unique(region_colors, return_counts=True)
+    return {code.item(): ids for code, ids in zip(unique, np.split(order + 1, np.cumsum(counts)[:-1]))}
+
+
+def label(codes: np.ndarray, connectivity: int = 4, background=None, stats=NO_STATS,
+          result_cache=NO_CACHE) -> Labeling:
+    """
+    Связные области отдельно для каждого кода: соприкасающиеся области разных цветов - разные области
+    :param codes: двумерный массив кодов (индексы палитры, упакованные rgb и т.п.)
+    :param connectivity: 4 или 8
+    :param background: код фона, пиксели фона получают номер 0; None - фона нет, размечается всё
+    :param stats: stats.Stats для замера этапа и счётчиков
+    :param result_cache: resultcache.ResultCache - разметка уже встречавшихся кодов берётся из кэша
+    :return: Labeling, номера областей 1..count в порядке первого пикселя при построчном обходе
+    """
+    codes = np.asarray(codes)
+    if codes.ndim != 2:
+        raise ValueError(f"Ожидается двумерный массив кодов, получено измерений: {codes.ndim}")
+    if codes.size == 0:
+        return Labeling(np.zeros(codes.shape, dtype=np.int32), np.array([background or 0]))
+
+    def compute():
+        run_id, run_code, starts = row_runs(codes)
+        run_label, colors = _label_runs(codes, run_id, run_code, starts, connectivity, background)
+        return {'labels': run_label[run_id], 'colors': colors}
+
+    with stats.stage("label"):
+        params = (connectivity, None if background is None else int(background))
+        entry = result_cache.fetch("label", codes, params, compute)
+        result = Labeling(entry['labels'], entry['colors'], index_by_color(entry['colors']))
+    if stats:
+        stats.count(PIXELS_VISITED, codes.size)
+        stats.count(REGIONS_FOUND, result.count)
+    return result
+
+
+def _label_runs(codes, run_id, run_code, starts, connectivity, background) -> tuple[np.ndarray, np.ndarray]:
+    """
+    :return: (номер области каждой серии, коды областей с кодом фона в начале)
+    """
+    roots = union_roots(len(run_code), *run_edges(codes, run_id, starts, connectivity, background))
+
+    foreground = run_code != background if background is not None else np.ones(len(run_code), dtype=bool)
+    region_roots = np.unique(roots[foreground])     # корень - первая серия области, порядок обхода сохраняется
+    run_label = np.zeros(len(run_code), dtype=np.int32)
+    run_label[foreground] = np.searchsorted(region_roots, roots[foreground]) + 1
+
+    colors = np.concatenate([[background if background is not None else 0], run_code[region_roots]])
+    return run_label, colors.astype(codes.dtype)
+
+
+def label_runs(codes: np.ndarray, connectivity: int = 4, background=None) -> tuple[np.ndarray, list[RunMask]]:
+    """
+    То же, что label, но области сразу в виде масок из серий, без карты номеров
+    :return: (коды областей, colors[0] - код фона; маски областей 1..count, masks[i - 1] - область i)
+    """
+    codes = np.asarray(codes)
+    if codes.ndim != 2:
+        raise ValueError(f"Ожидается двумерный массив кодов, получено измерений: {codes.ndim}")
+    if codes.size == 0:
+        return np.array([background or 0]), []
+
+    run_id, run_code, starts = row_runs(codes)
+    run_label, colors = _label_runs(codes, run_id, run_code, starts, connectivity, background)
+    del run_id
+    run_starts = np.flatnonzero(starts)
+    run_ends = np.append(run_starts[1:], codes.size)   # каждая строка начинается новой серией
+
+    order = np.argsort(run_label, kind='stable')
+    bounds = np.searchsorted(run_label[order], np.arange(1, len(colors) + 1))
+    masks = [RunMask(codes.shape, run_starts[order[start:end]], run_ends[order[start:end]])
+             for start, end in zip(bounds[:-1], bounds[1:])]
+    return colors, masks
+
+
+def label_walls(walls, connectivity: int = 4, background: str = None, stats=NO_STATS,
+                result_cache=NO_CACHE) -> Labeling:
+    """
+    Разметка сетки Walls по кодам палитры (символам)
+    :param walls: cellsdata.Walls
+    :param background: символ фона
+    :return: Labeling; colors - коды, by_color - по символам
+    """
+    codes, symbols = walls.get_codes()
+    background_code = symbols.index(background) if background in symbols else None
+    result = label(codes, connectivity, background_code, stats, result_cache)
+    result.by_color = {symbols[code]: ids for code, ids in result.by_color.items()}
+    return result
+
+
+def label_image(image: Image.Image | np.ndarray, connectivity: int = 4,
+                background: tuple[int, int, int] = None, stats=NO_STATS, result_cache=NO_CACHE) -> Labeling:
+    """
+    Разметка RGB-изображения по цветам
+    :param background: цвет фона (r, g, b), например print_ascii.get_background_color(image)
+    :return: Labeling; colors - упакованные rgb, by_color - по цветам (r, g, b)
+    """
+    codes = pack_pixels(to_rgb_array(image))
+    result = label(codes, connectivity, pack_rgb(background) if background is not None else None, stats, result_cache)
+    result.by_color = {unpack_rgb(code): ids for code, ids in result.by_color.items()}
+    return result
+
+
+def label_background(codes: np.ndarray, background, connectivity: int = 4) -> Labeling:
+    """
+    Связные области фона
+    :param connectivity: связность областей переднего плана; фон размечается с дополнительной связностью
+        (8 для 4 и наоборот), иначе фон "просачивался" бы между диагонально касающимися пикселями областей
+    :return: Labeling областей фона, 0 - всё, что не фон
+    """
+    mask = np.asarray(codes) == background
+    result = label(mask.view(np.uint8), 12 - connectivity, background=0)
+    result.colors = np.full(len(result.colors), background)
+    result.by_color = {background: np.arange(1, result.count + 1)} if result.count else {}
+    return result
+
+
+def _border_labels(labels: np.ndarray) -> np.ndarray:
+    return np.unique(np.concatenate([labels[0], labels[-1], labels[:, 0], labels[:, -1]]))
+
+
+def find_holes(codes: np.ndarray, background, connectivity: int = 4) -> Labeling:
+    """
+    Замкнутые области фона (дыры) - области фона, не касающиеся края изображения
+    :return: Labeling только дыр, номера 1..count
+    """
+    result = label_background(codes, background, connectivity)
+    holes = np.setdiff1d(np.arange(1, result.count + 1), _border_labels(result.labels))
+    relabel = np.zeros(result.count + 1, dtype=np.int32)
+    relabel[holes] = np.arange(1, len(holes) + 1)
+    colors = result.colors[np.concatenate([[0], holes])]
+    by_color = {background: np.arange(1, len(holes) + 1)} if len(holes) else {}
+    return Labeling(relabel[result.labels], colors, by_color)
+
+
+def fill_holes(mask: np.ndarray, connectivity: int = 4) -> np.ndarray:
+    """
+    Заливка дыр маски за один проход разметки: все участки вне маски, не связанные с краем, включаются в маску
+    :param mask: двумерная булева маска областей
+    :param connectivity: связность областей маски
+    """
+    mask = np.asarray(mask, dtype=bool)
+    outside = label((~mask).view(np.uint8), 12 - connectivity, background=0).labels
+    open_to_border = np.isin(outside, _border_labels(outside)) & (outside > 0)
+    return ~open_to_border
+
+
+def adjacency_edges(labels: np.ndarray, connectivity: int = 4) -> np.ndarray:
+    """
+    Рёбра графа смежности областей: пары соседних пикселей с разными номерами, сравнение векторное
+    :param labels: карта номеров областей (Labeling.labels)
+    :return: массив (k, 2) уникальных пар (меньший номер, больший номер), отсортированный
+    """
+    pairs = [(np.s_[:, 1:], np.s_[:, :-1])] + _neighbour_slices(connectivity)
+    first, second = [], []
+    for one, other in pairs:
+        differ = labels[one] != labels[other]
+        first.append(labels[one][differ])
+        second.append(labels[other][differ])
+    first, second = np.concatenate(first), np.concatenate(second)
+    edges = np.stack([np.minimum(first, second), np.maximum(first, second)], axis=1)
+    return np.unique(edges, axis=0) if len(edges) else edges.reshape(0, 2)
+
+
+def adjacency_graph(labels: np.ndarray, connectivity: int = 4) -> dict[int, set[int]]:
+    """
+    Граф смежности областей: номер области -> номера соседних областей
+    """
+    graph = {int(region): set() for region in np.unique(labels)}
+    for one, other in adjacency_edges(labels, connectivity).tolist():
+        graph[one].add(other)
+        graph[other].add(one)
+    return graph
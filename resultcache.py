@@ -0,0 +1,217 @@
+"""
+Кэш результатов на диске с адресацией по содержимому
+- ключ - хэш байтов изображения (массива кодов) вместе с именем алгоритма и его параметрами,
+  поэтому неизменившиеся входные данные находятся в кэше независимо от имени файла
+- запись - набор массивов numpy в сжатом .npz; запись атомарна (временный файл и переименование)
+- при превышении max_bytes удаляются давно не использовавшиеся записи (LRU по времени изменения файла);
+  размер считается по файлам папки, поэтому предел соблюдается и для папки, общей для нескольких процессов
+
+MemoryCache - тот же кэш в памяти процесса (для долгоживущих процессов, например daemon.py): записи не сжимаются
+и не читаются с диска, массивы записей общие для всех получателей и доступны только для чтения
+
+Когда кэш не нужен, вместо ResultCache передаётся NO_CACHE: fetch просто вычисляет результат
+"""
+import hashlib
+import os
+import threading
+import zipfile
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+from PIL import Image
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+SUFFIX = ".npz"
+
+type entry = dict[str, np.ndarray]
+
+
+def content_key(name: str, data: Image.Image | np.ndarray, params: tuple = ()) -> str:
+    """
+    Ключ записи: хэш имени алгоритма, параметров, формы и байтов данных
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{name}|{params!r}|".encode())
+    if isinstance(data, Image.Image):
+        digest.update(f"{data.mode}|{data.size}|".encode())
+        digest.update(data.tobytes())
+    else:
+        data = np.ascontiguousarray(data)
+        digest.update(f"{data.dtype.str}|{data.shape}|".encode())
+        digest.update(data.data)
+    return digest.hexdigest()
+
+
+class ResultCache:
+    def __init__(self, directory: Path, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        :param directory: папка кэша, создаётся при необходимости; её могут делить несколько процессов
+        :param max_bytes: предел размера записей на диске
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = self.misses = 0
+        self._lock = threading.Lock()      # _sizes меняют все потоки, которые пользуются кэшем
+        self._sizes = self._scan()         # ключ -> размер файла, от давних к недавним
+
+    def __bool__(self):
+        return True
+
+    def __len__(self):
+        return len(self._sizes)
+
+    @property
+    def size(self) -> int:
+        with self._lock:
+            return sum(self._sizes.values())
+
+    def _path(self, key: str) -> Path:
+        return self.directory / (key + SUFFIX)
+
+    def _scan(self) -> OrderedDict[str, int]:
+        """ Размеры записей в папке по времени изменения: папку могут пополнять и чистить другие процессы """
+        files = []
+        for path in self.directory.glob("*" + SUFFIX):
+            try:
+                files.append((path.stat(), path.stem))
+            except FileNotFoundError:   # удалена другим процессом
+                pass
+        return OrderedDict((key, stat.st_size) for stat, key in sorted(files, key=lambda item: item[0].st_mtime))
+
+    def get(self, key: str) -> entry | None:
+        path = self._path(key)
+        try:
+            with np.load(path) as stored:
+                result = {name: stored[name] for name in stored.files}
+            os.utime(path)
+            stored_size = path.stat().st_size
+        except (OSError, ValueError, zipfile.BadZipFile):     # нет записи, удалена другим процессом или испорчена
+            with self._lock:
+                self._sizes.pop(key, None)
+                self.misses += 1
+            return None
+        with self._lock:
+            self._sizes[key] = stored_size
+            self._sizes.move_to_end(key)
+            self.hits += 1
+        return result
+
+    def put(self, key: str, arrays: entry) -> None:
+        path = self._path(key)
+        # у каждого потока свой временный файл: os.replace не подставит чужую недописанную запись
+        temporary = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(temporary, 'wb') as file:
+            np.savez_compressed(file, **arrays)
+        os.replace(temporary, path)
+        self._evict()
+
+    def _evict(self) -> None:
+        """ Удаление давних записей по фактическому содержимому папки, включая записи других процессов """
+        with self._lock:
+            self._sizes = self._scan()
+            total = sum(self._sizes.values())
+            while total > self.max_bytes and len(self._sizes) > 1:
+                key, size = self._sizes.popitem(last=False)
+                self._path(key).unlink(missing_ok=True)
+                total -= size
+
+    def fetch(self, name: str, data: Image.Image | np.ndarray, params: tuple,
+              compute: Callable[[], entry]) -> entry:
+        """
+        Результат из кэша или compute(), сохранённый в кэш
+        :param name: имя алгоритма
+        :param data: входные данные, по байтам которых строится ключ
+        :param params: параметры алгоритма, влияющие на результат
+        """
+        key = content_key(name, data, params)
+        result = self.get(key)
+        if result is None:
+            result = compute()
+            self.put(key, result)
+        return result
+
+    def clear(self) -> None:
+        with self._lock:
+            for key in self._sizes:
+                self._path(key).unlink(missing_ok=True)
+            self._sizes.clear()
+            self.hits = self.misses = 0
+
+
+class MemoryCache:
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        :param max_bytes: предел суммарного размера массивов записей; безопасен для нескольких потоков
+        """
+        self.max_bytes = max_bytes
+        self.hits = self.misses = 0
+        self._entries: OrderedDict[str, tuple[entry, int]] = OrderedDict()     # от давних к недавним
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __bool__(self):
+        return True
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def get(self, key: str) -> entry | None:
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key][0]
+
+    def put(self, key: str, arrays: entry) -> entry:
+        """
+        В кэш кладутся копии только для чтения: записи общие, а массивы вызывающего остаются изменяемыми
+        :return: сохранённая запись - та же, что вернёт get
+        """
+        arrays = {name: np.array(array) for name, array in arrays.items()}
+        for array in arrays.values():
+            array.flags.writeable = False
+        size = sum(array.nbytes for array in arrays.values())
+        with self._lock:
+            if key in self._entries:
+                self._size -= self._entries.pop(key)[1]
+            self._entries[key] = arrays, size
+            self._size += size
+            while self._size > self.max_bytes and len(self._entries) > 1:
+                self._size -= self._entries.popitem(last=False)[1][1]
+        return arrays
+
+    def fetch(self, name: str, data: Image.Image | np.ndarray, params: tuple,
+              compute: Callable[[], entry]) -> entry:
+        """ Как ResultCache.fetch; результат только для чтения и при попадании, и при промахе """
+        key = content_key(name, data, params)
+        result = self.get(key)
+        if result is None:
+            result = self.put(key, compute())
+        return result
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+            self.hits = self.misses = 0
+
+
+class NullCache:
+    """ Кэш выключен: всё вычисляется заново """
+    def __bool__(self):
+        return False
+
+    def fetch(self, name: str, data, params: tuple, compute: Callable[[], entry]) -> entry:
+        return compute()
+
+
+NO_CACHE = NullCache()
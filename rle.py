@@ -0,0 +1,166 @@
+"""
+Маски областей в виде серий (run-length encoding) вместо списков координат пикселей
+- серия - полуинтервал [start, end) плоских индексов (row * width + col) внутри одной строки
+- площадь, габариты, объединение, пересечение, разность и IoU считаются по сериям, без распаковки в растр
+- преобразование в плотную маску и обратно, а также в RLE формата COCO
+"""
+import numpy as np
+
+
+def index_dtype(size: int) -> type:
+    """ Тип плоских индексов для сетки из size клеток """
+    return np.int32 if size < 2 ** 31 else np.int64
+
+
+class RunMask:
+    """
+    Маска формы shape из отсортированных непересекающихся серий одной строки каждая.
+    Соседние серии одной строки всегда склеены, поэтому одинаковые маски имеют одинаковые серии
+    """
+    __slots__ = ('shape', 'starts', 'ends')
+
+    def __init__(self, shape: tuple[int, int], starts: np.ndarray, ends: np.ndarray):
+        self.shape = (int(shape[0]), int(shape[1]))
+        dtype = index_dtype(self.shape[0] * self.shape[1])
+        self.starts = np.asarray(starts, dtype=dtype)
+        self.ends = np.asarray(ends, dtype=dtype)
+
+    @classmethod
+    def from_runs(cls, shape: tuple[int, int], starts: np.ndarray, ends: np.ndarray) -> 'RunMask':
+        """
+        Маска из произвольных отсортированных непересекающихся полуинтервалов: касающиеся склеиваются,
+        пересекающие границу строки режутся по строкам
+        """
+        width = shape[1]
+        starts, ends = np.asarray(starts, dtype=np.int64), np.asarray(ends, dtype=np.int64)
+        keep = ends > starts
+        starts, ends = starts[keep], ends[keep]
+        if len(starts):
+            # склейка касающихся
+            new = np.ones(len(starts), dtype=bool)
+            new[1:] = starts[1:] != ends[:-1]
+            group_ends = np.append(np.flatnonzero(new)[1:], len(starts)) - 1
+            starts, ends = starts[new], ends[group_ends]
+            # разрезание по строкам
+            first_row, last_row = starts // width, (ends - 1) // width
+            pieces = last_row - first_row + 1
+            if (pieces > 1).any():
+                run = np.repeat(np.arange(len(starts)), pieces)
+                piece = np.arange(len(run)) - np.repeat(np.cumsum(pieces) - pieces, pieces)
+                row = first_row[run] + piece
+                starts = np.maximum(starts[run], row * width)
+                ends = np.minimum(ends[run], (row + 1) * width)
+        return cls(shape, starts, ends)
+
+    @classmethod
+    def from_dense(cls, mask: np.ndarray) -> 'RunMask':
+        mask = np.asarray(mask, dtype=bool)
+        padded = np.zeros((mask.shape[0], mask.shape[1] + 2), dtype=np.int8)
+        padded[:, 1:-1] = mask
+        changes = np.diff(padded, axis=1)
+        rows_start, cols_start = np.nonzero(changes == 1)
+        rows_end, cols_end = np.nonzero(changes == -1)
+        width = mask.shape[1]
+        return cls(mask.shape, rows_start * width + cols_start, rows_end * width + cols_end)
+
+    def to_dense(self) -> np.ndarray:
+        flat = np.zeros(self.shape[0] * self.shape[1] + 1, dtype=np.int8)
+        np.add.at(flat, self.starts, 1)
+        np.add.at(flat, self.ends, -1)
+        return np.cumsum(flat[:-1]).astype(bool).reshape(self.shape)
+
+    def rows(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        :return: (строка, первый столбец, столбец за последним) каждой серии
+        """
+        width = self.shape[1]
+        row = self.starts // width
+        return row, self.starts - row * width, self.ends - row * width
+
+    @property
+    def area(self) -> int:
+        return int((self.ends - self.starts).sum())
+
+    @property
+    def bbox(self) -> tuple[int, int, int, int]:
+        """
+        Габариты в формате COCO: (x, y, ширина, высота); для пустой маски (0, 0, 0, 0)
+        """
+        if not len(self.starts):
+            return 0, 0, 0, 0
+        row, first, after_last = self.rows()
+        x, y = int(first.min()), int(row[0])
+        return x, y, int(after_last.max()) - x, int(row[-1]) - y + 1
+
+    @property
+    def nbytes(self) -> int:
+        return self.starts.nbytes + self.ends.nbytes
+
+    def _combine(self, other: 'RunMask', need: int, subtract: bool = False) -> 'RunMask':
+        """
+        Заметание по границам серий: покрытие = сумма +1 в начале серии и -1 в конце.
+        need=1 - объединение, need=2 - пересечение; при subtract серии other входят с обратным знаком
+        """
+        if self.shape != other.shape:
+            raise ValueError(f"Размеры масок не совпадают: {self.shape} и {other.shape}")
+        sign = -1 if subtract else 1
+        points = np.concatenate([self.starts, other.starts, self.ends, other.ends]).astype(np.int64)
+        delta = np.concatenate([np.ones(len(self.starts), dtype=np.int8),
+                                np.full(len(other.starts), sign, dtype=np.int8),
+                                -np.ones(len(self.ends), dtype=np.int8),
+                                np.full(len(other.ends), -sign, dtype=np.int8)])
+        order = np.lexsort((delta, points))     # в одной точке сначала закрытия, потом открытия
+        points, cover = points[order], np.cumsum(delta[order])
+        inside = cover >= need
+        begin = inside & ~np.concatenate([[False], inside[:-1]])
+        finish = ~inside & np.concatenate([[False], inside[:-1]])
+        return RunMask.from_runs(self.shape, points[begin], points[finish])
+
+    def __or__(self, other: 'RunMask') -> 'RunMask':
+        return self._combine(other, 1)
+
+    def __and__(self, other: 'RunMask') -> 'RunMask':
+        return self._combine(other, 2)
+
+    def __sub__(self, other: 'RunMask') -> 'RunMask':
+        return self._combine(other, 1, subtract=True)
+
+    def intersection_area(self, other: 'RunMask') -> int:
+        return (self & other).area
+
+    def iou(self, other: 'RunMask') -> float:
+        intersection = self.intersection_area(other)
+        union = self.area + other.area - intersection
+        return intersection / union if union else 0.0
+
+    def to_coco(self) -> dict:
+        """
+        RLE формата COCO: счётчики чередующихся нулей и единиц по столбцам, начиная с нулей
+        """
+        column_major = self.to_dense().ravel(order='F')
+        changes = np.flatnonzero(np.diff(column_major.astype(np.int8))) + 1
+        bounds = np.concatenate([[0], changes, [column_major.size]])
+        counts = np.diff(bounds).tolist()
+        if column_major.size and column_major[0]:
+            counts = [0] + counts
+        return {'size': list(self.shape), 'counts': counts}
+
+    @classmethod
+    def from_coco(cls, rle: dict) -> 'RunMask':
+        height, width = rle['size']
+        bounds = np.cumsum(np.concatenate([[0], rle['counts']])).astype(np.int64)
+        flat = np.zeros(height * width + 1, dtype=np.int8)
+        np.add.at(flat, bounds[1::2], 1)
+        np.add.at(flat, bounds[2::2], -1)
+        column_major = np.cumsum(flat[:-1]).astype(bool)
+        return cls.from_dense(column_major.reshape((height, width), order='F'))
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __eq__(self, other):
+        return (isinstance(other, RunMask) and self.shape == other.shape
+                and np.array_equal(self.starts, other.starts) and np.array_equal(self.ends, other.ends))
+
+    def __repr__(self):
+        return f"RunMask(shape={self.shape}, runs={len(self)}, area={self.area})"
@@ -0,0 +1,130 @@
+"""
+Статистика выполнения: время этапов (настенное и процессорное) и счётчики горячих участков
+- этапы замеряются контекстным менеджером stats.stage("имя"), вложенные этапы считаются отдельно
+- счётчики: посещённые и повторно посещённые пиксели, максимальная глубина стека, найденные области,
+  байты, выведенные в терминал, и любые другие
+- по желанию на каждый этап включаются cProfile и tracemalloc
+
+Когда статистика не нужна, вместо Stats передаётся NO_STATS: все его методы ничего не делают,
+а в условии он ложен, поэтому в горячих циклах счётчики пропускаются проверкой `if stats:`
+"""
+import cProfile
+import io
+import pstats
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+from time import perf_counter, process_time
+
+PIXELS_VISITED = "pixels_visited"
+PIXELS_REVISITED = "pixels_revisited"
+MAX_STACK_DEPTH = "max_stack_depth"
+REGIONS_FOUND = "regions_found"
+BYTES_WRITTEN = "bytes_written"
+
+
+@dataclass
+class StageTime:
+    wall: float = 0.0       # сек
+    cpu: float = 0.0        # сек
+    calls: int = 0
+    memory_peak: int = 0    # байт сверх занятого в начале этапа, только при memory=True
+
+
+@dataclass
+class Stats:
+    profile: bool = False   # cProfile на время этапов
+    memory: bool = False    # tracemalloc на время этапов
+    stages: dict[str, StageTime] = field(default_factory=dict)
+    counters: dict[str, int] = field(default_factory=dict)
+    profiler: cProfile.Profile | None = field(default=None, repr=False)
+    _profiling: bool = field(default=False, repr=False)    # профилировщик уже включён внешним этапом
+    # пик памяти каждого открытого этапа до сброса пика tracemalloc вложенным этапом
+    _memory_peaks: list[int] = field(default_factory=list, repr=False)
+
+    def __bool__(self):
+        return True
+
+    @contextmanager
+    def stage(self, name: str):
+        timing = self.stages.setdefault(name, StageTime())
+        if self.profile and self.profiler is None:
+            self.profiler = cProfile.Profile()
+        profiling = self.profile and not self._profiling
+        tracing = self.memory and not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
+        if profiling:
+            self._profiling = True
+            self.profiler.enable()
+        if self.memory:
+            # пик у tracemalloc один: пик внешнего этапа запоминается, и пик отсчитывается заново
+            memory_start, peak = tracemalloc.get_traced_memory()
+            if self._memory_peaks:
+                self._memory_peaks[-1] = max(self._memory_peaks[-1], peak)
+            self._memory_peaks.append(memory_start)
+            tracemalloc.reset_peak()
+        wall, cpu = perf_counter(), process_time()
+        try:
+            yield timing
+        finally:
+            timing.wall += perf_counter() - wall
+            timing.cpu += process_time() - cpu
+            timing.calls += 1
+            if profiling:
+                self.profiler.disable()
+                self._profiling = False
+            if self.memory:
+                peak = max(tracemalloc.get_traced_memory()[1], self._memory_peaks.pop())
+                timing.memory_peak = max(timing.memory_peak, peak - memory_start)
+            if tracing:
+                tracemalloc.stop()
+
+    def count(self, name: str, value: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def maximum(self, name: str, value: int) -> None:
+        if value > self.counters.get(name, 0):
+            self.counters[name] = value
+
+    def as_dict(self) -> dict:
+        return {
+            'stages': {name: vars(timing).copy() for name, timing in self.stages.items()},
+            'counters': dict(self.counters),
+        }
+
+    def report(self) -> str:
+        lines = [f"{'этап':<16}{'вызовов':>8}{'wall, ms':>12}{'cpu, ms':>12}"
+                 + (f"{'память, КБ':>12}" if self.memory else "")]
+        for name, timing in self.stages.items():
+            lines.append(f"{name:<16}{timing.calls:>8}{timing.wall * 1000:>12.2f}{timing.cpu * 1000:>12.2f}"
+                         + (f"{timing.memory_peak / 1024:>12.1f}" if self.memory else ""))
+        lines += [f"{name:<16}{value:>8}" for name, value in self.counters.items()]
+        return "\n".join(lines)
+
+    def profile_report(self, limit: int = 20) -> str:
+        if self.profiler is None:
+            return ""
+        out = io.StringIO()
+        pstats.Stats(self.profiler, stream=out).sort_stats('cumulative').print_stats(limit)
+        return out.getvalue()
+
+
+class NullStats:
+    """ Статистика выключена: ничего не замеряется и не считается """
+    _null_stage = nullcontext()
+
+    def __bool__(self):
+        return False
+
+    def stage(self, name: str):
+        return self._null_stage
+
+    def count(self, name: str, value: int = 1) -> None:
+        pass
+
+    def maximum(self, name: str, value: int) -> None:
+        pass
+
+
+NO_STATS = NullStats()
@@ -0,0 +1,211 @@
+"""
+Потоковая разметка связных областей: области выдаются генератором, как только они завершены
+- изображение обрабатывается полосами строк; внутри полосы серии склеиваются векторно, как в regions.label
+- область "открыта", пока у неё есть пиксели в последней обработанной строке: только через них к ней
+  могут присоединиться следующие строки. Области без пикселей в последней строке завершены - они выдаются
+  и больше не хранятся
+- в памяти держатся только серии открытых областей и последняя строка, поэтому изображение может подаваться
+  полосами (например, из файла) и не помещаться в память целиком
+
+Номера областей идут в порядке завершения, а не первого пикселя, как в regions.label
+"""
+from dataclasses import dataclass
+from typing import Iterable, Iterator
+
+import numpy as np
+from PIL import Image
+
+from contours import Polygon, iter_polygons
+from quantize import to_rgb_array, pack_pixels
+from regions import row_runs, run_edges, union_roots
+from rle import RunMask, index_dtype
+from stats import NO_STATS, PIXELS_VISITED, REGIONS_FOUND
+
+DEFAULT_BAND_ROWS = 256
+
+
+@dataclass
+class Region:
+    id: int             # номер в порядке завершения, с 1
+    color: int          # код (цвет) области
+    mask: RunMask
+
+    @property
+    def area(self) -> int:
+        return self.mask.area
+
+    @property
+    def bbox(self) -> tuple[int, int, int, int]:
+        return self.mask.bbox
+
+    def polygons(self, connectivity: int = 4, tolerance: float = 0.0) -> list[Polygon]:
+        """
+        Контур области (см. contours.iter_polygons); строится по вырезке маски в габаритах области
+        """
+        x, y, width, height = self.bbox
+        crop = np.zeros((height, width), dtype=np.int32)
+        row, first, after_last = self.mask.rows()
+        for r, start, end in zip((row - y).tolist(), (first - x).tolist(), (after_last - x).tolist()):
+            crop[r, start:end] = 1
+        result = []
+        for polygon in iter_polygons(crop, np.array([0, self.color]), connectivity, tolerance):
+            polygon.region = self.id
+            polygon.exterior = polygon.exterior + (x, y)
+            polygon.holes = [hole + (x, y) for hole in polygon.holes]
+            result.append(polygon)
+        return result
+
+
+@dataclass
+class _Open:
+    """ Незавершённая область: серии накапливаются кусками по полосам """
+    color: int
+    starts: list[np.ndarray]
+    ends: list[np.ndarray]
+
+
+def _bands(codes: np.ndarray | Iterable[np.ndarray], band_rows: int) -> Iterator[np.ndarray]:
+    if isinstance(codes, np.ndarray):
+        if codes.ndim != 2:
+            raise ValueError(f"Ожидается двумерный массив кодов, получено измерений: {codes.ndim}")
+        for start in range(0, codes.shape[0], band_rows):
+            yield codes[start:start + band_rows]
+    else:
+        for band in codes:
+            yield np.atleast_2d(band)
+
+
+def image_bands(image: Image.Image, band_rows: int = DEFAULT_BAND_ROWS) -> Iterator[np.ndarray]:
+    """ Полосы упакованных rgb-кодов изображения, без преобразования всего изображения в массив """
+    for top in range(0, image.height, band_rows):
+        yield pack_pixels(to_rgb_array(image.crop((0, top, image.width, min(top + band_rows, image.height)))))
+
+
+def iter_regions(codes: np.ndarray | Iterable[np.ndarray], connectivity: int = 4, background=None,
+                 band_rows: int = DEFAULT_BAND_ROWS, height: int = None, stats=NO_STATS) -> Iterator[Region]:
+    """
+    Завершённые области по мере обработки строк
+    :param codes: двумерный массив кодов или итератор полос строк (h_i, w) одинаковой ширины
+    :param connectivity: 4 или 8
+    :param background: код фона, фон областей не образует
+    :param band_rows: строк в полосе, если codes - массив
+    :param height: высота изображения для формы масок; по умолчанию известна для массива, для итератора полос
+                   форма маски - (обработанные к моменту завершения области строки, ширина)
+    :param stats: stats.Stats для счётчиков
+    """
+    if isinstance(codes, np.ndarray) and height is None:
+        height = codes.shape[0]
+    opened: dict[int, _Open] = {}
+    next_open = 0
+    next_id = 1
+    previous_row = previous_open = None     # последняя строка и открытая область каждой её серии (-1 - фон)
+    row_offset = 0      # номер первой строки полосы в изображении
+    width = None
+
+    def finish(region: _Open, rows_seen: int) -> Region:
+        nonlocal next_id
+        starts, ends = np.concatenate(region.starts), np.concatenate(region.ends)
+        order = np.argsort(starts, kind='stable')
+        result = Region(next_id, region.color, RunMask((height or rows_seen, width), starts[order], ends[order]))
+        next_id += 1
+        if stats:
+            stats.count(REGIONS_FOUND)
+        return result
+
+    for band in _bands(codes, band_rows):
+        if not band.size:
+            continue
+        if width is None:
+            width = band.shape[1]
+        elif band.shape[1] != width:
+            raise ValueError(f"Ширина полосы {band.shape[1]} не совпадает с шириной изображения {width}")
+        top = 0 if previous_row is None else 1
+        block = band if previous_row is None else np.vstack([previous_row, band])
+        run_id, run_code, starts = row_runs(block)
+        a, b = run_edges(block, run_id, starts, connectivity, background)
+
+        run_start = np.flatnonzero(starts)
+        run_row = run_start // width
+        top_runs = np.count_nonzero(run_row < top)
+        if top_runs:    # серии верхней строки одной открытой области уже связаны через предыдущие строки
+            order = np.argsort(previous_open, kind='stable')
+            same = (previous_open[order][1:] == previous_open[order][:-1]) & (previous_open[order][1:] >= 0)
+            a = np.concatenate([a, order[1:][same].astype(a.dtype)])
+            b = np.concatenate([b, order[:-1][same].astype(b.dtype)])
+        roots = union_roots(len(run_code), a, b)
+
+        foreground = run_code != background if background is not None else np.ones(len(run_code), dtype=bool)
+        last_row = run_row == block.shape[0] - 1
+        open_roots = set(roots[foreground & last_row].tolist())
+
+        # открытые области, попавшие в каждую компоненту (несколько - значит, они слились)
+        inherited: dict[int, list[int]] = {}
+        if top_runs:
+            known = previous_open >= 0
+            for root, open_id in set(zip(roots[:top_runs][known].tolist(), previous_open[known].tolist())):
+                inherited.setdefault(root, []).append(open_id)
+
+        # новые серии полосы по компонентам
+        new = foreground & (run_row >= top)
+        new_runs = np.flatnonzero(new)
+        new_runs = new_runs[np.argsort(roots[new_runs], kind='stable')]
+        global_start = run_start[new_runs] + (row_offset - top) * width
+        run_end = np.append(run_start[1:], block.size)
+        global_end = run_end[new_runs] + (row_offset - top) * width
+        component_roots, bounds = np.unique(roots[new_runs], return_index=True)
+        bounds = np.append(bounds, len(new_runs)).tolist()
+
+        rows_seen = row_offset + band.shape[0]
+        shape = (height or rows_seen, width)
+        global_start = global_start.astype(index_dtype((height or 2 ** 31) * width), copy=False)
+        global_end = global_end.astype(global_start.dtype, copy=False)
+
+        # области, целиком лежащие в полосе (их большинство), выдаются сразу, без накопления кусков
+        tracked = open_roots | set(inherited)
+        simple = ~np.isin(component_roots, list(tracked))
+        colors = run_code[component_roots].tolist()
+        for index in np.flatnonzero(simple).tolist():
+            start, end = bounds[index], bounds[index + 1]
+            yield Region(next_id, colors[index], RunMask(shape, global_start[start:end], global_end[start:end]))
+            next_id += 1
+        if stats:
+            stats.count(REGIONS_FOUND, int(simple.sum()))
+
+        # области, продолжающие или продолжающиеся за полосу
+        pieces = {component_roots[index].item(): (bounds[index], bounds[index + 1])
+                  for index in np.flatnonzero(~simple).tolist()}
+        component_open = {}
+        for root in sorted(tracked):
+            parts = sorted(inherited.get(root, []))
+            if parts:
+                region = opened.pop(parts[0])
+                for other in parts[1:]:
+                    merged = opened.pop(other)
+                    region.starts += merged.starts
+                    region.ends += merged.ends
+            else:
+                region = _Open(run_code[root].item(), [], [])
+            if root in pieces:
+                start, end = pieces[root]
+                region.starts.append(global_start[start:end])
+                region.ends.append(global_end[start:end])
+            if root in open_roots:
+                if parts:
+                    open_id = parts[0]
+                else:
+                    open_id, next_open = next_open, next_open + 1
+                opened[open_id] = region
+                component_open[root] = open_id
+            else:
+                yield finish(region, rows_seen)
+
+        last_runs = np.flatnonzero(last_row)
+        previous_open = np.array([component_open.get(root, -1) for root in roots[last_runs].tolist()],
+                                 dtype=np.int64)
+        previous_row = block[-1:].copy()
+        row_offset = rows_seen
+        if stats:
+            stats.count(PIXELS_VISITED, band.size)
+
+    for open_id in sorted(opened):
+        yield finish(opened.pop(open_id), row_offset)
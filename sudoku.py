@@ -0,0 +1,288 @@
+"""
+Судоку n²×n² (9×9, 16×16, ...) на сетках Walls
+- кандидаты клетки - битовая маска: единица в бите d - цифра d + 1 возможна; занятые цифры строк, столбцов
+  и блоков - маски, объединённые побитовым ИЛИ
+- распространение ограничений векторное и сразу для пачки головоломок: одиночки в клетке (naked single)
+  и единственные места цифры в строке, столбце, блоке (hidden single), пока что-то меняется
+- поиск в глубину: ветвление по клетке с наименьшим числом кандидатов, ветви всех головоломок пачки
+  проходят то же распространение вместе
+- файл головоломок (по одной в строке) решается пачками, по желанию в нескольких процессах
+"""
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterator
+
+import numpy as np
+
+from bitgrid import POPCOUNT
+from cellsdata import Walls
+
+SYMBOLS = "123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"    # цифры 1, 2, ...; для 16×16 - 1-9 и A-G
+EMPTY = ".0_"           # символы пустой клетки
+BATCH = 2_000           # головоломок в пачке при решении файла
+
+
+def _box_size(size: int) -> int:
+    box = int(round(size ** 0.5))
+    if box * box != size or size > len(SYMBOLS):
+        raise ValueError(f"Сторона судоку должна быть квадратом не больше {len(SYMBOLS)}, получено {size}")
+    return box
+
+
+def _value(symbol: str) -> int:
+    if len(symbol) != 1:     # проверки ниже - по подстроке: ".0" сошло бы за пустую клетку, "23" - за 2
+        raise ValueError(f"Клетка судоку должна быть одним символом, получено {symbol!r}")
+    if symbol in EMPTY:
+        return 0
+    value = SYMBOLS.find(symbol.upper()) + 1
+    if not value:
+        raise ValueError(f"Неизвестный символ судоку: {symbol!r}")
+    return value
+
+
+def _checked(grid: np.ndarray) -> np.ndarray:
+    """ Проверка, что цифры не больше стороны: для 9×9 допустимы только 1-9 """
+    _box_size(grid.shape[0])
+    if grid.max(initial=0) > grid.shape[0]:
+        raise ValueError(f"Цифра {SYMBOLS[grid.max() - 1]} не помещается в судоку {grid.shape[0]}×{grid.shape[0]}")
+    return grid
+
+
+def from_walls(walls: Walls) -> np.ndarray:
+    """
+    Головоломка из сетки Walls: цифры SYMBOLS, пустые клетки - символы EMPTY
+    :return: (n², n²) int8, 0 - пустая клетка
+    """
+    codes, symbols = walls.get_codes()
+    grid = np.array([_value(symbol) for symbol in symbols], dtype=np.int8)[codes]
+    if grid.shape[0] != grid.shape[1]:
+        raise ValueError(f"Судоку должно быть квадратным, получено {grid.shape}")
+    return _checked(grid)
+
+
+def parse(line: str) -> np.ndarray:
+    """ Головоломка из строки n⁴ символов (формат сборников головоломок) """
+    line = line.strip()
+    size = int(round(len(line) ** 0.5))
+    if size * size != len(line):
+        raise ValueError(f"Длина строки судоку должна быть квадратом, получено {len(line)}")
+    return _checked(np.array([_value(symbol) for symbol in line], dtype=np.int8).reshape(size, size))
+
+
+def format_grid(grid: np.ndarray, empty: str = '.') -> str:
+    """ Головоломка строками символов: обратное к Walls(txt=...) """
+    table = np.array([empty] + list(SYMBOLS[:grid.shape[-1]]))
+    return '\n'.join(''.join(row) for row in table[grid])
+
+
+def to_walls(grid: np.ndarray) -> Walls:
+    return Walls(txt=format_grid(grid))
+
+
+def _mask_bits(masks: np.ndarray, size: int) -> np.ndarray:
+    """ Маски (...) -> булевы биты (..., n²), бит d - цифра d + 1 """
+    return ((masks[..., None] >> np.arange(size, dtype=masks.dtype)) & 1).astype(bool)
+
+
+def _popcount(masks: np.ndarray) -> np.ndarray:
+    masks = np.ascontiguousarray(masks)
+    return POPCOUNT[masks.view(np.uint8).reshape(masks.shape + (-1,))].sum(axis=-1, dtype=np.int16)
+
+
+class _Units:
+    """ Маски занятых цифр строк, столбцов, блоков и кандидаты клеток для пачки состояний (m, n², n²) """
+    def __init__(self, size: int):
+        self.size = size
+        self.box = _box_size(size)
+        self.dtype = np.uint64 if size > 31 else np.uint32
+        self.all = self.dtype((1 << size) - 1)
+        self.digit_bits = np.zeros(size + 1, dtype=self.dtype)
+        self.digit_bits[1:] = np.left_shift(self.dtype(1), np.arange(size, dtype=self.dtype))
+
+    def box_view(self, array: np.ndarray) -> np.ndarray:
+        """ (m, n², n², ...) -> (m, блок-строка, строка в блоке, блок-столбец, столбец в блоке, ...) """
+        box = self.box
+        return array.reshape(array.shape[:1] + (box, box, box, box) + array.shape[3:])
+
+    def masks(self, grid: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        :return: (маски кандидатов (m, n², n²), 0 у заполненных клеток; маски цифр строк (m, n²),
+                  столбцов (m, n²), блоков (m, n, n); повтор цифры в строке, столбце или блоке (m,))
+        """
+        digits = self.digit_bits[grid]
+        filled = grid > 0
+        rows = np.bitwise_or.reduce(digits, axis=2)
+        cols = np.bitwise_or.reduce(digits, axis=1)
+        boxes = np.bitwise_or.reduce(self.box_view(digits), axis=(2, 4))
+        duplicate = ((np.count_nonzero(filled, axis=2) != _popcount(rows)).any(axis=1)
+                     | (np.count_nonzero(filled, axis=1) != _popcount(cols)).any(axis=1)
+                     | (np.count_nonzero(self.box_view(filled), axis=(2, 4)) != _popcount(boxes)).any(axis=(1, 2)))
+        box_used = np.repeat(np.repeat(boxes, self.box, axis=1), self.box, axis=2)
+        candidates = np.where(filled, self.dtype(0), ~(rows[:, :, None] | cols[:, None, :] | box_used) & self.all)
+        return candidates, rows, cols, boxes, duplicate
+
+
+def _propagate(grid: np.ndarray, units: _Units) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Одиночки в клетках и единственные места цифр в строках, столбцах и блоках, пока есть что ставить.
+    Одновременно поставленные цифры могут противоречить друг другу - это обнаружится на следующем круге.
+    На каждом круге пересчитываются только состояния, изменившиеся на предыдущем
+    :param grid: пачка состояний (m, n², n²), меняется на месте
+    :return: (состояние не противоречиво (m,), маски кандидатов (m, n², n²) итоговых состояний)
+    """
+    size, box = units.size, units.box
+    dead = np.zeros(len(grid), dtype=bool)
+    active = np.arange(len(grid))
+    while len(active):
+        sub = grid[active]
+        candidates, rows, cols, boxes, sub_dead = units.masks(sub)
+        bits = _mask_bits(candidates, size)
+        empty = sub == 0
+        counts = _popcount(candidates)
+        sub_dead |= (empty & (counts == 0)).any(axis=(1, 2))
+
+        naked = empty & (counts == 1)
+        changed = naked.any(axis=(1, 2))
+        sub[naked] = bits[naked].argmax(axis=1) + 1
+
+        for axis, used in ((2, rows), (1, cols)):
+            places = bits.sum(axis=axis, dtype=np.int16)    # (m, строка или столбец, цифра)
+            used = _mask_bits(used, size)
+            sub_dead |= ((places == 0) & ~used).any(axis=(1, 2))
+            state, line, digit = np.nonzero((places == 1) & ~used)
+            if len(state):
+                line_bits = bits[state, line, :, digit] if axis == 2 else bits[state, :, line, digit]
+                position = line_bits.argmax(axis=1)
+                row, col = (line, position) if axis == 2 else (position, line)
+                sub[state, row, col] = digit + 1
+                changed[state] = True
+
+        # (m, блок-строка, блок-столбец, цифра, клетка блока)
+        box_bits = units.box_view(bits).transpose(0, 1, 3, 5, 2, 4).reshape(len(sub), box, box, size, size)
+        places = box_bits.sum(axis=4, dtype=np.int16)
+        used = _mask_bits(boxes, size)
+        sub_dead |= ((places == 0) & ~used).any(axis=(1, 2, 3))
+        state, box_row, box_col, digit = np.nonzero((places == 1) & ~used)
+        if len(state):
+            position = box_bits[state, box_row, box_col, digit].argmax(axis=1)
+            sub[state, box_row * box + position // box, box_col * box + position % box] = digit + 1
+            changed[state] = True
+
+        grid[active] = sub
+        dead[active] = sub_dead
+        active = active[changed & ~sub_dead]
+    return ~dead, units.masks(grid)[0]
+
+
+def solve_batch(grids: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Решение пачки головоломок одного размера
+    :param grids: (p, n², n²), 0 - пустая клетка
+    :return: (решения (p, n², n²), решена ли головоломка (p,)); у нерешаемых решение - нули
+    """
+    grids = np.array(grids, dtype=np.int8, ndmin=3)
+    count, size = grids.shape[0], grids.shape[1]
+    units = _Units(size)
+    solutions = np.zeros_like(grids)
+    solved = np.zeros(count, dtype=bool)
+    stack = [(grids.copy(), np.arange(count))]     # (состояния, номер головоломки каждого состояния)
+    while stack:
+        states, owner = stack.pop()
+        keep = ~solved[owner]
+        states, owner = states[keep], owner[keep]
+        if not len(states):
+            continue
+        alive, candidates = _propagate(states, units)
+        complete = alive & (states > 0).all(axis=(1, 2))
+        if complete.any():
+            done, first = np.unique(owner[complete], return_index=True)
+            solutions[done] = states[complete][first]
+            solved[done] = True
+        keep = alive & ~solved[owner]
+        states, owner, candidates = states[keep], owner[keep], candidates[keep]
+        if not len(states):
+            continue
+
+        # ветвление по клетке с наименьшим числом кандидатов
+        counts = _popcount(candidates)
+        counts[states > 0] = size + 1
+        cell = counts.reshape(len(states), -1).argmin(axis=1)
+        row, col = np.divmod(cell, size)
+        parent, digit = np.nonzero(_mask_bits(candidates[np.arange(len(states)), row, col], size))
+        children = states[parent]
+        children[np.arange(len(parent)), row[parent], col[parent]] = digit + 1
+        # поиск в глубину: первая ветвь каждого состояния идёт сразу, остальные ждут в стеке,
+        # поэтому пачка не разрастается на весь уровень дерева
+        eldest = np.ones(len(parent), dtype=bool)
+        eldest[1:] = parent[1:] != parent[:-1]
+        stack.append((children[~eldest], owner[parent[~eldest]]))
+        stack.append((children[eldest], owner[parent[eldest]]))
+    return solutions, solved
+
+
+def solve(grid: np.ndarray) -> np.ndarray | None:
+    """ Решение одной головоломки (n², n²) или None, если решения нет """
+    solutions, solved = solve_batch(grid[None])
+    return solutions[0] if solved[0] else None
+
+
+def solve_walls(walls: Walls) -> Walls | None:
+    """ Решение судоку из сетки Walls в виде новой сетки Walls или None, если решения нет """
+    solution = solve(from_walls(walls))
+    return to_walls(solution) if solution is not None else None
+
+
+def read_puzzles(path: Path) -> np.ndarray:
+    """
+    Головоломки из файла: по одной в строке (n⁴ символов), пустые строки и строки с # пропускаются
+    :return: (p, n², n²) int8
+    """
+    lines = [line.strip() for line in Path(path).read_text().splitlines()]
+    lines = [line for line in lines if line and not line.startswith('#')]
+    if not lines:
+        return np.zeros((0, 9, 9), dtype=np.int8)
+    size = parse(lines[0]).shape[0]
+    if any(len(line) != size * size for line in lines):
+        raise ValueError(f"Все головоломки файла {path} должны быть длины {size * size}")
+    table = np.full(256, -1, dtype=np.int8)
+    for symbol in EMPTY:
+        table[ord(symbol)] = 0
+    for value, symbol in enumerate(SYMBOLS[:size], start=1):
+        table[ord(symbol)] = table[ord(symbol.lower())] = value
+    data = np.frombuffer(''.join(lines).encode('ascii', errors='replace'), dtype=np.uint8)
+    grids = table[data]
+    if (grids < 0).any():
+        raise ValueError(f"Неизвестный символ в файле {path}: {chr(data[np.argmax(grids < 0)])!r}")
+    return grids.reshape(len(lines), size, size)
+
+
+def _batches(grids: np.ndarray, batch: int) -> Iterator[np.ndarray]:
+    for start in range(0, len(grids), batch):
+        yield grids[start:start + batch]
+
+
+def solve_many(grids: np.ndarray, processes: int = 0, batch: int = BATCH) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Решение многих головоломок пачками по batch
+    :param processes: 0 - в текущем процессе, иначе число процессов
+    """
+    if not processes or len(grids) <= batch:
+        results = map(solve_batch, _batches(grids, batch))
+        return _join(list(results), grids)
+    with ProcessPoolExecutor(processes) as executor:
+        return _join(list(executor.map(solve_batch, _batches(grids, batch))), grids)
+
+
+def _join(results: list[tuple[np.ndarray, np.ndarray]], grids: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    if not results:
+        return np.zeros_like(grids), np.zeros(len(grids), dtype=bool)
+    return np.concatenate([solutions for solutions, _ in results]), np.concatenate([solved for _, solved in results])
+
+
+def solve_file(path: Path, processes: int = 0, batch: int = BATCH) -> tuple[np.ndarray, np.ndarray]:
+    return solve_many(read_puzzles(path), processes, batch)
+
+
+def format_line(grid: np.ndarray, empty: str = '.') -> str:
+    """ Головоломка одной строкой (формат сборников) """
+    return format_grid(grid, empty).replace('\n', '')
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from benchmarks.generators import GENERATORS, maze, flat, to_text, to_csv
+from benchmarks.run_bench import run, compare
+from cellsdata import Walls
+from regions import label
+
+
+@pytest.mark.parametrize("name", list(GENERATORS))
+def test_generators_deterministic(name):
+    first = GENERATORS[name](31, 47)
+    assert first.shape == (31, 47)
+    assert first.dtype == np.uint8
+    assert (first == GENERATORS[name](31, 47)).all()
+
+
+def test_flat_needs_two_colors():
+    assert set(np.unique(flat(16, 16, n_colors=2))) == {0, 1}
+    with pytest.raises(ValueError):
+        flat(16, 16, n_colors=1)
+
+
+def test_maze_passages_connected():
+    grid = maze(21, 31)
+    assert label(grid, 4, background=1).count == 1
+
+
+def test_text_and_csv_load_into_walls():
+    codes = GENERATORS['noise'](5, 7)
+    assert Walls(txt=to_text(codes)).get_codes()[0].shape == (5, 7)
+    assert to_csv(codes).splitlines()[0].count(',') == 6
+
+
+def test_run_small():
+    results = run(['label', 'background'], ['stripes'], max_pixels=100, repeat=1, log=lambda line: None)
+    assert set(results) == {'label/stripes/10', 'background/stripes/10'}
+
+
+def test_compare_reports_regressions_only():
+    baseline = {'label/maze/100': 0.010, 'label/noise/100': 0.010, 'label/flat/100': 0.0001}
+    results = {'label/maze/100': 0.020, 'label/noise/100': 0.011, 'label/flat/100': 0.001}
+    regressions = compare(results, baseline, threshold=0.25)
+    assert len(regressions) == 1
+    assert regressions[0].startswith('label/maze/100')
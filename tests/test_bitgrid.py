@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+import bitgrid
+from bitgrid import BitGrid, pack_text, load_text
+
+
+def _board(shape, seed=0):
+    return np.random.default_rng(seed).random(shape) < 0.5
+
+
+def _reference_shift(board, drow, dcol):
+    height, width = board.shape
+    padded = np.zeros((height + 2 * abs(drow), width + 2 * abs(dcol)), dtype=bool)
+    padded[abs(drow):abs(drow) + height, abs(dcol):abs(dcol) + width] = board
+    return padded[abs(drow) + drow:abs(drow) + drow + height, abs(dcol) + dcol:abs(dcol) + dcol + width]
+
+
+@pytest.mark.parametrize("width", [1, 7, 8, 9, 30])
+def test_round_trip_and_count(width):
+    board = _board((5, width), width)
+    grid = BitGrid.from_dense(board)
+    assert (grid.to_dense() == board).all()
+    assert (grid.row(2) == board[2]).all()
+    assert grid.count() == board.sum()
+    assert (grid.row_counts() == board.sum(axis=1)).all()
+    assert grid[-1, width - 1] == board[-1, -1]
+    assert grid.nbytes == 5 * -(-width // 8)
+
+
+@pytest.mark.parametrize("drow, dcol", [(0, 1), (0, -1), (1, 0), (-1, 0), (1, 1), (-2, 9), (0, -17), (6, 0)])
+def test_shift(drow, dcol):
+    board = _board((5, 21))
+    shifted = BitGrid.from_dense(board).shift(drow, dcol)
+    assert (shifted.to_dense() == _reference_shift(board, drow, dcol)).all()
+    assert (shifted.bits[:, -1] >> 5 == 0).all()     # биты за шириной остаются нулями
+
+
+@pytest.mark.parametrize("connectivity", [4, 8])
+def test_neighbour_count(connectivity):
+    board = _board((9, 19), 3)
+    offsets = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+    if connectivity == 8:
+        offsets += [(-1, -1), (-1, 1), (1, -1), (1, 1)]
+    expected = sum(_reference_shift(board, *offset).astype(int) for offset in offsets)
+    assert (BitGrid.from_dense(board).neighbour_count(connectivity) == expected).all()
+
+
+def test_bitwise_and_compare():
+    first, second = _board((4, 13), 1), _board((4, 13), 2)
+    a, b = BitGrid.from_dense(first), BitGrid.from_dense(second)
+    assert ((a & b).to_dense() == (first & second)).all()
+    assert ((a | b).to_dense() == (first | second)).all()
+    assert (~a).count() == (~first).sum()
+    assert a.diff_count(b) == (first != second).sum()
+    assert a == BitGrid.from_dense(first) and a != b
+    with pytest.raises(ValueError, match="Размеры сеток не совпадают"):
+        a & BitGrid.zeros((4, 12))
+
+
+@pytest.mark.parametrize("text, separator", [(b"010\n110\n", b''), (b"010\r\n110", b''), (b"0,1,0\n1,1,0\n", b',')])
+def test_pack_text(text, separator, monkeypatch):
+    monkeypatch.setattr(bitgrid, "PACK_BLOCK_BYTES", 4)     # разбор по нескольким полосам
+    grid, symbols = pack_text(text, separator)
+    assert symbols == ['0', '1']
+    assert (grid.to_dense() == [[0, 1, 0], [1, 1, 0]]).all()
+
+
+@pytest.mark.parametrize("text, separator", [(b"012\n110", b''), (b"01\n110", b''), (b"0;1\n1;1", b','),
+                                             (b'"0",1', b','), ("▮▭".encode(), b'')])
+def test_pack_text_rejects(text, separator):
+    assert pack_text(text, separator) is None
+
+
+def test_load_text(tmp_path):
+    path = tmp_path / "grid.txt"
+    path.write_text("##.\n.##\n")
+    grid, symbols = load_text(path)
+    assert symbols == ['#', '.']
+    assert grid.to_dense().tolist() == [[False, False, True], [True, False, False]]
+    path.write_text("")
+    assert load_text(path) is None
@@ -3,6 +3,7 @@ from pathlib import Path
 from cellsdata import Walls
 import tempfile
 from PIL import Image
+import numpy as np
 
 
 def test_walls_init_with_txt():
@@ -222,3 +223,106 @@ def test_walls_load_from_png_wrong_mode():
             Walls(file_name=temp_path)
     finally:
         temp_path.unlink()
+
+
+def test_walls_load_from_png_quantized():
+    """Изображение с большим числом цветов, чем символов, квантуется"""
+    with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as f:
+        temp_path = Path(f.name)
+
+    try:
+        img = Image.new('RGB', (20, 5))
+        pixels = img.load()
+        for x in range(20):
+            for y in range(5):
+                pixels[x, y] = (x * 12, y * 50, 0)
+        img.save(temp_path)
+
+        walls = Walls(file_name=temp_path, n_colors=4)
+
+        assert len(walls.palette) <= 4
+        assert {cell for row in walls.wall for cell in row} <= set("0123")
+    finally:
+        temp_path.unlink()
+
+
+def test_walls_from_codes():
+    walls = Walls.from_codes(np.array([[0, 1], [1, 0]]), palette=[(0, 0, 0), (255, 255, 255)])
+    assert walls.wall == [['0', '1'], ['1', '0']]
+    codes, symbols = walls.get_codes()
+    assert symbols == ['0', '1']
+    assert codes.tolist() == [[0, 1], [1, 0]]
+
+
+def test_walls_two_symbols_packed(tmp_path):
+    path = tmp_path / "maze.csv"
+    path.write_text("1,0,1\n0,0,0\n")
+    walls = Walls(file_name=path)
+    assert walls.packed is not None and walls.symbols == ['0', '1']
+    codes, symbols = walls.get_codes()
+    assert codes.tolist() == [[1, 0, 1], [0, 0, 0]] and symbols == ['0', '1']
+    assert walls.packed is not None     # коды получены без распаковки в списки
+    assert walls.wall == [['1', '0', '1'], ['0', '0', '0']]
+    assert walls.packed is None
+
+
+def test_walls_pack_disabled():
+    walls = Walls(txt="10\n01", pack=False)
+    assert walls.packed is None and walls.wall == [['1', '0'], ['0', '1']]
+
+
+def test_walls_print_packed(capsys):
+    walls = Walls(txt="10\n01")
+    walls.print()
+    assert capsys.readouterr().out == "1 0\n0 1\n"
+    assert walls.packed is not None
+
+
+@pytest.mark.parametrize("pack", [True, False])
+def test_walls_convert_is_view(pack, capsys):
+    walls = Walls(txt="101\n000\n10x" if not pack else "101\n000\n100", pack=pack)
+    original = [row[:] for row in walls.get_cells()] if not pack else None
+    view = walls.convert({'0': '▮', '1': '▭'}, default='?')
+    expected_last = ['▭', '▮', '?' if not pack else '▮']
+    assert view.wall[-1] == expected_last
+    view.print()
+    assert capsys.readouterr().out.splitlines()[-1] == ' '.join(expected_last)
+    if pack:
+        assert walls.packed is not None     # упакованная сетка выводится без распаковки
+    else:
+        assert walls.wall == original
+    assert str(walls.convert({'0': '.'})).splitlines()[0] == "1 . 1"
+
+
+@pytest.mark.parametrize("pack", [True, False])
+def test_walls_view_follows_grid(pack, capsys):
+    walls = Walls(txt="101\n000\n100", pack=pack)
+    view = walls.convert({'0': '.', '1': '#'})
+    walls.wall[1][1] = '1'      # распаковывает упакованную сетку
+    view.print()
+    assert capsys.readouterr().out.splitlines() == ["# . #", ". # .", "# . ."]
+    assert str(view) == "# . #\n. # .\n# . ."
+
+
+def test_walls_view_does_not_copy(monkeypatch):
+    walls = Walls(txt="10x\n01x", pack=False)
+    monkeypatch.setattr(walls, "get_codes", lambda: pytest.fail("представление не должно копировать сетку"))
+    assert str(walls.convert({'0': '.', '1': '#'}, default='?')) == "# . ?\n. # ?"
+
+
+def test_empty_grid(tmp_path):
+    path = tmp_path / "empty.txt"
+    path.write_text("")
+    walls = Walls(path)
+    codes, symbols = walls.get_codes()
+    assert codes.shape == (0, 0) and symbols == []
+    assert str(walls.convert()) == ""
+
+
+def test_walls_print_buffered(monkeypatch):
+    import io
+    import cellsdata
+    monkeypatch.setattr(cellsdata, "WRITE_BUFFER", 4)
+    out = io.StringIO()
+    Walls(txt="ab\ncd\nef").print(out)
+    assert out.getvalue() == "a b\nc d\ne f\n"
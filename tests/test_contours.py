@@ -0,0 +1,67 @@
+import io
+import json
+
+import numpy as np
+import pytest
+
+from contours import iter_polygons, write_svg, write_geojson, simplify_ring
+from regions import label
+
+
+def test_square_region_has_four_vertices():
+    labels = np.zeros((50, 60), dtype=np.int32)
+    labels[10:40, 5:55] = 1
+    polygons = list(iter_polygons(labels))
+    assert len(polygons) == 1
+    assert polygons[0].exterior.tolist() == [[5, 10], [55, 10], [55, 40], [5, 40]]
+    assert polygons[0].area == 30 * 50
+
+
+def test_hole():
+    labels = np.array([[1, 1, 1],
+                       [1, 0, 1],
+                       [1, 1, 1]])
+    polygon, = iter_polygons(labels)
+    assert len(polygon.holes) == 1
+    assert polygon.area == 8
+
+
+def test_diagonal_pixels_by_connectivity():
+    labels = np.array([[1, 0],
+                       [0, 1]])
+    assert len(list(iter_polygons(labels, connectivity=4))) == 2
+    assert len(list(iter_polygons(labels, connectivity=8))) == 1
+
+
+@pytest.mark.parametrize("connectivity", [4, 8])
+def test_areas_match_pixel_counts(connectivity):
+    codes = np.random.default_rng(3).integers(0, 3, size=(30, 40))
+    labeling = label(codes, connectivity, background=0)
+    areas = {}
+    for polygon in iter_polygons(labeling.labels, labeling.colors, connectivity):
+        areas[polygon.region] = areas.get(polygon.region, 0) + polygon.area
+    assert areas == {region: count for region, count in enumerate(np.bincount(labeling.labels.ravel())) if region}
+
+
+def test_simplify_ring_keeps_shape():
+    y, x = np.indices((200, 200))
+    labels = ((x - 100) ** 2 + (y - 100) ** 2 < 90 ** 2).astype(np.int32)
+    polygon, = iter_polygons(labels)
+    simplified = simplify_ring(polygon.exterior, 1.0)
+    assert len(simplified) < len(polygon.exterior) / 3
+    assert abs(polygon.area - labels.sum()) == 0
+
+
+def test_write_geojson_and_svg():
+    labels = np.array([[1, 1, 0],
+                       [0, 2, 2]])
+    colors = np.array([0, 0xff0000, 0x00ff00])
+    out = io.StringIO()
+    assert write_geojson(iter_polygons(labels, colors), out) == 2
+    collection = json.loads(out.getvalue())
+    ring = collection["features"][0]["geometry"]["coordinates"][0]
+    assert ring[0] == ring[-1]
+
+    out = io.StringIO()
+    assert write_svg(iter_polygons(labels, colors), out, 3, 2) == 2
+    assert 'fill="#ff0000"' in out.getvalue()
@@ -0,0 +1,118 @@
+import socket
+
+import numpy as np
+import pytest
+
+import daemon
+from benchmarks.generators import rings, to_image
+from daemon import LabelDaemon, LabelClient
+from print_ascii import get_background_color, color_histogram
+from regions import label_image
+from stats import Stats
+
+
+@pytest.fixture
+def image():
+    return to_image(rings(30, 40, ring_width=3, n_colors=3))
+
+
+@pytest.fixture
+def service(tmp_path):
+    with LabelDaemon(tmp_path / "labels.sock", workers=0, stats=Stats()) as service:
+        yield service
+
+
+def test_message_round_trip():
+    one, other = socket.socketpair()
+    arrays = {'a': np.arange(6, dtype=np.int16).reshape(2, 3), 'empty': np.zeros((0, 3)), 'b': np.ones(3)[::2]}
+    daemon.send_message(one, {'op': 'x'}, arrays)
+    header, received = daemon.recv_message(other)
+    assert header == {'op': 'x'}
+    assert received.keys() == arrays.keys()
+    assert all((received[name] == array).all() and received[name].dtype == array.dtype
+               for name, array in arrays.items())
+    one.close()
+    assert daemon.recv_message(other) is None
+
+
+@pytest.mark.parametrize("source", ["path", "bytes", "pixels", "image"])
+def test_requests(service, image, tmp_path, source):
+    path = tmp_path / "image.png"
+    image.save(path)
+    data = {"path": path, "bytes": path.read_bytes(), "pixels": np.asarray(image), "image": image}[source]
+    expected = label_image(image, 8, (255, 255, 255))
+    with LabelClient(service.socket_path) as client:
+        for _ in range(2):
+            result = client.label(data, 8, (255, 255, 255))
+            assert (result.labels == expected.labels).all() and (result.colors == expected.colors).all()
+            assert result.by_color.keys() == expected.by_color.keys()
+        assert client.label(data, 8, "auto").count == label_image(image, 8, get_background_color(image)).count
+        assert client.background(data) == get_background_color(image)
+        colors, counts = client.histogram(data)
+        expected_colors, expected_counts = color_histogram(image)
+        assert (colors == expected_colors).all() and (counts == expected_counts).all()
+    assert service.stats.counters == {daemon.REQUESTS: 5, daemon.CACHE_HITS: 1}
+
+
+def test_frame_limit(tmp_path, image):
+    one, other = socket.socketpair()
+    one.sendall(daemon._LENGTH.pack(1 << 62))     # длина от собеседника не выделяется вслепую
+    with pytest.raises(ValueError):
+        daemon.recv_message(other)
+
+    with LabelDaemon(tmp_path / "small.sock", workers=0, max_frame_bytes=1000) as service:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as raw:
+            raw.connect(str(service.socket_path))
+            raw.sendall(daemon._LENGTH.pack(1 << 40))
+            header, _ = daemon.recv_message(raw)
+            assert header['ok'] is False and header['error'] == 'ValueError'
+            assert daemon.recv_message(raw) is None     # соединение закрыто
+        with LabelClient(service.socket_path) as client:
+            assert client.background(np.zeros((4, 4, 3), dtype=np.uint8)) == (0, 0, 0)
+
+
+def test_socket_directory(tmp_path, monkeypatch):
+    path = tmp_path / "run" / "labels.sock"
+    with LabelDaemon(path, workers=0):
+        assert path.parent.stat().st_mode & 0o777 == 0o700
+    shared = tmp_path / "shared"
+    shared.mkdir(mode=0o777)
+    shared.chmod(0o777)
+    monkeypatch.setattr(daemon, "DEFAULT_SOCKET", shared / "labels.sock")
+    with pytest.raises(PermissionError):     # путь по умолчанию - только в закрытой папке пользователя
+        LabelDaemon(daemon.DEFAULT_SOCKET, workers=0)
+    with pytest.raises(PermissionError):
+        LabelClient(daemon.DEFAULT_SOCKET)
+
+
+def test_path_cache_follows_file(service, tmp_path):
+    path = tmp_path / "image.png"
+    to_image(rings(20, 20, ring_width=2, n_colors=2)).save(path)
+    with LabelClient(service.socket_path) as client:
+        first = client.label(path).count
+        to_image(rings(20, 20, ring_width=5, n_colors=2)).save(path)
+        assert client.label(path).count != first
+
+
+def test_errors_keep_connection(service, image, tmp_path):
+    with LabelClient(service.socket_path) as client:
+        with pytest.raises(FileNotFoundError):
+            client.label(tmp_path / "missing.png")
+        with pytest.raises(ValueError):
+            client.request("unknown", image)
+        with pytest.raises(ValueError):
+            client.label(image, connectivity=6)
+        assert client.background(image) == get_background_color(image)
+
+
+def test_numpy_background(service, image):
+    background = get_background_color(image)     # компоненты - numpy-числа, не сериализуются в JSON напрямую
+    with LabelClient(service.socket_path) as client:
+        assert client.label(image, 8, background).count == label_image(image, 8, background).count
+        assert client.label(image, 8, np.array(background)).count == label_image(image, 8, background).count
+
+
+def test_worker_pool(tmp_path, image):
+    with LabelDaemon(tmp_path / "pool.sock", workers=1, inline_pixels=0) as service:
+        with LabelClient(service.socket_path) as client:
+            assert client.label(image, 4).count == label_image(image, 4).count
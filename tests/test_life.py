@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+import life
+from cellsdata import Walls
+from life import Life, parse_rule, pack, unpack
+
+
+def _reference_step(board, born, survive, toroidal):
+    if toroidal:
+        neighbours = sum(np.roll(np.roll(board, dy, 0), dx, 1).astype(int)
+                         for dy in (-1, 0, 1) for dx in (-1, 0, 1) if dy or dx)
+    else:
+        padded = np.pad(board, 1).astype(int)
+        h, w = board.shape
+        neighbours = sum(padded[1 + dy:1 + dy + h, 1 + dx:1 + dx + w]
+                         for dy in (-1, 0, 1) for dx in (-1, 0, 1) if dy or dx)
+    return np.where(board, np.isin(neighbours, list(survive)), np.isin(neighbours, list(born)))
+
+
+def test_parse_rule():
+    assert parse_rule("B3/S23") == (frozenset({3}), frozenset({2, 3}))
+    assert parse_rule("23/36") == (frozenset({3, 6}), frozenset({2, 3}))
+    assert parse_rule("s23/b3") == (frozenset({3}), frozenset({2, 3}))
+    with pytest.raises(ValueError, match="Некорректное правило"):
+        parse_rule("B9/S")
+
+
+@pytest.mark.parametrize("width", [1, 7, 64, 65, 130])
+def test_pack_round_trip(width):
+    board = np.random.default_rng(width).random((5, width)) < 0.5
+    assert (unpack(pack(board), width) == board).all()
+
+
+@pytest.mark.parametrize("width", [5, 64, 70, 130])
+@pytest.mark.parametrize("toroidal", [False, True])
+@pytest.mark.parametrize("rule", ["B3/S23", "B36/S23", "B2/S", "B0123/S012345678"])
+def test_matches_reference(width, toroidal, rule, monkeypatch):
+    monkeypatch.setattr(life, "BLOCK_WORDS", 4)     # несколько полос даже на маленьком поле
+    board = np.random.default_rng(width).random((17, width)) < 0.4
+    game = Life(board, rule, toroidal)
+    expected = board
+    for _ in range(8):
+        expected = _reference_step(expected, game.born, game.survive, toroidal)
+    assert (game.step(8).to_array() == expected).all()
+    assert game.generation == 8
+
+
+def test_glider_wraps_on_torus():
+    board = np.zeros((8, 8), dtype=bool)
+    board[[0, 1, 2, 2, 2], [1, 2, 0, 1, 2]] = True
+    game = Life(board, toroidal=True).step(32)    # планер возвращается через 4 * 8 поколений
+    assert (game.to_array() == board).all()
+    assert game.population == 5
+
+
+def test_walls_round_trip():
+    walls = Walls(txt="000\n111\n000")
+    game = Life.from_walls(walls).step()
+    assert game.to_walls().wall == [['0', '1', '0'], ['0', '1', '0'], ['0', '1', '0']]
@@ -0,0 +1,83 @@
+import threading
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import loader
+import quantize
+from cellsdata import Walls
+from loader import iter_walls, grid_files, estimate_bytes
+from benchmarks.generators import noise, to_image
+from stats import Stats
+
+
+@pytest.fixture
+def grids(tmp_path):
+    for i in range(6):
+        (tmp_path / f"{i}.txt").write_text(f"{i}{i}\n{i}0\n")
+    to_image(noise(4, 5)).save(tmp_path / "6.png")
+    (tmp_path / "notes.md").write_text("не сетка")
+    return tmp_path
+
+
+def test_grid_files(grids):
+    assert [path.name for path in grid_files(grids)] == [f"{i}.{'png' if i == 6 else 'txt'}" for i in range(7)]
+
+
+def test_estimate_bytes(grids):
+    assert estimate_bytes(grids / "0.txt") == 6
+    assert estimate_bytes(grids / "6.png") == 4 * 5 * loader.PNG_FACTOR
+
+
+@pytest.mark.parametrize("max_bytes", [1, 10, 10 ** 9])
+def test_in_order(grids, max_bytes):
+    paths = grid_files(grids)
+    loaded = list(iter_walls(paths, workers=3, max_bytes=max_bytes))
+    assert [walls.file_name for walls in loaded] == paths
+    assert loaded[3].wall == [['3', '3'], ['3', '0']]
+    assert loaded[-1].wall == Walls(paths[-1]).wall
+
+
+def test_concurrent_png_palettes(tmp_path, monkeypatch):
+    # больше цветов, чем символов сетки: каждая загрузка строит палитру через общий кэш палитр
+    rng = np.random.default_rng(0)
+    for i in range(16):
+        Image.fromarray(rng.integers(0, 256, (20, 20, 3), dtype=np.uint8)).save(tmp_path / f"{i:02}.png")
+    monkeypatch.setattr(quantize.palette_cache, "max_entries", 3)     # вытеснение идёт параллельно с поиском
+    monkeypatch.setattr(quantize.palette_cache, "tolerance", 0)
+    paths = grid_files(tmp_path)
+    expected = [Walls(path).wall for path in paths]
+    for _ in range(10):
+        assert [walls.wall for walls in iter_walls(paths, workers=8, max_bytes=10 ** 9)] == expected
+
+
+def test_memory_limit(grids, monkeypatch):
+    started, lock, peak = [], threading.Lock(), []
+    done = set()
+
+    def tracking_walls(path, **args):
+        with lock:
+            started.append(path)
+            peak.append(len(started) - len(done))
+        return Walls(path, **args)
+
+    monkeypatch.setattr(loader, "Walls", tracking_walls)
+    paths = grid_files(grids)[:6]
+    for walls in iter_walls(paths, workers=4, max_bytes=12):   # по 6 байт на файл - не больше двух в полёте
+        done.add(walls.file_name)
+    assert max(peak) <= 2
+
+
+def test_error_raised_in_turn(grids):
+    paths = [grids / "0.txt", grids / "missing.txt", grids / "1.txt"]
+    loaded = iter_walls(paths)
+    assert next(loaded).file_name == paths[0]
+    with pytest.raises(FileNotFoundError):
+        next(loaded)
+
+
+def test_stats(grids):
+    stats = Stats()
+    assert len(list(iter_walls(grid_files(grids), stats=stats))) == 7
+    assert stats.stages["load_wait"].calls == 7
@@ -0,0 +1,106 @@
+import numpy as np
+import pytest
+
+from benchmarks.generators import noise
+from cellsdata import Walls
+from morphology import dilate, erode, opening, closing, remove_small_components, distance_transform, \
+    clean_mask, clean_walls
+
+
+def _brute_dilate(mask, rows, cols):
+    """ Определение: пиксель в дилатации, если в окне [i - k // 2, i + k - 1 - k // 2] есть пиксель маски """
+    height, width = mask.shape
+    result = np.zeros_like(mask)
+    for r in range(height):
+        for c in range(width):
+            window = mask[max(r - rows // 2, 0):r + rows - rows // 2, max(c - cols // 2, 0):c + cols - cols // 2]
+            result[r, c] = window.any()
+    return result
+
+
+def _brute_distance(features, metric):
+    points = np.argwhere(features)
+    rows, cols = np.indices(features.shape)
+    delta_r = rows[..., None] - points[:, 0]
+    delta_c = cols[..., None] - points[:, 1]
+    if metric == "manhattan":
+        return (np.abs(delta_r) + np.abs(delta_c)).min(axis=2)
+    return np.sqrt(delta_r ** 2 + delta_c ** 2).min(axis=2)
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, (1, 4), (5, 2), 9])
+def test_dilate_erode(size):
+    mask = noise(17, 23, n_colors=5, seed=3) == 0
+    rows, cols = (size, size) if isinstance(size, int) else size
+    assert (dilate(mask, size) == _brute_dilate(mask, rows, cols)).all()
+    # эрозия - отражённый элемент, а за краем маска продолжается
+    flipped = ~mask[::-1, ::-1]
+    assert (erode(mask, size) == ~_brute_dilate(flipped, rows, cols)[::-1, ::-1]).all()
+
+
+@pytest.mark.parametrize("size", [2, 3, (2, 5)])
+def test_opening_closing(size):
+    mask = noise(30, 30, n_colors=2, seed=1) == 0
+    opened, closed = opening(mask, size), closing(mask, size)
+    assert not (opened & ~mask).any() and not (mask & ~closed).any()
+    assert (opening(opened, size) == opened).all() and (closing(closed, size) == closed).all()
+
+
+def test_clean_specks_and_gaps():
+    mask = np.zeros((7, 9), dtype=bool)
+    mask[3, 1:4] = mask[3, 5:8] = True     # стена с разрывом в один пиксель
+    mask[0, 8] = True                       # одиночная точка
+    assert (closing(mask, (1, 3))[3, 1:8]).all()
+    assert not opening(mask, (1, 3))[0, 8] and opening(mask, (1, 3))[3, 1:4].all()
+    cleaned = clean_mask(mask, min_size=2, close=(1, 3))
+    assert cleaned.sum() == 9 and cleaned[3].all()     # за краем маска продолжается: щели у края тоже замкнуты
+
+
+def test_remove_small_components():
+    mask = np.array([[1, 0, 0, 1],
+                     [0, 0, 1, 1],
+                     [1, 0, 0, 0]], dtype=bool)
+    assert remove_small_components(mask, 2).tolist() == [[0, 0, 0, 1], [0, 0, 1, 1], [0, 0, 0, 0]]
+    assert remove_small_components(mask, 1).tolist() == mask.tolist()
+    assert remove_small_components(mask, 4, connectivity=8).sum() == 0
+
+
+@pytest.mark.parametrize("metric", ["euclidean", "manhattan"])
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_distance_transform(metric, seed):
+    rng = np.random.default_rng(seed)
+    features = rng.random((19, 27)) < [0.002, 0.02, 0.3][seed]
+    features[rng.integers(19), rng.integers(27)] = True
+    assert np.allclose(distance_transform(features, metric), _brute_distance(features, metric))
+
+
+def test_distance_transform_edge_cases():
+    assert np.isinf(distance_transform(np.zeros((3, 4)))).all()
+    assert (distance_transform(np.ones((2, 2))) == 0).all()
+    line = distance_transform(np.array([[False, False, True, False]]), "manhattan")
+    assert line.tolist() == [[2, 1, 0, 1]]
+    with pytest.raises(ValueError):
+        distance_transform(np.ones((2, 2)), "chebyshev")
+    with pytest.raises(ValueError):
+        dilate(np.ones((2, 2)), 0)
+
+
+def test_clean_walls():
+    codes = np.zeros((9, 9), dtype=np.uint8)
+    codes[[0, -1]] = codes[:, [0, -1]] = 1
+    codes[3, :4] = codes[3, 5:] = 1         # стена с разрывом
+    codes[5, 4] = 1                         # точка стены в проходе
+    walls = Walls.from_codes(codes, symbols=['.', '#'])
+    result, symbols = clean_walls(walls, '#', min_size=2, close=(1, 3)).get_codes()
+    assert symbols == ['.', '#']
+    expected = codes.copy()
+    expected[5, 4], expected[3, 4] = 0, 1
+    assert result.tolist() == expected.tolist()
+    result, symbols = clean_walls(walls, '#', fill='~').get_codes()
+    assert sorted(symbols) == ['#', '.', '~'] and symbols[result[5, 4]] == '~'
+    assert clean_walls(walls, '?').get_codes()[0].tolist() == codes.tolist()
+
+
+def test_linear_in_element_size():
+    mask = noise(300, 300, n_colors=2) == 0
+    assert (dilate(mask, 151) == dilate(dilate(mask, 101), 51)).all()
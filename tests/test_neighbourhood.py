@@ -0,0 +1,10 @@
+import pytest
+
+from neighbourhood import CONNECTIVITY, check_connectivity
+
+
+def test_check_connectivity():
+    for connectivity in CONNECTIVITY:
+        check_connectivity(connectivity)
+    with pytest.raises(ValueError):
+        check_connectivity(6)
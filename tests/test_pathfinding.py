@@ -0,0 +1,91 @@
+from collections import deque
+
+import numpy as np
+import pytest
+
+from benchmarks.generators import maze
+from cellsdata import Walls
+from pathfinding import distance_map, exit_distances, exits, bfs_path, astar_path, solve, UNREACHABLE
+
+
+def _bfs(passable, source):
+    distances = np.full(passable.shape, UNREACHABLE)
+    distances[source] = 0
+    queue = deque([source])
+    while queue:
+        r, c = queue.popleft()
+        for nr, nc in ((r - 1, c), (r + 1, c), (r, c - 1), (r, c + 1)):
+            if (0 <= nr < passable.shape[0] and 0 <= nc < passable.shape[1]
+                    and passable[nr, nc] and distances[nr, nc] == UNREACHABLE):
+                distances[nr, nc] = distances[r, c] + 1
+                queue.append((nr, nc))
+    return distances
+
+
+def _valid_path(passable, path, start, goal):
+    steps = np.abs(np.diff(path, axis=0)).sum(axis=1)
+    return (tuple(path[0]) == start and tuple(path[-1]) == goal
+            and (steps == 1).all() and passable[path[:, 0], path[:, 1]].all())
+
+
+def test_distance_map_matches_reference():
+    passable = np.random.default_rng(0).random((25, 30)) < 0.7
+    passable[0, 0] = True
+    assert (distance_map(passable, [(0, 0)]) == _bfs(passable, (0, 0))).all()
+
+
+def test_multi_source_is_minimum():
+    passable = np.ones((5, 9), dtype=bool)
+    distances = distance_map(passable, [(0, 0), (4, 8)])
+    assert distances[0, 8] == 4
+    assert distances[2, 4] == 6
+
+
+def test_exit_distances():
+    walls = Walls(txt="11011\n10001\n10111\n10001\n11101")
+    passable = walls.get_codes()[0] == 0
+    assert exits(passable).tolist() == [[0, 2], [4, 3]]
+    distances = exit_distances(passable)
+    assert distances[0, 2] == 0 and distances[4, 3] == 0
+    assert distances[2, 1] == 3
+
+
+@pytest.mark.parametrize("find", [bfs_path, astar_path])
+def test_paths_in_maze_are_shortest(find):
+    passable = maze(41, 61) == 0
+    start, goal = (1, 1), (39, 59)
+    path = find(passable, start, goal)
+    assert _valid_path(passable, path, start, goal)
+    assert len(path) - 1 == _bfs(passable, start)[goal]
+
+
+def test_unreachable():
+    passable = np.array([[1, 0, 1]], dtype=bool)
+    assert bfs_path(passable, (0, 0), (0, 2)) is None
+    assert astar_path(passable, (0, 0), (0, 2)) is None
+
+
+@pytest.mark.parametrize("cell", [(0, 3), (2, 0), (-1, 0), (0, -1), (10 ** 9, 0)])
+def test_cells_outside_grid(cell):
+    passable = np.ones((2, 3), dtype=bool)
+    with pytest.raises(ValueError):     # столбец за шириной не переходит на следующую строку
+        distance_map(passable, [cell])
+    with pytest.raises(ValueError):
+        distance_map(passable, [(0, 0)], stop_at=cell)
+    with pytest.raises(ValueError):
+        bfs_path(passable, (0, 0), cell)
+    with pytest.raises(ValueError):
+        astar_path(passable, cell, (0, 0))
+
+
+def test_eight_connectivity():
+    passable = np.eye(4, dtype=bool)
+    assert bfs_path(passable, (0, 0), (3, 3)) is None
+    assert len(bfs_path(passable, (0, 0), (3, 3), connectivity=8)) == 4
+    assert len(astar_path(passable, (0, 0), (3, 3), connectivity=8)) == 4
+
+
+def test_solve_walls_between_exits():
+    walls = Walls(txt="10111\n10001\n11101")
+    path = solve(walls)
+    assert path.tolist() == [[0, 1], [1, 1], [1, 2], [1, 3], [2, 3]]
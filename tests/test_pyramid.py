@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from benchmarks.generators import flat, noise, rings, to_image, PALETTE
+from pyramid import downsample_mode, build_pyramid, estimate_regions, estimate_image
+from regions import label
+from stats import Stats
+
+
+def test_downsample_mode():
+    codes = np.array([[1, 1, 2, 3, 5],
+                      [1, 2, 3, 3, 5],
+                      [4, 5, 6, 6, 7]])
+    coarse, mismatched = downsample_mode(codes)
+    assert coarse.tolist() == [[1, 3, 5], [4, 6, 7]]
+    assert mismatched == 1 + 1 + 0 + 2 + 0 + 0
+
+
+def test_build_pyramid():
+    codes = flat(64, 48)
+    pyramid, errors = build_pyramid(codes, levels=10)
+    assert [level.shape for level in pyramid][:3] == [(64, 48), (32, 24), (16, 12)]
+    assert min(pyramid[-1].shape) >= 4 and errors == sorted(errors)
+    pyramid, errors = build_pyramid(noise(64, 64), levels=3, max_error=0)
+    assert len(pyramid) == 1 and errors == [0]
+    with pytest.raises(ValueError):
+        build_pyramid(np.zeros(5))
+
+
+def test_exact_fallback():
+    codes = noise(40, 50, seed=2)
+    exact = label(codes, 8, background=0)
+    for tolerance in (0, 0.1):     # шум не укладывается ни в какой разумный допуск
+        estimate = estimate_regions(codes, 8, background=0, tolerance=tolerance)
+        assert estimate.exact and estimate.error == 0
+        assert (estimate.labeling.labels == exact.labels).all()
+        assert estimate.areas.tolist() == np.bincount(exact.labels.ravel())[1:].tolist()
+    rows, cols = np.nonzero(exact.labels == 1)
+    assert estimate.boxes[0].tolist() == [cols.min(), rows.min(), np.ptp(cols) + 1, np.ptp(rows) + 1]
+
+
+@pytest.mark.parametrize("shape", [(256, 320), (255, 321)])
+def test_estimate_large_regions(shape):
+    codes = rings(*shape, ring_width=13, n_colors=3)
+    exact = label(codes, 4, background=0)
+    stats = Stats()
+    estimate = estimate_regions(codes, 4, background=0, levels=3, tolerance=0.2, stats=stats)
+    assert estimate.level == 2 and estimate.count == exact.count
+    assert 0 < estimate.error <= 0.2 * codes.size
+    exact_areas = np.bincount(exact.labels.ravel())[1:]
+    assert np.abs(estimate.areas - exact_areas).sum() <= estimate.error
+    assert (estimate.boxes[:, 0] + estimate.boxes[:, 2] <= shape[1]).all()
+    assert (estimate.boxes[:, 1] + estimate.boxes[:, 3] <= shape[0]).all()
+    assert {"pyramid", "label", "extents"} <= stats.stages.keys()
+
+
+def test_estimate_image():
+    codes = flat(100, 100, blocks=2)
+    estimate = estimate_image(to_image(codes), background=tuple(PALETTE[0].tolist()))
+    assert not estimate.exact and estimate.count == label(codes, background=0).count
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from quantize import quantize, exact_palette, median_cut, kmeans, map_to_palette, PaletteCache, quantize_image
+
+
+def _gradient(h=20, w=30, seed=1):
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, 256, size=(h, w, 3), dtype=np.uint8)
+
+
+def test_exact_palette_first_appearance_order():
+    rgb = np.array([[[9, 9, 9], [1, 1, 1]],
+                    [[1, 1, 1], [5, 5, 5]]], dtype=np.uint8)
+    codes, palette = exact_palette(rgb)
+    assert palette.tolist() == [[9, 9, 9], [1, 1, 1], [5, 5, 5]]
+    assert codes.tolist() == [[0, 1], [1, 2]]
+
+
+def test_quantize_few_colors_is_exact():
+    rgb = np.zeros((4, 4, 3), dtype=np.uint8)
+    rgb[1:3, 1:3] = (255, 0, 0)
+    codes, palette = quantize(rgb, 16, cache=None)
+    assert len(palette) == 2
+    assert (palette[codes] == rgb).all()
+
+
+@pytest.mark.parametrize("method", ['median_cut', 'kmeans'])
+def test_quantize_reduces_colors(method):
+    rgb = _gradient()
+    codes, palette = quantize(rgb, 8, method=method, cache=None)
+    assert len(palette) <= 8
+    assert codes.shape == rgb.shape[:2]
+    assert codes.max() < len(palette)
+
+
+def test_median_cut_separates_clusters():
+    pixels = np.array([[0, 0, 0]] * 50 + [[250, 250, 250]] * 50, dtype=np.uint8)
+    palette = median_cut(pixels, 2)
+    assert sorted(palette.tolist()) == [[0, 0, 0], [250, 250, 250]]
+
+
+def test_kmeans_palette_size():
+    pixels = _gradient().reshape(-1, 3)
+    assert len(kmeans(pixels, 4)) <= 4
+
+
+def test_map_to_palette_nearest():
+    palette = np.array([[0, 0, 0], [255, 255, 255]], dtype=np.uint8)
+    rgb = np.array([[[10, 10, 10], [200, 210, 220]]], dtype=np.uint8)
+    assert map_to_palette(rgb, palette).tolist() == [[0, 1]]
+
+
+def test_palette_cache_reuses_palette_for_similar_image():
+    cache = PaletteCache()
+    rgb = _gradient()
+    _, palette1 = quantize(rgb, 4, cache=cache)
+    similar = rgb.copy()
+    similar[0, 0] = (0, 0, 0)
+    _, palette2 = quantize(similar, 4, cache=cache)
+    assert cache.hits == 1
+    assert palette2 is palette1
+
+
+def test_quantize_bad_method():
+    with pytest.raises(ValueError, match="Неизвестный метод"):
+        quantize(_gradient(), 4, method='octree')
+
+
+def test_quantize_image():
+    img = Image.fromarray(_gradient())
+    assert len(img.getcolors(maxcolors=1000)) > 4
+    assert len(quantize_image(img, 4, cache=None).getcolors()) <= 4
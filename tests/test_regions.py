@@ -0,0 +1,116 @@
+from collections import deque
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from cellsdata import Walls
+from regions import label, label_walls, label_image, label_background, find_holes, fill_holes, adjacency_edges, \
+    adjacency_graph
+
+
+def _flood_labels(codes, connectivity, background=None):
+    """Эталон: заливка из каждого ещё не размеченного пикселя"""
+    h, w = codes.shape
+    steps = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+    if connectivity == 8:
+        steps += [(-1, -1), (-1, 1), (1, -1), (1, 1)]
+    labels = np.zeros((h, w), dtype=int)
+    count = 0
+    for r in range(h):
+        for c in range(w):
+            if labels[r, c] or codes[r, c] == background:
+                continue
+            count += 1
+            labels[r, c] = count
+            queue = deque([(r, c)])
+            while queue:
+                y, x = queue.popleft()
+                for dy, dx in steps:
+                    ny, nx = y + dy, x + dx
+                    if 0 <= ny < h and 0 <= nx < w and not labels[ny, nx] and codes[ny, nx] == codes[y, x]:
+                        labels[ny, nx] = count
+                        queue.append((ny, nx))
+    return labels
+
+
+@pytest.mark.parametrize("connectivity", [4, 8])
+@pytest.mark.parametrize("seed", range(5))
+def test_label_matches_flood_fill(connectivity, seed):
+    codes = np.random.default_rng(seed).integers(0, 3, size=(15, 17))
+    result = label(codes, connectivity, background=0)
+    assert (result.labels == _flood_labels(codes, connectivity, background=0)).all()
+
+
+def test_touching_colors_are_separate_regions():
+    codes = np.array([[1, 1, 2, 2],
+                      [1, 1, 2, 2]])
+    result = label(codes)
+    assert result.count == 2
+    assert result.labels.tolist() == [[1, 1, 2, 2], [1, 1, 2, 2]]
+    assert {code: ids.tolist() for code, ids in result.by_color.items()} == {1: [1], 2: [2]}
+
+
+def test_diagonal_connectivity():
+    codes = np.array([[1, 0],
+                      [0, 1]])
+    assert label(codes, 4, background=0).count == 2
+    assert label(codes, 8, background=0).count == 1
+
+
+def test_bad_connectivity():
+    with pytest.raises(ValueError, match="Связность"):
+        label(np.zeros((2, 2)), connectivity=6)
+
+
+def test_label_walls_ex1():
+    walls = Walls(txt="0011\n0100\n1101")
+    result = label_walls(walls, background='0')
+    assert result.count == 3
+    assert list(result.by_color) == ['1']
+
+
+def test_label_image_by_rgb():
+    rgb = np.zeros((3, 3, 3), dtype=np.uint8)
+    rgb[0, 0] = (255, 0, 0)
+    rgb[2, 2] = (255, 0, 0)
+    rgb[1, 1] = (0, 0, 255)
+    result = label_image(rgb, background=(0, 0, 0))
+    assert result.count == 3
+    assert result.by_color[(255, 0, 0)].tolist() == [1, 3]
+    assert result.by_color[(0, 0, 255)].tolist() == [2]
+
+
+def test_find_holes_ex1():
+    codes, symbols = Walls(Path(__file__).parent.parent / "data" / "ex1.txt").get_codes()
+    holes = find_holes(codes, symbols.index('0'))
+    assert holes.count == 1
+    assert holes.labels[5, 1] == 1
+    assert holes.labels[3, 10] == 0    # открыт к краю
+
+
+def test_label_background():
+    codes = np.array([[0, 1, 0],
+                      [1, 0, 1],
+                      [0, 1, 0]])
+    assert label_background(codes, 0, connectivity=4).count == 1    # фон 8-связный
+    assert label_background(codes, 0, connectivity=8).count == 5
+
+
+def test_fill_holes():
+    mask = np.array([[1, 1, 1, 0],
+                     [1, 0, 1, 0],
+                     [1, 1, 1, 0],
+                     [0, 0, 0, 0]], dtype=bool)
+    filled = fill_holes(mask)
+    assert filled[1, 1]
+    assert (filled ^ mask).sum() == 1
+
+
+def test_adjacency_graph():
+    labels = np.array([[1, 1, 2],
+                       [3, 3, 2],
+                       [3, 3, 4]])
+    assert adjacency_edges(labels).tolist() == [[1, 2], [1, 3], [2, 3], [2, 4], [3, 4]]
+    assert adjacency_graph(labels)[1] == {2, 3}
+    assert adjacency_graph(labels, 8)[2] == {1, 3, 4}
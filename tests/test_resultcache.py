@@ -0,0 +1,162 @@
+import os
+import threading
+
+import numpy as np
+import pytest
+
+from benchmarks.generators import noise, rings, to_image
+from print_ascii import get_background_color, total_colors, color_histogram
+from quantize import quantize
+from regions import label, label_image
+from resultcache import ResultCache, MemoryCache, content_key, NO_CACHE
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResultCache(tmp_path / "cache")
+
+
+def test_content_key():
+    codes = noise(8, 8)
+    assert content_key("label", codes, (4,)) == content_key("label", codes.copy(), (4,))
+    assert content_key("label", codes, (4,)) != content_key("label", codes, (8,))
+    assert content_key("label", codes, (4,)) != content_key("colors", codes, (4,))
+    assert content_key("label", codes, ()) != content_key("label", codes.reshape(4, 16), ())
+    assert content_key("x", to_image(codes)) != content_key("x", to_image(noise(8, 8, seed=1)))
+
+
+def test_fetch_computes_once(cache):
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {'value': np.arange(3)}
+
+    codes = noise(4, 4)
+    assert (cache.fetch("f", codes, (), compute)['value'] == [0, 1, 2]).all()
+    assert (cache.fetch("f", codes, (), compute)['value'] == [0, 1, 2]).all()
+    assert len(calls) == 1 and cache.hits == 1 and cache.misses == 1
+    assert NO_CACHE.fetch("f", codes, (), compute) and len(calls) == 2
+
+
+def test_entries_survive_restart(cache):
+    cache.fetch("f", noise(4, 4), (), lambda: {'value': np.ones(2)})
+    reopened = ResultCache(cache.directory)
+    assert len(reopened) == 1
+    assert reopened.fetch("f", noise(4, 4), (), lambda: pytest.fail("значение должно браться из кэша"))
+
+
+def test_lru_eviction(tmp_path):
+    cache = ResultCache(tmp_path, max_bytes=1)
+    cache.fetch("a", noise(4, 4), (), lambda: {'v': np.zeros(1)})
+    cache.put(content_key("b", noise(4, 4)), {'v': np.zeros(1)})
+    assert len(cache) == 1 and len(list(tmp_path.glob("*.npz"))) == 1
+
+    cache = ResultCache(tmp_path / "big", max_bytes=10 ** 6)
+    for name in "abc":
+        cache.put(name, {'v': np.zeros(1)})
+        os.utime(cache._path(name), (0, 0))     # выравниваем время, порядок задаёт только обращение
+    cache.get("a")
+    cache.max_bytes = cache.size - 1
+    cache.put("d", {'v': np.zeros(1)})
+    assert list(cache._sizes) == ["a", "d"]     # b и c давно не использовались
+    assert sorted(path.stem for path in cache.directory.glob("*.npz")) == ["a", "d"]
+
+
+def test_concurrent_put(cache):
+    arrays, errors = {'v': np.arange(10 ** 5)}, []
+
+    def put():
+        try:
+            cache.put("same", arrays)
+        except OSError as error:    # общий временный файл: его уже переместил другой поток
+            errors.append(error)
+
+    threads = [threading.Thread(target=put) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    assert (cache.get("same")['v'] == arrays['v']).all()
+    assert not list(cache.directory.glob("*.tmp"))
+
+
+def test_concurrent_eviction(tmp_path):
+    cache = ResultCache(tmp_path, max_bytes=2000)
+    errors = []
+
+    def work(thread):
+        try:
+            for i in range(30):
+                cache.put(f"{thread}-{i}", {'v': np.arange(100) + i})
+                cache.get(f"{thread}-{i - 1}")
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=work, args=(thread,)) for thread in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    assert cache.size <= 2000 and sum(path.stat().st_size for path in tmp_path.glob("*.npz")) == cache.size
+
+
+def test_limit_shared_between_processes(tmp_path):
+    first, second = ResultCache(tmp_path, max_bytes=10 ** 6), ResultCache(tmp_path, max_bytes=10 ** 6)
+    for time, name in enumerate("abc"):
+        first.put(name, {'v': np.zeros(1)})
+        os.utime(first._path(name), (time, time))
+    second.max_bytes = first.size       # второй экземпляр записей первого не видел
+    second.put("d", {'v': np.zeros(1)})
+    assert sorted(path.stem for path in tmp_path.glob("*.npz")) == ["b", "c", "d"]
+
+
+def test_corrupted_entry_is_miss(cache):
+    cache.put("broken", {'v': np.zeros(1)})
+    cache._path("broken").write_bytes(b"not a zip")
+    assert cache.get("broken") is None
+
+
+@pytest.mark.parametrize("kind", ["disk", "memory"])
+def test_integration(tmp_path, kind):
+    cache = ResultCache(tmp_path / "cache") if kind == "disk" else MemoryCache()
+    image = to_image(rings(30, 40, ring_width=3, n_colors=3))
+    assert get_background_color(image, result_cache=cache) == get_background_color(image)
+    assert get_background_color(image, result_cache=cache) == get_background_color(image)
+    assert total_colors(image, result_cache=cache) == total_colors(image)
+    colors, counts = color_histogram(image, cache)
+    assert counts.sum() == 30 * 40 and len(colors) == 3
+
+    expected = label_image(image, 8, (255, 255, 255))
+    for _ in range(2):
+        cached = label_image(image, 8, (255, 255, 255), result_cache=cache)
+        assert (cached.labels == expected.labels).all() and (cached.colors == expected.colors).all()
+        assert cached.by_color.keys() == expected.by_color.keys()
+    assert label(noise(5, 5), 4, result_cache=cache).count == label(noise(5, 5), 4).count
+
+    codes, palette = quantize(image, 2, result_cache=cache)
+    cached_codes, cached_palette = quantize(image, 2, result_cache=cache)
+    assert (codes == cached_codes).all() and (palette == cached_palette).all()
+    assert cache.hits == 4
+
+
+def test_memory_cache():
+    cache = MemoryCache(max_bytes=3 * 80)
+    for key in "abc":
+        cache.put(key, {'v': np.zeros(10)})
+    assert cache.get("a") is not None and cache.size == 240
+    cache.put("d", {'v': np.zeros(10)})
+    assert cache.get("b") is None and len(cache) == 3
+    assert cache.hits == 1 and cache.misses == 1
+    with pytest.raises(ValueError):
+        cache.get("a")['v'][0] = 1     # записи общие, менять их нельзя
+    mine = {'v': np.zeros(10)}
+    cache.put("e", mine)
+    mine['v'][0] = 1                    # свой массив после put по-прежнему можно менять
+    assert cache.get("e")['v'][0] == 0
+    for _ in range(2):      # промах и попадание возвращают одинаковые записи только для чтения
+        assert not cache.fetch("f", noise(4, 4), (), lambda: {'v': np.zeros(2)})['v'].flags.writeable
+    cache.clear()
+    assert len(cache) == 0 and cache.size == 0
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from regions import label, label_runs
+from rle import RunMask
+
+
+def _random_mask(seed, shape=(13, 17), fill=0.5):
+    return np.random.default_rng(seed).random(shape) < fill
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_dense_round_trip(seed):
+    mask = _random_mask(seed)
+    runs = RunMask.from_dense(mask)
+    assert (runs.to_dense() == mask).all()
+    assert runs.area == mask.sum()
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_set_operations_match_dense(seed):
+    a, b = _random_mask(seed), _random_mask(seed + 100)
+    run_a, run_b = RunMask.from_dense(a), RunMask.from_dense(b)
+    assert run_a | run_b == RunMask.from_dense(a | b)
+    assert run_a & run_b == RunMask.from_dense(a & b)
+    assert run_a - run_b == RunMask.from_dense(a & ~b)
+    assert run_a.iou(run_b) == pytest.approx((a & b).sum() / (a | b).sum())
+
+
+def test_union_across_row_boundary_stays_row_runs():
+    a = RunMask.from_dense(np.array([[0, 0, 1], [0, 0, 0]], dtype=bool))
+    b = RunMask.from_dense(np.array([[0, 0, 0], [1, 0, 0]], dtype=bool))
+    union = a | b
+    assert len(union) == 2
+    assert union.rows()[0].tolist() == [0, 1]
+
+
+def test_bbox():
+    mask = np.zeros((10, 10), dtype=bool)
+    mask[2:5, 3:8] = True
+    mask[6, 1] = True
+    assert RunMask.from_dense(mask).bbox == (1, 2, 7, 5)
+    assert RunMask.from_dense(np.zeros((3, 3))).bbox == (0, 0, 0, 0)
+
+
+def test_coco_round_trip():
+    mask = _random_mask(7, (6, 5))
+    rle = RunMask.from_dense(mask).to_coco()
+    assert sum(rle['counts']) == mask.size
+    assert (RunMask.from_coco(rle).to_dense() == mask).all()
+
+
+def test_shape_mismatch():
+    with pytest.raises(ValueError, match="Размеры масок"):
+        RunMask.from_dense(np.ones((2, 2))) | RunMask.from_dense(np.ones((3, 3)))
+
+
+@pytest.mark.parametrize("connectivity", [4, 8])
+def test_label_runs_match_label(connectivity):
+    codes = np.random.default_rng(1).integers(0, 3, size=(20, 25))
+    labeling = label(codes, connectivity, background=0)
+    colors, masks = label_runs(codes, connectivity, background=0)
+    assert (colors == labeling.colors).all()
+    for region, mask in enumerate(masks, start=1):
+        assert (mask.to_dense() == (labeling.labels == region)).all()
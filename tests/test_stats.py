@@ -0,0 +1,68 @@
+import contextlib
+import io
+
+import numpy as np
+
+from cellsdata import Walls
+from regions import label
+from stats import Stats, NO_STATS, PIXELS_VISITED, REGIONS_FOUND, BYTES_WRITTEN
+
+
+def test_stage_timing_and_counters():
+    stats = Stats()
+    with stats.stage("work"):
+        sum(range(1000))
+    with stats.stage("work"):
+        pass
+    stats.count("items", 3)
+    stats.count("items")
+    stats.maximum("depth", 5)
+    stats.maximum("depth", 2)
+    assert stats.stages["work"].calls == 2
+    assert stats.stages["work"].wall > 0
+    assert stats.counters == {"items": 4, "depth": 5}
+    assert "work" in stats.report()
+    assert stats.as_dict()["counters"]["items"] == 4
+
+
+def test_no_stats_is_falsy_noop():
+    assert not NO_STATS
+    with NO_STATS.stage("anything"):
+        NO_STATS.count("x")
+    assert not hasattr(NO_STATS, "counters")
+
+
+def test_profile_and_memory_hooks():
+    stats = Stats(profile=True, memory=True)
+    with stats.stage("outer"):
+        with stats.stage("inner"):
+            data = [0] * 10000
+    assert stats.stages["inner"].memory_peak >= len(data) * 8
+    assert "function calls" in stats.profile_report()
+
+
+def test_nested_memory_peaks():
+    stats = Stats(memory=True)
+    with stats.stage("outer"):
+        big = bytearray(4_000_000)
+        del big
+        with stats.stage("inner"):
+            small = bytearray(100_000)
+        with stats.stage("inner"):
+            del small
+    outer, inner = stats.stages["outer"].memory_peak, stats.stages["inner"].memory_peak
+    assert 100_000 <= inner < 1_000_000      # пик внешнего этапа до вложенного не засчитывается вложенному
+    assert outer >= 4_000_000               # а внешний сохраняет свой пик
+
+
+def test_label_and_walls_report_stats():
+    stats = Stats()
+    label(np.array([[0, 1], [1, 0]]), background=0, stats=stats)
+    assert stats.counters[PIXELS_VISITED] == 4
+    assert stats.counters[REGIONS_FOUND] == 2
+
+    walls = Walls(txt="01\n10", stats=stats)
+    with contextlib.redirect_stdout(io.StringIO()) as out:
+        walls.print()
+    assert stats.counters[BYTES_WRITTEN] == len(out.getvalue().encode())
+    assert {"load", "label", "render"} <= set(stats.stages)
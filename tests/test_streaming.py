@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from benchmarks.generators import GENERATORS, rings, to_image
+from contours import iter_polygons
+from print_ascii import pack_rgb
+from regions import label, label_image
+from rle import RunMask
+from stats import Stats, REGIONS_FOUND, PIXELS_VISITED
+from streaming import iter_regions, image_bands
+
+
+def _canonical(pairs):
+    return sorted((int(color), tuple(mask.starts.tolist()), tuple(mask.ends.tolist())) for color, mask in pairs)
+
+
+def _reference(codes, connectivity, background):
+    labeling = label(codes, connectivity, background)
+    return _canonical((labeling.colors[i], RunMask.from_dense(labeling.labels == i))
+                      for i in range(1, labeling.count + 1))
+
+
+@pytest.mark.parametrize("generator", list(GENERATORS))
+@pytest.mark.parametrize("connectivity", [4, 8])
+@pytest.mark.parametrize("background", [None, 0])
+@pytest.mark.parametrize("band_rows", [1, 4, 100])
+def test_matches_label(generator, connectivity, background, band_rows):
+    codes = GENERATORS[generator](23, 31)
+    regions = list(iter_regions(codes, connectivity, background, band_rows))
+    assert [region.id for region in regions] == list(range(1, len(regions) + 1))
+    assert all(region.mask.shape == codes.shape for region in regions)
+    assert _canonical((region.color, region.mask) for region in regions) == _reference(codes, connectivity, background)
+
+
+def test_u_shape_merges_open_regions():
+    codes = np.array([[1, 0, 1],
+                      [1, 0, 1],
+                      [1, 1, 1]])
+    regions = list(iter_regions(codes, background=0, band_rows=1))
+    assert len(regions) == 1 and regions[0].area == 7 and regions[0].bbox == (0, 0, 3, 3)
+
+
+def test_yields_before_scan_ends():
+    codes = np.array([[1, 0], [0, 0], [2, 2], [0, 0]])
+    consumed = []
+
+    def bands():
+        for row in codes:
+            consumed.append(row)
+            yield row[None]
+
+    regions = iter_regions(bands(), background=0)
+    first = next(regions)
+    assert first.color == 1 and len(consumed) == 2      # область 1 завершена второй строкой
+    assert first.mask.shape == (2, 2)                   # высота заранее неизвестна
+    assert [region.color for region in regions] == [2]
+
+
+def test_image_bands_and_polygons():
+    image = to_image(rings(20, 24, ring_width=3))
+    regions = list(iter_regions(image_bands(image, 7), 4, pack_rgb((255, 255, 255))))
+    labeling = label_image(image, 4, (255, 255, 255))
+    assert len(regions) == labeling.count
+
+    expected = sorted(polygon.area for polygon in iter_polygons(labeling.labels, labeling.colors))
+    streamed = [polygon for region in regions for polygon in region.polygons()]
+    assert sorted(polygon.area for polygon in streamed) == expected
+    ring = next(region for region in regions if region.bbox[0] == 3)
+    assert ring.polygons()[0].exterior.min(axis=0).tolist() == [3, 3]
+
+
+def test_width_mismatch_and_stats():
+    stats = Stats()
+    assert len(list(iter_regions(np.arange(12).reshape(3, 4), stats=stats))) == 12
+    assert stats.counters[REGIONS_FOUND] == 12 and stats.counters[PIXELS_VISITED] == 12
+    with pytest.raises(ValueError, match="Ширина полосы"):
+        list(iter_regions([np.zeros((1, 3)), np.zeros((1, 4))]))
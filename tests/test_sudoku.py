@@ -0,0 +1,106 @@
+import numpy as np
+import pytest
+
+from cellsdata import Walls
+from sudoku import parse, format_grid, format_line, from_walls, to_walls, solve, solve_batch, solve_walls, \
+    solve_many, solve_file, read_puzzles
+
+EASY = "53..7....6..195....98....6.8...6...34..8.3..17...2...6.6....28....419..5....8..79"
+HARD = "8..........36......7..9.2...5...7.......457.....1...3...1....68..85...1..9....4.."
+
+
+def _valid(grid):
+    size = grid.shape[0]
+    box = int(size ** 0.5)
+    units = [grid[i] for i in range(size)] + [grid[:, i] for i in range(size)]
+    units += [grid[r:r + box, c:c + box].ravel() for r in range(0, size, box) for c in range(0, size, box)]
+    return all(sorted(unit.tolist()) == list(range(1, size + 1)) for unit in units)
+
+
+def _keeps_givens(puzzle, solution):
+    return bool(((puzzle == 0) | (puzzle == solution)).all())
+
+
+@pytest.mark.parametrize("line", [EASY, HARD])
+def test_solves_classic(line):
+    puzzle = parse(line)
+    solution = solve(puzzle)
+    assert _valid(solution)
+    assert _keeps_givens(puzzle, solution)
+
+
+@pytest.mark.parametrize("size", [4, 9, 16])
+def test_solves_empty(size):
+    assert _valid(solve(np.zeros((size, size), dtype=np.int8)))
+
+
+def test_unsolvable():
+    puzzle = parse(EASY)
+    puzzle[0, 2] = 5    # повтор в строке
+    assert solve(puzzle) is None
+    puzzle = parse(EASY)
+    puzzle[0, 2], puzzle[0, 3] = 1, 2   # противоречие выясняется только поиском
+    solutions, solved = solve_batch(np.stack([puzzle, parse(EASY)]))
+    assert solved.tolist() == [False, True]
+    assert not solutions[0].any()
+
+
+def test_format_round_trip():
+    puzzle = parse(EASY)
+    assert format_line(puzzle) == EASY
+    assert (parse(format_grid(puzzle).replace('\n', '')) == puzzle).all()
+    sixteen = solve(np.zeros((16, 16), dtype=np.int8))
+    assert set(format_line(sixteen)) == set("123456789ABCDEFG")
+    assert (parse(format_line(sixteen).lower()) == sixteen).all()
+
+
+def test_walls():
+    walls = Walls(txt=format_grid(parse(EASY)))
+    assert (from_walls(walls) == parse(EASY)).all()
+    assert (from_walls(to_walls(parse(EASY))) == parse(EASY)).all()
+    solution = solve_walls(walls)
+    assert '.' not in solution.get_codes()[1]
+    assert _valid(from_walls(solution))
+
+
+def test_bad_input():
+    with pytest.raises(ValueError):
+        parse("123")
+    with pytest.raises(ValueError):
+        parse("12345")     # 5 не квадрат
+    with pytest.raises(ValueError):
+        parse("1.x." * 4)
+    with pytest.raises(ValueError):
+        parse("1.5." * 4)  # 5 в судоку 4×4
+    with pytest.raises(ValueError):
+        from_walls(Walls(txt="12\n34\n.."))
+
+
+@pytest.mark.parametrize("cell", [".0", "23", ""])
+def test_walls_multichar_cells(cell):
+    codes = np.zeros((4, 4), dtype=np.uint8)
+    codes[0, 0] = 1
+    with pytest.raises(ValueError):     # клетки CSV из нескольких символов не читаются по первому символу
+        from_walls(Walls.from_codes(codes, symbols=['.', cell]))
+
+
+def test_solve_file(tmp_path):
+    path = tmp_path / "puzzles.txt"
+    path.write_text(f"# сборник\n{EASY}\n\n{HARD}\n{EASY.replace('.', '0')}\n")
+    puzzles = read_puzzles(path)
+    assert puzzles.shape == (3, 9, 9)
+    assert (puzzles[0] == puzzles[2]).all()
+    solutions, solved = solve_file(path, batch=2)
+    assert solved.all()
+    assert all(_valid(solution) and _keeps_givens(puzzle, solution) for puzzle, solution in zip(puzzles, solutions))
+
+    path.write_text(f"{EASY}\n{EASY[:-1]}\n")
+    with pytest.raises(ValueError):
+        read_puzzles(path)
+
+
+def test_processes():
+    puzzles = np.stack([parse(EASY), parse(HARD)] * 3)
+    solutions, solved = solve_many(puzzles, processes=2, batch=2)
+    assert solved.all()
+    assert (solutions == solve_many(puzzles)[0]).all()
@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from benchmarks.generators import PALETTE
+from regions import label
+from stats import Stats, PIXELS_VISITED
+from tracking import RegionTracker, track
+
+
+def _same_partition(first, second):
+    pairs = np.unique(np.stack([first.ravel(), second.ravel()], axis=1), axis=0)
+    return len(np.unique(pairs[:, 0])) == len(pairs) == len(np.unique(pairs[:, 1]))
+
+
+@pytest.mark.parametrize("connectivity", [4, 8])
+@pytest.mark.parametrize("background", [None, 0])
+def test_matches_full_labeling(connectivity, background):
+    rng = np.random.default_rng(connectivity)
+    codes = rng.integers(0, 3, (30, 40))
+    tracker = RegionTracker(connectivity, background)
+    for step in range(40):
+        if step:
+            row, col = rng.integers(0, 28), rng.integers(0, 38)
+            codes[row:row + rng.integers(1, 4), col:col + rng.integers(1, 4)] = rng.integers(0, 3)
+        frame = tracker.update(codes)
+        assert _same_partition(frame.labels, label(codes, connectivity, background).labels)
+        ids = np.unique(frame.labels[frame.labels > 0])
+        assert tracker.colors[ids].tolist() == [codes[frame.labels == i][0] for i in ids]
+
+
+def _sprites(offset):
+    codes = np.zeros((20, 30), dtype=np.uint8)
+    codes[2:6, 2 + offset:6 + offset] = 1
+    codes[10:15, 20:25] = 2
+    return codes
+
+
+def test_moving_sprite_keeps_id():
+    frames = track((_sprites(offset) for offset in range(5)), background=0)
+    first = next(frames)
+    sprite, still = first.labels[3, 3], first.labels[12, 22]
+    assert sorted(first.appeared) == [1, 2]
+    for offset, frame in enumerate(frames, start=1):     # карта номеров общая, проверяем до следующего кадра
+        assert frame.labels[3, 3 + offset] == sprite and frame.labels[12, 22] == still
+        assert frame.appeared == [] and frame.vanished == []
+        assert frame.relabeled < frame.labels.size // 10   # размечается только окно вокруг спрайта
+
+
+def test_split_and_merge():
+    codes = np.zeros((5, 9), dtype=np.uint8)
+    codes[1:4, 1:8] = 1
+    tracker = RegionTracker(background=0)
+    whole = tracker.update(codes).labels[2, 2]
+    codes[1:4, 3] = 0   # разрез: большая часть справа
+    frame = tracker.update(codes)
+    assert frame.labels[2, 6] == whole and frame.labels[2, 1] != whole
+    assert frame.appeared == [frame.labels[2, 1]]
+    codes[1:4, 3] = 1   # слияние обратно
+    frame = tracker.update(codes)
+    assert frame.labels[2, 1] == frame.labels[2, 6] == whole and frame.vanished == [2]
+
+
+def test_unchanged_frame_is_free():
+    stats = Stats()
+    tracker = RegionTracker(stats=stats)
+    tracker.update(_sprites(0))
+    visited = stats.counters[PIXELS_VISITED]
+    frame = tracker.update(_sprites(0))
+    assert frame.changed == frame.relabeled == 0 and stats.counters[PIXELS_VISITED] == visited
+    with pytest.raises(ValueError, match="не совпадает с предыдущим"):
+        tracker.update(np.zeros((3, 3)))
+
+
+def test_gif(tmp_path):
+    images = [Image.fromarray(PALETTE[_sprites(offset)]) for offset in range(3)]
+    images[0].save(tmp_path / "anim.gif", save_all=True, append_images=images[1:])
+    with Image.open(tmp_path / "anim.gif") as gif:
+        frames = [(frame.index, frame.labels[3, 3 + frame.index]) for frame in track(gif, background=(255, 255, 255))]
+    assert [index for index, _ in frames] == [0, 1, 2]
+    assert len({sprite for _, sprite in frames}) == 1
@@ -0,0 +1,194 @@
+"""
+Отслеживание областей в последовательности кадров (анимированный GIF, серия изображений)
+- кадры читаются по одному через Pillow ImageSequence
+- заново размечаются только изменившиеся пиксели и области, которых изменения касаются; остальная карта
+  номеров берётся из предыдущего кадра, поэтому стоимость кадра растёт с объёмом изменений, а не с размером кадра
+- номера областей стабильны: новая область получает номер той старой области того же цвета, с которой
+  перекрывается больше всего (при разделении номер остаётся у большей части, при слиянии - у большей из старых)
+
+Область, касающаяся изменений, размечается целиком, поэтому без фона (background=None) большая фоновая
+область попадает в разметку при любом изменении рядом с ней
+"""
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator
+
+import numpy as np
+from PIL import Image, ImageSequence
+
+from quantize import to_rgb_array, pack_pixels
+from print_ascii import pack_rgb
+from neighbourhood import check_connectivity
+from regions import label
+from stats import NO_STATS, PIXELS_VISITED, REGIONS_FOUND
+
+_EXCLUDED = -1      # код пикселей, не участвующих в повторной разметке
+
+
+@dataclass
+class Frame:
+    index: int
+    labels: np.ndarray      # карта устойчивых номеров, 0 - фон; массив трекера, меняется следующим кадром
+    changed: int            # пикселей изменилось по сравнению с предыдущим кадром
+    relabeled: int          # пикселей в окне повторной разметки
+    appeared: list[int] = field(default_factory=list)   # номера новых областей
+    vanished: list[int] = field(default_factory=list)   # номера исчезнувших (в том числе слившихся) областей
+
+
+def _dilate(mask: np.ndarray, connectivity: int) -> np.ndarray:
+    result = mask.copy()
+    result[1:] |= mask[:-1]
+    result[:-1] |= mask[1:]
+    result[:, 1:] |= mask[:, :-1]
+    result[:, :-1] |= mask[:, 1:]
+    if connectivity == 8:
+        result[1:, 1:] |= mask[:-1, :-1]
+        result[1:, :-1] |= mask[:-1, 1:]
+        result[:-1, 1:] |= mask[1:, :-1]
+        result[:-1, :-1] |= mask[1:, 1:]
+    return result
+
+
+def _bounds(mask: np.ndarray) -> tuple[int, int, int, int]:
+    """ Габариты маски (строка, столбец, строка за последней, столбец за последним) """
+    rows, cols = np.flatnonzero(mask.any(axis=1)), np.flatnonzero(mask.any(axis=0))
+    return int(rows[0]), int(cols[0]), int(rows[-1]) + 1, int(cols[-1]) + 1
+
+
+class RegionTracker:
+    def __init__(self, connectivity: int = 4, background=None, stats=NO_STATS):
+        """
+        :param connectivity: 4 или 8
+        :param background: код фона, фон областей не образует
+        :param stats: stats.Stats для счётчиков
+        """
+        check_connectivity(connectivity)
+        self.connectivity = connectivity
+        self.background = background
+        self.stats = stats
+        self.codes: np.ndarray | None = None
+        self.labels: np.ndarray | None = None
+        self.frame_index = -1
+        self.next_id = 1
+        # по номерам: код области, габариты (строка, столбец, строка за последней, столбец за последним)
+        self.colors = np.zeros(0, dtype=np.int64)
+        self._boxes = np.zeros((0, 4), dtype=np.int64)
+
+    def _reserve(self, size: int) -> None:
+        if size > len(self.colors):
+            capacity = max(size, 2 * len(self.colors), 64)
+            self.colors = np.resize(self.colors, capacity)
+            self._boxes = np.resize(self._boxes, (capacity, 4))
+
+    def update(self, codes: np.ndarray) -> Frame:
+        """
+        Разметка следующего кадра
+        :param codes: двумерный массив кодов кадра той же формы, что и предыдущие
+        """
+        codes = np.asarray(codes)
+        if codes.ndim != 2:
+            raise ValueError(f"Ожидается двумерный массив кодов, получено измерений: {codes.ndim}")
+        self.frame_index += 1
+        if self.codes is None:
+            self.codes = codes.copy()
+            self.labels = np.zeros(codes.shape, dtype=np.int32)
+            changed = np.ones(codes.shape, dtype=bool)
+        else:
+            if codes.shape != self.codes.shape:
+                raise ValueError(f"Размер кадра {codes.shape} не совпадает с предыдущим {self.codes.shape}")
+            changed = codes != self.codes
+        count = int(np.count_nonzero(changed))
+        if not count:
+            return Frame(self.frame_index, self.labels, 0, 0)
+
+        # окно изменений с соседями: задетые старые области и габариты окна повторной разметки
+        top, left, bottom, right = _bounds(changed)
+        near = np.s_[max(top - 1, 0):bottom + 1, max(left - 1, 0):right + 1]
+        touched = np.unique(self.labels[near][_dilate(changed[near], self.connectivity)])
+        touched = touched[touched > 0]
+        boxes = self._boxes[touched]
+        top = min([top] + boxes[:, 0].tolist())
+        left = min([left] + boxes[:, 1].tolist())
+        bottom = max([bottom] + boxes[:, 2].tolist())
+        right = max([right] + boxes[:, 3].tolist())
+        window = np.s_[top:bottom, left:right]
+
+        previous = self.labels[window]
+        affected = changed[window] | np.isin(previous, touched)
+        self.codes[window] = codes[window]
+        window_codes = codes[window].astype(np.int64)
+        window_codes[~affected] = _EXCLUDED
+        if self.background is not None:
+            window_codes[codes[window] == self.background] = _EXCLUDED
+        fresh = label(window_codes, self.connectivity, background=_EXCLUDED)
+
+        mapping, appeared = self._match(fresh.labels, fresh.colors, previous, affected)
+        vanished = np.setdiff1d(touched, mapping).tolist()
+        previous[affected] = mapping[fresh.labels[affected]]
+
+        # габариты областей окна
+        rows, cols = np.nonzero(fresh.labels)
+        region = fresh.labels[rows, cols]
+        boxes = np.empty((fresh.count + 1, 4), dtype=np.int64)
+        boxes[:, :2] = np.iinfo(np.int64).max
+        boxes[:, 2:] = -1
+        np.minimum.at(boxes[:, 0], region, rows + top)
+        np.minimum.at(boxes[:, 1], region, cols + left)
+        np.maximum.at(boxes[:, 2], region, rows + top + 1)
+        np.maximum.at(boxes[:, 3], region, cols + left + 1)
+        self._boxes[mapping[1:]] = boxes[1:]
+        self.colors[mapping[1:]] = fresh.colors[1:]
+
+        relabeled = (bottom - top) * (right - left)
+        if self.stats:
+            self.stats.count(PIXELS_VISITED, relabeled)
+            self.stats.count(REGIONS_FOUND, len(appeared))
+        return Frame(self.frame_index, self.labels, count, relabeled, appeared, vanished)
+
+    def _match(self, fresh: np.ndarray, fresh_colors: np.ndarray, previous: np.ndarray,
+               affected: np.ndarray) -> tuple[np.ndarray, list[int]]:
+        """
+        Номера для областей повторной разметки по наибольшему перекрытию со старыми областями того же цвета
+        :return: (mapping: номер в окне -> устойчивый номер, mapping[0] = 0; номера новых областей)
+        """
+        new, old = fresh[affected], previous[affected]
+        same = (new > 0) & (old > 0)
+        new, old = new[same], old[same]
+        same = fresh_colors[new] == self.colors[old]
+        pairs, overlap = np.unique(np.stack([new[same], old[same]], axis=1), axis=0, return_counts=True)
+
+        mapping = np.zeros(len(fresh_colors), dtype=np.int32)
+        taken = set()
+        for index in np.lexsort((pairs[:, 1], pairs[:, 0], -overlap)).tolist():
+            region, previous_id = pairs[index].tolist()
+            if not mapping[region] and previous_id not in taken:
+                mapping[region] = previous_id
+                taken.add(previous_id)
+
+        appeared = []
+        for region in np.flatnonzero(mapping[1:] == 0).tolist():
+            mapping[region + 1] = self.next_id
+            appeared.append(self.next_id)
+            self.next_id += 1
+        self._reserve(self.next_id)
+        return mapping, appeared
+
+
+def iter_frame_codes(image: Image.Image) -> Iterator[np.ndarray]:
+    """ Кадры анимированного изображения по одному, упакованные rgb-коды """
+    for frame in ImageSequence.Iterator(image):
+        yield pack_pixels(to_rgb_array(frame.convert('RGB')))
+
+
+def track(frames: Image.Image | Iterable[np.ndarray], connectivity: int = 4, background=None,
+          stats=NO_STATS) -> Iterator[Frame]:
+    """
+    Устойчивые номера областей по кадрам
+    :param frames: анимированное изображение Pillow (GIF и т.п.) или последовательность массивов кодов
+    :param background: код фона; для изображения - цвет (r, g, b)
+    """
+    if isinstance(frames, Image.Image):
+        background = pack_rgb(background) if background is not None else None
+        frames = iter_frame_codes(frames)
+    tracker = RegionTracker(connectivity, background, stats)
+    for codes in frames:
+        yield tracker.update(codes)